@@ -1,49 +1,265 @@
 # main.py
+import argparse
 import os
-from scripts.dataprocessing.preprocess import clean_data
-from scripts.filter_data import filter_data
-from scripts.analyze_trends import analyze_trends
-from scripts.analyze_demographics import analyze_demographics
-from scripts.analyze_economy import analyze_economy
-from scripts.compare_years import compare_years
-
-def main():
-    # Đường dẫn file
-    raw_csv = "data/raw/vietnam_population_2011_2016.csv"
-    cleaned_csv = "data/cleaned/cleaned_population.csv"
-    filtered_csv = "data/filtered/filtered_population.csv"
-    visualizations_dir = "outputs/visualizations/"
-
-    # Bước 1: Làm sạch dữ liệu
-    print("Bước 1: Làm sạch dữ liệu...")
-    clean_data(raw_csv, cleaned_csv)
-
-    # Bước 2: Lọc dữ liệu (nếu cần, ví dụ: năm cụ thể hoặc tỉnh cụ thể)
-    print("Bước 2: Lọc dữ liệu cho năm 2016...")
-    filters = {'year': 2016}
-    filter_data(cleaned_csv, filtered_csv, filters)
-
-    # Bước 3: Phân tích xu hướng
-    print("Bước 3: Phân tích xu hướng...")
-    analyze_trends(cleaned_csv, os.path.join(visualizations_dir, "trend_population.png"))
-
-    # Bước 4: Phân tích nhân khẩu học
-    print("Bước 4: Phân tích nhân khẩu học...")
-    analyze_demographics(cleaned_csv, visualizations_dir)
-
-    # Bước 5: Phân tích tác động kinh tế
-    print("Bước 5: Phân tích tác động kinh tế...")
-    analyze_economy(cleaned_csv, visualizations_dir)
-
-    # Bước 6: Phân tích so sánh
-    print("Bước 6: Phân tích so sánh...")
-    compare_years(cleaned_csv, visualizations_dir)
-
-    # Bước 7: Tổng hợp báo cáo (Có thể thực hiện trong Jupyter Notebook)
-    print("Bước 7: Tổng hợp báo cáo...")
-    # Đây là bước thủ công, sử dụng notebooks hoặc công cụ báo cáo khác
 
+# Chỉ import các module nhẹ (thư viện chuẩn) ở đây; pandas, matplotlib, seaborn được
+# nạp trong từng bước khi bước đó thực sự chạy
+from scripts.chart_cache import get_chart_cache
+from scripts.instrument import DEFAULT_METRICS_PATH, configure, dump_profile, format_summary
+from scripts.paths import (CORRELATIONS_CSV, GROWTH_CSV, LABOR_GROWTH_CSV, RANK_SHIFTS_CSV, REPORT_XLSX,
+                           YEAR_PAIRS_CSV, cube_path, quarantine_path, validation_report_path)
+from scripts.pipeline import Pipeline, Stage, load_script
+
+# Đường dẫn file
+RAW_CSV = "data/raw/vietnam_population_2011_2016.csv"
+CLEANED_CSV = "data/cleaned/cleaned_population.csv"
+FILTERED_CSV = "data/filtered/filtered_population.csv"
+FILTERED_YEAR_DIR = "data/filtered/Year"
+FILTERED_REGION_DIR = "data/filtered/Region"
+CUBE_CSV = cube_path(CLEANED_CSV)
+VISUALIZATIONS_DIR = "outputs/visualizations/"
+
+TREND_DIR = os.path.join(VISUALIZATIONS_DIR, "Trend Analysis")
+DEMOGRAPHICS_DIR = os.path.join(VISUALIZATIONS_DIR, "Demographic Analysis")
+ECONOMY_DIR = os.path.join(VISUALIZATIONS_DIR, "Economic Impact", "Population_and_Economics")
+COMPARE_DIR = os.path.join(VISUALIZATIONS_DIR, "Comparative Analysis")
+
+# File mã nguồn của từng bước (đổi mã thì bước đó cũng chạy lại)
+PREPROCESS_SCRIPT = "scripts/data processing/preprocess.py"
+SCHEMA_SCRIPT = "scripts/schema.py"
+TREND_SCRIPT = "scripts/Trend Analysis/Trend Analysis.py"
+DEMOGRAPHICS_SCRIPT = "scripts/Demographic Analysis/analyze_demographics.py"
+ECONOMY_SCRIPT = "scripts/Economic Impact/analyze_economy.py"
+COMPARE_SCRIPT = "scripts/Comparative Analysis/compare_years.py"
+COMPARISON_SCRIPT = "scripts/comparison.py"
+CORRELATION_SCRIPT = "scripts/correlation.py"
+DATASET_SCRIPT = "scripts/dataset.py"
+AGGREGATES_SCRIPT = "scripts/aggregates.py"
+QUERY_SCRIPT = "scripts/query.py"
+INDEX_SCRIPT = "scripts/index.py"
+GROWTH_SCRIPT = "scripts/growth.py"
+REPORT_SCRIPT = "scripts/report.py"
+RENDERING_SCRIPT = "scripts/rendering.py"
+BACKENDS_SCRIPT = "scripts/backends.py"
+
+# Biến môi trường chọn engine tổng hợp mặc định (như scripts/backends.BACKEND_ENV)
+BACKEND_ENV = "POPULATION_BACKEND"
+
+
+def clean_data(raw_path, cleaned_path):
+    module = load_script("data processing/preprocess.py")
+    module.clean_data(raw_path, cleaned_path)
+
+
+def build_cube(input_path, backend):
+    from scripts.aggregates import save_cube, scan_cube
+
+    save_cube(scan_cube(input_path, backend=backend), input_path)
+
+
+def build_growth_tables(input_path):
+    from scripts.growth import build_growth_tables
+
+    build_growth_tables(input_path, GROWTH_CSV, LABOR_GROWTH_CSV)
+
+
+def filter_data(input_path, output_path, filters):
+    from scripts.query import filter_data
+
+    filter_data(input_path, output_path, filters)
+
+
+def split_data(input_path, year_dir, region_dir):
+    from scripts.dataset import load_dataset
+    from scripts.query import split_data
+
+    data = load_dataset(input_path)
+    split_data(data, year_dir, 'Year')
+    split_data(data, region_dir, 'Region')
+
+
+def analyze_trends(input_path, output_folder, facet=False, backend=None):
+    # Truyền đường dẫn (không nạp dữ liệu): các biểu đồ theo Year x Region đọc cube đã lưu
+    # của bước cube (aggregates.get_cube); tỷ lệ tăng dân số theo tỉnh được tính trong
+    # engine trên file khi backend là duckdb/polars, ngược lại bằng pandas
+    module = load_script("Trend Analysis/Trend Analysis.py")
+    module.analyze_population_density(input_path, output_folder, facet=facet, backend=backend)
+    module.analyze_average_population(input_path, os.path.join(output_folder, "average_population.png"),
+                                      backend=backend)
+    module.analyze_population_by_region(input_path, output_folder, facet=facet, backend=backend)
+    module.analyze_natural_population_growth(input_path, output_folder, facet=facet, backend=backend)
+    module.analyze_labor_force(input_path, output_folder, backend=backend)
+
+
+def analyze_demographics(input_path, output_dir, facet=False):
+    from scripts.dataset import load_dataset
+
+    module = load_script("Demographic Analysis/analyze_demographics.py")
+    module.analyze_demographics(load_dataset(input_path), output_dir, facet=facet)
+
+
+def analyze_economy(input_path, output_dir, backend=None):
+    # Các bảng theo năm/vùng lấy từ cube đã lưu; chỉ các cột cần cho biểu đồ phân tán
+    # và tương quan được đọc từ dữ liệu (bằng pandas)
+    module = load_script("Economic Impact/analyze_economy.py")
+    module.analyze_population_and_economics(input_path, output_dir, backend=backend)
+
+
+def compare_years(input_path, output_dir):
+    from scripts.dataset import load_dataset
+
+    module = load_script("Comparative Analysis/compare_years.py")
+    module.compare_years(load_dataset(input_path), output_dir)
+
+
+def build_report(input_path, output_path, visualizations_dir):
+    from scripts.report import build_report
+
+    build_report(input_path, output_path, visualizations_dir)
+
+
+def build_pipeline(facet=False, backend=None):
+    """
+    Khai báo các bước của dự án cùng đầu vào/đầu ra của từng bước.
+
+    Args:
+        facet (bool): Các biểu đồ theo vùng của bước trends/demographics được vẽ thành
+                      một figure dạng lưới cho mỗi phân tích thay vì một file cho mỗi vùng.
+        backend (str, optional): Engine tổng hợp của các bước cube/trends/economy (pandas,
+                                 duckdb, polars, auto; mặc định POPULATION_BACKEND hoặc pandas).
+                                 Là tham số của các bước nên đổi backend thì các bước đó chạy lại.
+    """
+    backend = (backend or os.environ.get(BACKEND_ENV) or "pandas").lower()
+    return Pipeline([
+        # Bước 1: Làm sạch dữ liệu
+        # (mỗi dòng được kiểm tra theo schema, dòng vi phạm được tách ra file quarantine)
+        Stage("clean", clean_data,
+              inputs=[RAW_CSV, PREPROCESS_SCRIPT, SCHEMA_SCRIPT, DATASET_SCRIPT],
+              outputs=[CLEANED_CSV, quarantine_path(CLEANED_CSV), validation_report_path(CLEANED_CSV)],
+              params={"raw_path": RAW_CSV, "cleaned_path": CLEANED_CSV}),
+        # Cube tổng hợp Year x Region, lưu cạnh dữ liệu đã làm sạch
+        Stage("cube", build_cube,
+              inputs=[CLEANED_CSV, AGGREGATES_SCRIPT, BACKENDS_SCRIPT, DATASET_SCRIPT],
+              outputs=[CUBE_CSV],
+              params={"input_path": CLEANED_CSV, "backend": backend},
+              deps=["clean"]),
+        # Bảng tốc độ tăng trưởng (YoY, CAGR, trung bình trượt) của mọi chỉ số
+        Stage("growth", build_growth_tables,
+              inputs=[CLEANED_CSV, GROWTH_SCRIPT, INDEX_SCRIPT, DATASET_SCRIPT],
+              outputs=[GROWTH_CSV, LABOR_GROWTH_CSV],
+              params={"input_path": CLEANED_CSV},
+              deps=["clean"]),
+        # Bước 2: Lọc dữ liệu (ví dụ: năm cụ thể hoặc tỉnh cụ thể)
+        Stage("filter", filter_data,
+              inputs=[CLEANED_CSV, QUERY_SCRIPT, DATASET_SCRIPT],
+              outputs=[FILTERED_CSV],
+              params={"input_path": CLEANED_CSV, "output_path": FILTERED_CSV,
+                      "filters": {'Year': 2016}},
+              deps=["clean"]),
+        # Tách dữ liệu theo từng năm và từng vùng trong một lần đọc
+        Stage("split", split_data,
+              inputs=[CLEANED_CSV, QUERY_SCRIPT, DATASET_SCRIPT],
+              outputs=[FILTERED_YEAR_DIR, FILTERED_REGION_DIR],
+              params={"input_path": CLEANED_CSV, "year_dir": FILTERED_YEAR_DIR,
+                      "region_dir": FILTERED_REGION_DIR},
+              deps=["clean"]),
+        # Bước 3: Phân tích xu hướng
+        Stage("trends", analyze_trends,
+              inputs=[CLEANED_CSV, CUBE_CSV, TREND_SCRIPT, DATASET_SCRIPT, AGGREGATES_SCRIPT, BACKENDS_SCRIPT,
+                      INDEX_SCRIPT, GROWTH_SCRIPT, RENDERING_SCRIPT],
+              outputs=[os.path.join(TREND_DIR, name) for name in (
+                  "population_density_group_bar_chart.png", "average_population.png",
+                  "natural_population_growth_rate_by_year.png",
+                  "labor_force_group_bar_chart.png", "labor_force_line_chart.png")],
+              params={"input_path": CLEANED_CSV, "output_folder": TREND_DIR, "facet": facet, "backend": backend},
+              deps=["clean", "cube"]),
+        # Bước 4: Phân tích nhân khẩu học
+        Stage("demographics", analyze_demographics,
+              inputs=[CLEANED_CSV, DEMOGRAPHICS_SCRIPT, DATASET_SCRIPT, RENDERING_SCRIPT],
+              outputs=[os.path.join(DEMOGRAPHICS_DIR, "Dân số theo tuổi", "Dân số theo độ tuổi.png"),
+                       os.path.join(DEMOGRAPHICS_DIR, "Dân số theo giới tính", "Dân số theo giới tính.png"),
+                       os.path.join(DEMOGRAPHICS_DIR, "Dân số theo khu vực", "Dân số theo khu vực.png")],
+              params={"input_path": CLEANED_CSV, "output_dir": DEMOGRAPHICS_DIR, "facet": facet},
+              deps=["clean"]),
+        # Bước 5: Phân tích tác động kinh tế
+        Stage("economy", analyze_economy,
+              inputs=[CLEANED_CSV, CUBE_CSV, ECONOMY_SCRIPT, DATASET_SCRIPT, AGGREGATES_SCRIPT, BACKENDS_SCRIPT,
+                      CORRELATION_SCRIPT, RENDERING_SCRIPT],
+              outputs=[os.path.join(ECONOMY_DIR, name) for name in (
+                  "labor_trend.png", "labor_vs_growth.png", "average_population_by_region.png",
+                  "density_and_sex_ratio_by_region.png", "labor_force_by_region_and_year.png",
+                  "correlation_matrix.png")] + [CORRELATIONS_CSV],
+              params={"input_path": CLEANED_CSV, "output_dir": ECONOMY_DIR, "backend": backend},
+              deps=["clean", "cube"]),
+        # Bước 6: Phân tích so sánh
+        Stage("compare", compare_years,
+              inputs=[CLEANED_CSV, COMPARE_SCRIPT, COMPARISON_SCRIPT, INDEX_SCRIPT, DATASET_SCRIPT, RENDERING_SCRIPT],
+              outputs=[os.path.join(COMPARE_DIR, "compare_population_years.png"), YEAR_PAIRS_CSV, RANK_SHIFTS_CSV],
+              params={"input_path": CLEANED_CSV, "output_dir": COMPARE_DIR},
+              deps=["clean"]),
+        # Bước 7: Tổng hợp báo cáo (mỗi sheet chỉ tính lại khi đầu vào của nó thay đổi)
+        Stage("report", build_report,
+              inputs=[CLEANED_CSV, CORRELATIONS_CSV, REPORT_SCRIPT, AGGREGATES_SCRIPT, CORRELATION_SCRIPT,
+                      VISUALIZATIONS_DIR],
+              outputs=[REPORT_XLSX],
+              params={"input_path": CLEANED_CSV, "output_path": REPORT_XLSX,
+                      "visualizations_dir": VISUALIZATIONS_DIR},
+              deps=["clean", "trends", "demographics", "economy", "compare"]),
+    ])
+
+
+def main(force=False, batch=False, metrics_path=DEFAULT_METRICS_PATH, trace_memory=False, profile_dir=None,
+         facet=False, stages=None, backend=None):
+    if batch:
+        # Chạy không giao diện (server): backend Agg, không gọi show(). Đặt qua biến môi trường
+        # (như enable_batch_mode) để matplotlib chỉ được nạp khi một bước cần vẽ
+        os.environ["POPULATION_BATCH"] = "1"
+        os.environ.setdefault("MPLBACKEND", "Agg")
+    # Mỗi bước và mỗi hàm phân tích được đo và ghi thành một dòng JSON trong metrics_path
+    configure(metrics_path, trace_memory=trace_memory, profile_dir=profile_dir)
+
+    # Các bước có đầu vào (nội dung file, tham số, mã nguồn) không đổi so với lần chạy trước sẽ được bỏ qua
+    # stages: chỉ chạy các bước này (các bước phụ thuộc chỉ chạy lại nếu đầu vào đổi)
+    # backend: bước cube tổng hợp trong engine đã chọn; trends/economy đọc cube đã lưu và chỉ
+    # dùng engine cho phần tính trên file (tỷ lệ tăng theo tỉnh, cube khi chưa có)
+    build_pipeline(facet=facet, backend=backend).run(selected=stages, force=force)
+
+    print(format_summary())
+    chart_cache = get_chart_cache()
+    if chart_cache is not None:
+        print(f"Bộ nhớ đệm biểu đồ: {chart_cache.stats()}")
+    if profile_dir:
+        print(f"Kết quả cProfile của bước chậm nhất: {dump_profile()}")
     print("Dự án phân tích dữ liệu dân số hoàn thành.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Chạy pipeline phân tích dân số Việt Nam")
+    parser.add_argument("--force", action="store_true", help="Chạy lại tất cả các bước")
+    parser.add_argument("--batch", action="store_true",
+                        help="Chế độ batch: không mở cửa sổ biểu đồ (tương đương POPULATION_BATCH=1)")
+    parser.add_argument("--metrics", default=DEFAULT_METRICS_PATH,
+                        help=f"File JSON lines nhận kết quả đo của từng bước (mặc định {DEFAULT_METRICS_PATH})")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Đo bộ nhớ đỉnh của từng bước bằng tracemalloc (chậm hơn)")
+    parser.add_argument("--profile", metavar="DIR",
+                        help="Chạy cProfile và lưu kết quả của bước chậm nhất vào thư mục DIR")
+    parser.add_argument("--facet", action="store_true",
+                        help="Vẽ các vùng thành một figure dạng lưới thay vì một file cho mỗi vùng")
+    parser.add_argument("--backend", choices=["pandas", "duckdb", "polars", "auto"],
+                        help="Engine tổng hợp dữ liệu từ file (mặc định pandas, tương đương POPULATION_BACKEND)")
+    parser.add_argument("stages", nargs="*", metavar="STAGE",
+                        help="Chỉ chạy các bước này, ví dụ: python main.py filter trends (mặc định: tất cả)")
+    parser.add_argument("--list", action="store_true", help="Liệt kê các bước và các bước phụ thuộc")
+    args = parser.parse_args()
+
+    pipeline_stages = build_pipeline().stages
+    unknown = [name for name in args.stages if name not in pipeline_stages]
+    if unknown:
+        parser.error(f"Không có bước {unknown}, chọn trong: {', '.join(pipeline_stages)}")
+    if args.list:
+        for name, stage in pipeline_stages.items():
+            print(f"{name:<14} phụ thuộc: {', '.join(stage.deps) or '-'}")
+    else:
+        main(force=args.force, batch=args.batch, metrics_path=args.metrics, trace_memory=args.trace_memory,
+             profile_dir=args.profile, facet=args.facet, stages=args.stages or None,
+             backend=args.backend)
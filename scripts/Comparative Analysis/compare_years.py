@@ -1,49 +1,108 @@
 # scripts/compare_years.py
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
 import os
+import sys
 
-def compare_years(input_path, output_dir):
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.comparison import YearPanel
+from scripts.dataset import load_dataset, save_dataset
+from scripts.instrument import instrumented, record_error
+from scripts.paths import RANK_SHIFTS_CSV, YEAR_PAIRS_CSV
+from scripts.rendering import chart_job, new_figure, render_jobs, save_figure
+
+# Heatmap thay đổi thứ hạng có một hàng cho mỗi tỉnh, chỉ vẽ khi số tỉnh không quá ngưỡng này
+MAX_RANK_HEATMAP_ROWS = 100
+
+# Các chỉ số được in ra các tỉnh tăng/giảm hạng nhiều nhất
+MOVER_METRICS = ['Population density', '15+ labor']
+
+@instrumented
+def compare_years(input_path, output_dir, pairs_path=YEAR_PAIRS_CSV, ranks_path=RANK_SHIFTS_CSV,
+                  pairs=None, heatmaps=True, ci=False):
     """
     So sánh các chỉ số nhân khẩu học và kinh tế qua các năm.
-    
+
+    Mọi cột số của dữ liệu (kể cả các chỉ số kinh tế như gdp nếu có) được đưa vào mảng
+    tỉnh x năm x chỉ số (scripts/comparison.py). Chênh lệch, phần trăm thay đổi và thay đổi
+    thứ hạng của mọi cặp năm được tính cùng lúc và lưu thành bảng dạng dài.
+
     Args:
-        input_path (str): Đường dẫn dữ liệu đã làm sạch.
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
         output_dir (str): Thư mục lưu các biểu đồ.
+        pairs_path (str): Bảng so sánh mọi cặp năm (tỉnh, năm đầu, năm cuối, chỉ số).
+        ranks_path (str): Bảng thay đổi thứ hạng của mỗi tỉnh giữa năm đầu và năm cuối.
+        pairs (list, optional): Các cặp (năm đầu, năm cuối) của bảng so sánh, mặc định mọi cặp.
+        heatmaps (bool): Vẽ heatmap năm x năm của mỗi chỉ số và heatmap thay đổi thứ hạng.
+        ci (bool): Vẽ khoảng tin cậy 95% quanh đường trung bình (seaborn bootstrap trên
+                   từng dòng dữ liệu, chậm khi có nhiều tỉnh/xã).
     """
     try:
-        data = pd.read_csv(input_path, encoding='utf-8')
+        data = load_dataset(input_path)
+        panel = YearPanel(data)
         print("Đọc dữ liệu thành công cho phân tích so sánh.")
 
-        # So sánh dân số qua các năm
-        plt.figure(figsize=(10,6))
-        sns.lineplot(x='Year', y='Population grow ratio', data=data, marker='o')
-        plt.title("So sánh Dân số qua các năm")
-        plt.xlabel("Năm")
-        plt.ylabel("Tổng Dân số")
-        plt.grid(True)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "compare_population_years.png"))
-        plt.close()
-        print("Biểu đồ so sánh dân số qua các năm đã được lưu.")
+        # So sánh tỷ lệ tăng dân số qua các năm
+        metric = 'Population grow ratio'
+        chart_path = os.path.join(output_dir, "compare_population_years.png")
+        title, ylabel = "So sánh Dân số qua các năm", "Tỷ lệ tăng dân số (%)"
+        jobs = []
+        if ci:
+            import seaborn as sns  # chỉ nạp khi cần khoảng tin cậy
 
-        # So sánh các chỉ số kinh tế nếu có
-        economic_columns = ['gdp', 'unemployment_rate']
-        for col in economic_columns:
-            if col in data.columns:
-                plt.figure(figsize=(10,6))
-                sns.lineplot(x='year', y=col, data=data, marker='o')
-                plt.title(f"So sánh {col.capitalize()} qua các năm")
-                plt.xlabel("Năm")
-                plt.ylabel(col.capitalize())
-                plt.grid(True)
-                plt.tight_layout()
-                plt.savefig(os.path.join(output_dir, f"compare_{col}_years.png"))
-                plt.close()
-                print(f"Biểu đồ so sánh {col} qua các năm đã được lưu.")
+            fig, ax = new_figure((10, 6))
+            sns.lineplot(x='Year', y=metric, data=data, marker='o', errorbar=('ci', 95), ax=ax)
+            ax.set_title(title)
+            ax.set_xlabel("Năm")
+            ax.set_ylabel(ylabel)
+            ax.grid(True)
+            save_figure(fig, chart_path)
+        else:
+            # Trung bình theo năm lấy từ mảng đã tạo, không bootstrap trên từng dòng
+            yearly = panel.yearly_mean(metric)
+            jobs.append(chart_job('line', yearly.index, {metric: yearly}, chart_path,
+                                  title=title, xlabel="Năm", ylabel=ylabel, grid_axis='both'))
+
+        # Bảng so sánh mọi cặp năm và thay đổi thứ hạng giữa năm đầu và năm cuối
+        first, last = panel.years[0], panel.years[-1]
+        table = panel.pair_table(pairs)
+        save_dataset(table, pairs_path)
+        shifts = panel.rank_shift_table()
+        save_dataset(shifts, ranks_path)
+        print(f"Bảng so sánh các cặp năm đã được lưu tại: {pairs_path} ({len(table)} dòng)")
+        for col in [col for col in MOVER_METRICS if col in panel.metrics]:
+            up = shifts.nlargest(3, col)
+            down = shifts.nsmallest(3, col)
+            print(f"{col} ({first}-{last}): tăng hạng nhiều nhất "
+                  + ", ".join(f"{row[1]} ({row[2]:+.0f})" for row in up[['Provinces/city', col]].itertuples())
+                  + "; giảm hạng nhiều nhất "
+                  + ", ".join(f"{row[1]} ({row[2]:+.0f})" for row in down[['Provinces/city', col]].itertuples()))
+
+        if heatmaps:
+            # Phần trăm thay đổi trung bình từ năm ở hàng tới năm ở cột (chỉ các cặp năm đầu < năm cuối)
+            upper = np.triu(np.ones((len(panel.years), len(panel.years)), dtype=bool), 1)
+            for name, matrix in panel.change_matrices('pct').items():
+                matrix = matrix.where(upper)
+                jobs.append(chart_job(
+                    'heatmap', matrix.columns, {str(year): row for year, row in matrix.iterrows()},
+                    os.path.join(output_dir, f"compare_{name.replace(' ', '_')}_pct_change.png"),
+                    title=f"{name}: % thay đổi trung bình giữa các năm", xlabel="Năm cuối",
+                    ylabel="Năm đầu", annotate="{:.1f}", colorbar_label="%", figsize=(9, 7)))
+
+            if len(panel.provinces) <= MAX_RANK_HEATMAP_ROWS:
+                jobs.append(chart_job(
+                    'heatmap', panel.metrics,
+                    {label: values for label, values in zip(panel.labels, shifts[panel.metrics].to_numpy())},
+                    os.path.join(output_dir, "compare_rank_shift.png"),
+                    title=f"Thay đổi thứ hạng {first}-{last} (dương = tăng hạng)", xlabel="", ylabel="",
+                    annotate="{:+.0f}", colorbar_label="hạng", tick_fontsize=8,
+                    figsize=(9, 0.22 * len(panel.provinces) + 2)))
+
+        render_jobs(jobs)
+        print("Biểu đồ so sánh dân số qua các năm đã được lưu.")
 
     except Exception as e:
+        record_error(e)
         print(f"Lỗi trong quá trình phân tích so sánh: {e}")
 
 if __name__ == "__main__":
@@ -0,0 +1,195 @@
+# scripts/analyze_demographics.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.dataset import as_float64, load_dataset, region_order
+from scripts.instrument import instrumented, record_error
+from scripts.rendering import chart_job, facet_job, render_jobs
+
+# Các tỉnh/thành phố được tính là thành thị
+URBAN_PROVINCES = ['Ho Chi Minh', 'Ha Noi']
+
+REQUIRED_COLUMNS = ['Year', 'Region', 'Provinces/city', 'Average population', 'Sex ratio', '15+ labor']
+
+# Các cột suy ra từ dữ liệu gốc (đơn vị: nghìn người)
+DERIVED_COLUMNS = ['Population children', 'Population male', 'Population female',
+                   'Population urban', 'Population rural']
+
+# Tên dùng cho chuỗi toàn quốc trong bảng tổng hợp
+NATIONAL = 'Vietnam'
+
+# Tên thư mục/file biểu đồ (giống các biểu đồ đã có trong outputs/visualizations/Demographic Analysis)
+AGE_DIR = "Dân số theo tuổi"
+SEX_DIR = "Dân số theo giới tính"
+AREA_DIR = "Dân số theo khu vực"
+
+# Biểu đồ giới tính của một số vùng đã có sẵn trong outputs/ với tên khác quy tắc chung,
+# giữ nguyên các tên đó để không sinh thêm file trùng nội dung
+SEX_CHART_NAMES = {
+    'Highlands': "Dân số theo Giới tính Highlands.png",
+    'Hong river Delta': "Dân số theo giới tính kv Hong river Delta.png",
+}
+
+
+def derive_demographics(data, urban=URBAN_PROVINCES, inplace=False):
+    """
+    Tính các cột nhân khẩu học trong một lần duyệt bằng phép toán trên mảng.
+
+        - Trẻ em (<15 tuổi) = Average population - 15+ labor
+        - Nam = Average population * Sex ratio / (100 + Sex ratio), Nữ = phần còn lại
+        - Thành thị/Nông thôn: dân số của tỉnh nằm trong `urban` hoặc không (0 cho phần kia)
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số.
+        urban (list): Các tỉnh/thành phố thành thị.
+        inplace (bool): Thêm cột vào chính data. Mặc định trả về bản mới dùng chung các
+                        cột gốc (không sao chép dữ liệu), vì DataFrame từ load_dataset được
+                        dùng chung và không được sửa trực tiếp.
+
+    Returns:
+        pd.DataFrame: Dữ liệu kèm các cột DERIVED_COLUMNS.
+    """
+    population = as_float64(data['Average population'])
+    ratio = as_float64(data['Sex ratio'])
+    is_urban = data['Provinces/city'].isin(urban).to_numpy()
+
+    male = population * ratio / (100 + ratio)
+    derived = {
+        'Population children': population - as_float64(data['15+ labor']),
+        'Population male': male,
+        'Population female': population - male,
+        'Population urban': np.where(is_urban, population, 0.0),
+        'Population rural': np.where(is_urban, 0.0, population),
+    }
+    if inplace:
+        for col, values in derived.items():
+            data[col] = values
+        return data
+    return data.assign(**derived)
+
+
+def summarize_demographics(data):
+    """
+    Tổng theo (Region, Year) của dân số, lao động và các cột suy ra, trong một lần groupby,
+    kèm chuỗi toàn quốc (Region = NATIONAL) cuộn lên từ kết quả theo vùng.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu đã qua derive_demographics.
+
+    Returns:
+        pd.DataFrame: Chỉ mục (Region, Year), các cột tổng.
+    """
+    columns = ['Average population', '15+ labor'] + DERIVED_COLUMNS
+    by_region = data.groupby(['Region', 'Year'], observed=True)[columns].sum()
+    national = by_region.groupby(level='Year').sum()
+    national.index = pd.MultiIndex.from_product([[NATIONAL], national.index], names=['Region', 'Year'])
+    summary = pd.concat([by_region, national])
+    # Giữ thứ tự vùng theo REGIONS, toàn quốc ở cuối
+    regions = region_order([r for r in pd.unique(summary.index.get_level_values('Region')) if r != NATIONAL])
+    return summary.reindex(regions + [NATIONAL], level='Region')
+
+
+@instrumented
+def analyze_demographics(input_path, output_dir, facet=False):
+    """
+    Phân tích dân số theo độ tuổi, giới tính và khu vực (thành thị/nông thôn), toàn quốc và từng vùng.
+
+    Args:
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        output_dir (str): Thư mục lưu các biểu đồ.
+        facet (bool): Vẽ các vùng thành một figure dạng lưới cho mỗi loại biểu đồ
+                      ("... theo vùng.png") thay cho một file cho mỗi vùng.
+
+    Returns:
+        pd.DataFrame | None: Bảng tổng hợp từ summarize_demographics.
+    """
+    try:
+        data = load_dataset(input_path, columns=REQUIRED_COLUMNS)
+        print("Đọc dữ liệu thành công!")
+
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in data.columns]
+        if missing_columns:
+            print(f"Thiếu các cột sau: {missing_columns}")
+            return None
+
+        summary = summarize_demographics(derive_demographics(data))
+
+        jobs = []
+        if facet:
+            # Toàn quốc vẫn là biểu đồ riêng, các vùng được gộp thành small multiples
+            regions = summary.drop(index=NATIONAL, level='Region')
+            years = summary.loc[NATIONAL].index.astype(str)
+            tables = {region: table.droplevel('Region') for region, table in regions.groupby(level='Region', sort=False)}
+            jobs.append(facet_job(
+                'line', years,
+                {region: {'Trẻ em (<15 tuổi)': table['Population children'],
+                          'Người lao động(>=15 tuổi)': table['15+ labor']} for region, table in tables.items()},
+                os.path.join(output_dir, AGE_DIR, "Dân số theo tuổi theo vùng.png"),
+                title="Dân số theo độ tuổi của các vùng qua các năm", xlabel="Năm",
+                ylabel="Dân số (nghìn người)", colors=['green', 'orange'], marker=None, grid_axis='both'))
+            jobs.append(facet_job(
+                'line', years,
+                {region: {'Dân số nam': table['Population male'],
+                          'Dân số nữ': table['Population female']} for region, table in tables.items()},
+                os.path.join(output_dir, SEX_DIR, "Dân số theo giới tính theo vùng.png"),
+                title="Dân số theo giới tính của các vùng qua các năm", xlabel="Năm",
+                ylabel="Dân số (nghìn người)", colors=['blue', 'red'], marker=None, grid_axis='both'))
+            summary_charts = summary.loc[[NATIONAL]]
+        else:
+            summary_charts = summary
+
+        for region, table in summary_charts.groupby(level='Region', sort=False):
+            table = table.droplevel('Region')
+            years = table.index.astype(str)
+            national = region == NATIONAL
+            suffix = "" if national else f" {region}"
+            where = "" if national else f" vùng {region}"
+
+            # 1. Dân số theo độ tuổi
+            jobs.append(chart_job(
+                'line', years,
+                {'Trẻ em (<15 tuổi)': table['Population children'], 'Người lao động(>=15 tuổi)': table['15+ labor']},
+                os.path.join(output_dir, AGE_DIR, f"Dân số theo {'độ ' if national else ''}tuổi{suffix}.png"),
+                title=f"Dân số theo độ tuổi{where} qua các năm", xlabel="Năm",
+                ylabel="Dân số (nghìn người)", figsize=(12, 6), colors=['green', 'orange'],
+                marker=None, grid_axis='both'))
+
+            # 2. Dân số theo giới tính
+            jobs.append(chart_job(
+                'line', years,
+                {'Dân số nam': table['Population male'], 'Dân số nữ': table['Population female']},
+                os.path.join(output_dir, SEX_DIR, SEX_CHART_NAMES.get(region, f"Dân số theo giới tính{suffix}.png")),
+                title=f"Dân số theo giới tính{where} qua các năm", xlabel="Năm",
+                ylabel="Dân số (nghìn người)", figsize=(12, 6), colors=['blue', 'red'],
+                marker=None, grid_axis='both'))
+
+        # 3. Dân số thành thị và nông thôn (toàn quốc)
+        table = summary.loc[NATIONAL]
+        jobs.append(chart_job(
+            'line', table.index.astype(str),
+            {'Thành thị': table['Population urban'], 'Nông thôn': table['Population rural']},
+            os.path.join(output_dir, AREA_DIR, "Dân số theo khu vực.png"),
+            title="Dân số Thành thị và Nông thôn theo các năm", xlabel="Năm",
+            ylabel="Dân số trung bình", figsize=(12, 6), colors=['blue', 'green'],
+            title_fontsize=16, marker=None, grid_axis='both'))
+
+        render_jobs(jobs)
+
+        print("Phân tích và lưu biểu đồ nhân khẩu học thành công!")
+        return summary
+
+    except Exception as e:
+        record_error(e)
+        print(f"Lỗi trong quá trình phân tích: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    input_csv = "data/cleaned/cleaned_population.csv"
+    output_dir = "outputs/visualizations/Demographic Analysis"
+    analyze_demographics(input_csv, output_dir)
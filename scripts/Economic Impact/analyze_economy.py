@@ -1,26 +1,43 @@
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import textwrap
+import sys
 
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.dataset import LABOR_RATE, add_labor_rate, load_dataset, save_dataset
+from scripts.aggregates import get_cube, region_year_table, rollup
+from scripts.correlation import correlation_matrix, pairwise_stats, regression_line
+from scripts.instrument import instrumented, record_error
+from scripts.paths import CORRELATIONS_CSV
+from scripts.rendering import chart_job, new_figure, render_jobs, save_figure
 
-def analyze_population_and_economics(input_path, output_dir):
+
+@instrumented
+def analyze_population_and_economics(input_path, output_dir, stats_path=CORRELATIONS_CSV, backend=None):
     """
     Phân tích dữ liệu dân số và các yếu tố kinh tế liên quan.
 
     Args:
-        input_path (str): Đường dẫn file CSV.
+        input_path (str | pd.DataFrame): Đường dẫn file CSV hoặc DataFrame đã nạp sẵn.
         output_dir (str): Thư mục lưu các biểu đồ kết quả.
+        stats_path (str): Bảng tương quan/hồi quy của mọi cặp chỉ số và tỷ lệ lao động (xem
+                          scripts/correlation.py), dùng cho đường hồi quy, ma trận tương quan
+                          và các sheet tương quan/hồi quy của báo cáo (scripts/report.py).
+        backend (str, optional): Engine tổng hợp khi chưa có cube đã lưu (xem scripts/backends.py).
     """
+    import seaborn as sns  # chỉ nạp khi vẽ biểu đồ
+
     try:
-        # Đọc dữ liệu
-        data = pd.read_csv(input_path, encoding='utf-8')
+        # Đọc dữ liệu (chỉ các cột cần thiết)
+        required_columns = ['Year', '15+ labor', 'Population grow ratio', 
+                            'Region', 'Average population', 'Population density', 'Sex ratio']
+        data = load_dataset(input_path, columns=required_columns)
+        cube = get_cube(input_path, backend=backend)
         print("Đọc dữ liệu thành công!")
 
         # Kiểm tra các cột cần thiết
-        required_columns = ['Year', '15+ labor', 'Population grow ratio', 
-                            'Region', 'Average population', 'Population density', 'Sex ratio']
         missing_columns = [col for col in required_columns if col not in data.columns]
         if missing_columns:
             print(f"Thiếu các cột sau: {missing_columns}")
@@ -29,89 +46,101 @@ def analyze_population_and_economics(input_path, output_dir):
         # Tạo thư mục lưu trữ kết quả nếu chưa tồn tại
         os.makedirs(output_dir, exist_ok=True)
 
+        # Tương quan và hồi quy của mọi cặp chỉ số (toàn bộ, theo vùng, theo năm), tính một lần;
+        # gồm cả tỷ lệ lao động để báo cáo dùng lại bảng này thay vì tính lại
+        stats = pairwise_stats(add_labor_rate(data))
+        save_dataset(stats, stats_path)
+
+        # Giá trị trung bình theo năm / theo khu vực lấy từ cube tổng hợp
+        labor_by_year = rollup(cube, 'Year', '15+ labor')
+        population_by_region = rollup(cube, 'Region', 'Average population')
+        density_by_region = rollup(cube, 'Region', 'Population density')
+        sex_ratio_by_region = rollup(cube, 'Region', 'Sex ratio')
+
         # 1. Xu hướng lực lượng lao động theo năm
-        plt.figure(figsize=(10, 6))
-        sns.lineplot(data=data, x='Year', y='15+ labor', marker='o', ci=None, color='blue')
-        plt.title("Labor force trend (15+) by year", fontsize=17, color='blue')
-        plt.xlabel("Year", fontsize=17)
-        plt.ylabel("Labor force (15+)", fontsize=17)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "labor_trend.png"))
-        plt.close()
+        fig, ax = new_figure((10, 6))
+        sns.lineplot(x=labor_by_year.index, y=labor_by_year.values, marker='o', color='blue', ax=ax)
+        ax.set_title("Labor force trend (15+) by year", fontsize=17, color='blue')
+        ax.set_xlabel("Year", fontsize=17)
+        ax.set_ylabel("Labor force (15+)", fontsize=17)
+        save_figure(fig, os.path.join(output_dir, "labor_trend.png"))
 
         # 2. Mối liên hệ giữa lực lượng lao động và tăng trưởng dân số
-        plt.figure(figsize=(15, 7))
-        sns.scatterplot(data=data, x='15+ labor', y='Population grow ratio', hue='Region', palette='muted', s=100)  
-        sns.regplot(data=data, x='15+ labor', y='Population grow ratio', scatter=False, color='red')
-        plt.title("The relationship between labor force and population growth", fontsize=17, color='blue')
-        plt.xlabel("15+ labor", fontsize=17)
-        plt.ylabel("Population grow ratio (%)", fontsize=17)
-        plt.legend(title="Region", title_fontsize=14, fontsize=12, loc='upper right')  
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "labor_vs_growth.png"))
-        plt.close()
+        fig, ax = new_figure((15, 7))
+        sns.scatterplot(data=data, x='15+ labor', y='Population grow ratio', hue='Region', palette='muted', s=100, ax=ax)
+        # Đường hồi quy lấy từ bảng đã tính (không fit lại, không bootstrap khoảng tin cậy)
+        intercept, slope, r2 = regression_line(stats, '15+ labor', 'Population grow ratio')
+        labor_range = np.array([data['15+ labor'].min(), data['15+ labor'].max()], dtype=np.float64)
+        ax.plot(labor_range, intercept + slope * labor_range, color='red', linewidth=2, label=f"OLS (R² = {r2:.2f})")
+        ax.set_title("The relationship between labor force and population growth", fontsize=17, color='blue')
+        ax.set_xlabel("15+ labor", fontsize=17)
+        ax.set_ylabel("Population grow ratio (%)", fontsize=17)
+        ax.legend(title="Region", title_fontsize=14, fontsize=12, loc='upper right')
+        save_figure(fig, os.path.join(output_dir, "labor_vs_growth.png"))
 
         # 3. Dân số trung bình theo khu vực
-        plt.figure(figsize=(15, 6))
-        sns.barplot(data=data, x='Region', y='Average population', ci=None, palette='coolwarm')
-        plt.title("Average population by region", fontsize=17, color='blue')
-        plt.xlabel("Region", fontsize=17)
-        plt.ylabel("Average population", fontsize=17)
-        regions = data['Region'].unique()
-        plt.xticks(
-            ticks=range(len(regions)),  
-            labels=[textwrap.fill(label, 15) for label in regions],  
-            rotation=0, 
+        fig, ax = new_figure((15, 6))
+        regions = list(population_by_region.index)
+        sns.barplot(x=regions, y=population_by_region.values, hue=regions, palette='coolwarm', legend=False, ax=ax)
+        ax.set_title("Average population by region", fontsize=17, color='blue')
+        ax.set_xlabel("Region", fontsize=17)
+        ax.set_ylabel("Average population", fontsize=17)
+        ax.set_xticks(range(len(regions)))
+        ax.set_xticklabels(
+            [textwrap.fill(label, 15) for label in regions],
+            rotation=0,
             fontsize=12
         )
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "average_population_by_region.png"))
-        plt.close()
+        save_figure(fig, os.path.join(output_dir, "average_population_by_region.png"))
 
         # 4. Mật độ dân số và tỷ lệ giới tính theo khu vực
-        fig, ax1 = plt.subplots(figsize=(12, 6))
-        sns.barplot(data=data, x='Region', y='Population density', ci=None, ax=ax1, color='skyblue')
+        fig, ax1 = new_figure((12, 6))
+        regions = list(density_by_region.index)
+        sns.barplot(x=regions, y=density_by_region.values, ax=ax1, color='skyblue')
         ax1.set_ylabel("Population density", fontsize=14)
         ax1.set_title("Population density and sex ratio by region", fontsize=17, color='blue')
         ax1.set_xlabel("Region", fontsize=16)
-        regions = data['Region'].unique()
+        ax1.set_xticks(range(len(regions)))
         ax1.set_xticklabels(
             [textwrap.fill(label, 15) for label in regions], 
             rotation=0, 
             fontsize=12
         )
         ax2 = ax1.twinx()
-        sns.lineplot(data=data, x='Region', y='Sex ratio', ax=ax2, color='orange', marker='o', ci=None)
+        sns.lineplot(x=regions, y=sex_ratio_by_region.loc[regions].values, ax=ax2, color='orange', marker='o')
         ax2.set_ylabel("Sex ratio (%)", color='orange', fontsize=14)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "density_and_sex_ratio_by_region.png"))
-        plt.close()
+        save_figure(fig, os.path.join(output_dir, "density_and_sex_ratio_by_region.png"))
 
         # 5. Phân tích lực lượng lao động theo khu vực và theo năm
-        # Chọn các cột phù hợp
-        required_columns = ['Year', '15+ labor', 'Region']
-        data = data[required_columns]
-
-        # Chuyển đổi định dạng dữ liệu
-        data['Year'] = data['Year'].astype(int)
+        # Trung bình theo (Year, Region) lấy từ cube, mỗi cột là một giá trị (không bootstrap dữ liệu gốc)
+        labor_table = (region_year_table(cube, '15+ labor').stack().rename('15+ labor')
+                       .reset_index().astype({'Year': int}))
 
         # Vẽ biểu đồ cột nhóm
-        plt.figure(figsize=(15, 8))
-        sns.barplot(data=data, x='Region', y='15+ labor', hue='Year', palette='viridis')
+        fig, ax = new_figure((15, 8))
+        sns.barplot(data=labor_table, x='Region', y='15+ labor', hue='Year', palette='viridis',
+                    errorbar=None, ax=ax)
 
         # Tùy chỉnh biểu đồ
-        plt.title("Labor Force (15+) by Region and Year", fontsize=16)
-        plt.xlabel("Region", fontsize=14)
-        plt.ylabel("15+ Labor Force", fontsize=14)
-        plt.legend(title="Year", fontsize=12)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig(os.path.join(output_dir, "labor_force_by_region_and_year.png"))
-        plt.close()
+        ax.set_title("Labor Force (15+) by Region and Year", fontsize=16)
+        ax.set_xlabel("Region", fontsize=14)
+        ax.set_ylabel("15+ Labor Force", fontsize=14)
+        ax.legend(title="Year", fontsize=12)
+        ax.tick_params(axis='x', rotation=45)
+        save_figure(fig, os.path.join(output_dir, "labor_force_by_region_and_year.png"))
+
+        # 6. Ma trận tương quan giữa các chỉ số (như trong comparative_analysis.ipynb)
+        matrix = correlation_matrix(stats, columns=[col for col in pd.unique(stats['x']) if col != LABOR_RATE])
+        render_jobs([chart_job(
+            'heatmap', matrix.columns, {name: row for name, row in matrix.iterrows()},
+            os.path.join(output_dir, "correlation_matrix.png"),
+            title="Correlation between indicators", xlabel="", ylabel="", cmap='coolwarm',
+            annotate="{:.2f}", colorbar_label="Pearson r", figsize=(9, 7))])
 
         print("Phân tích và lưu các biểu đồ hoàn tất!")
 
     except Exception as e:
+        record_error(e)
         print(f"Lỗi trong quá trình phân tích: {e}")
 
 
@@ -1,25 +1,31 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
+import sys
 
-def analyze_population_and_economics(input_path, output_dir):
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.backends import aggregate
+from scripts.instrument import instrumented, record_error
+from scripts.rendering import new_figure, save_figure
+
+@instrumented
+def analyze_population_and_economics(input_path, output_dir, backend=None):
     """
     Phân tích dữ liệu dân số và các yếu tố kinh tế liên quan.
 
     Args:
-        input_path (str): Đường dẫn file CSV.
+        input_path (str | pd.DataFrame): Đường dẫn file CSV hoặc DataFrame đã nạp sẵn.
         output_dir (str): Thư mục lưu các biểu đồ kết quả.
+        backend (str, optional): Engine tổng hợp theo vùng (xem scripts/backends.py).
     """
-    try:
-        # Đọc dữ liệu
-        data = pd.read_csv(input_path, encoding='utf-8')
-        print("Đọc dữ liệu thành công!")
+    import matplotlib.style as mplstyle  # chỉ nạp khi vẽ biểu đồ
 
-        # Kiểm tra các cột cần thiết
+    try:
+        # Kiểm tra các cột cần thiết (với file chỉ đọc dòng tiêu đề)
         required_columns = ['Year', '15+ labor', 'Population grow ratio', 
                             'Region', 'Average population', 'Population density', 'Sex ratio']
-        missing_columns = [col for col in required_columns if col not in data.columns]
+        columns = pd.read_csv(input_path, nrows=0).columns if isinstance(input_path, str) else input_path.columns
+        missing_columns = [col for col in required_columns if col not in columns]
         if missing_columns:
             print(f"Thiếu các cột sau: {missing_columns}")
             return
@@ -27,27 +33,27 @@ def analyze_population_and_economics(input_path, output_dir):
         # Tạo thư mục lưu trữ kết quả nếu chưa tồn tại
         os.makedirs(output_dir, exist_ok=True)
 
-        # Group data by Region and calculate summary statistics for relevant columns
-        region_summary = data.groupby('Region').agg({
-            'Population density': ['mean', 'min', 'max'],
-            'Average population': ['mean', 'min', 'max'],
-            '15+ labor': ['mean', 'min', 'max'],
-            'Population grow ratio': ['mean', 'min', 'max']
-        }).reset_index()
-
-        region_summary.columns = [
-            'Region', 
-            'Density_mean', 'Density_min', 'Density_max',
-            'Population_mean', 'Population_min', 'Population_max',
-            'Labor_mean', 'Labor_min', 'Labor_max',
-            'Growth_mean', 'Growth_min', 'Growth_max'
-        ]
-
-        # Set up the plotting style
-        plt.style.use('seaborn-darkgrid')
+        # Summary statistics by Region, grouped inside the selected engine (pandas/duckdb/polars)
+        names = {
+            'Population density': 'Density',
+            'Average population': 'Population',
+            '15+ labor': 'Labor',
+            'Population grow ratio': 'Growth',
+        }
+        table = aggregate(input_path, ['Region'], list(names), ['mean', 'min', 'max'], backend=backend)
+        print("Đọc dữ liệu thành công!")
+        region_summary = pd.DataFrame({
+            f"{name}_{stat}": table[(metric, stat)]
+            for metric, name in names.items()
+            for stat in ['mean', 'min', 'max']
+        }).rename_axis('Region').reset_index()
+
+        # Set up the plotting style (tên kiểu 'seaborn-darkgrid' đã đổi từ matplotlib 3.6)
+        style = 'seaborn-v0_8-darkgrid' if 'seaborn-v0_8-darkgrid' in mplstyle.available else 'seaborn-darkgrid'
+        mplstyle.use(style)
 
         # Plotting Population Density by Region
-        fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+        fig, axes = new_figure((16, 12), 2, 2)
 
         # 1. Population Density
         axes[0, 0].bar(region_summary['Region'], region_summary['Density_mean'], color='skyblue')
@@ -74,14 +80,13 @@ def analyze_population_and_economics(input_path, output_dir):
         axes[1, 1].tick_params(axis='x', rotation=45)
 
         # Adjust layout and save the plot
-        plt.tight_layout()
         output_file = os.path.join(output_dir, 'population_analysis.png')
-        plt.savefig(output_file)
-        plt.show()
+        save_figure(fig, output_file, show=True)
 
         print("Phân tích và lưu các biểu đồ hoàn tất!")
 
     except Exception as e:
+        record_error(e)
         print(f"Lỗi trong quá trình phân tích: {e}")
 
 if __name__ == "_main_":
@@ -1,39 +1,44 @@
 # scripts/analyze_trends.py
 import pandas as pd
-import matplotlib.pyplot as plt
 import os
+import sys
 
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.dataset import load_dataset
+from scripts.instrument import instrumented, record_error
+from scripts.rendering import new_figure, save_figure
+
+@instrumented
 def analyze_trends(input_path, output_path):
     """
     Phân tích xu hướng dân số qua các năm.
     
     Args:
-        input_path (str): Đường dẫn dữ liệu đã lọc.
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã lọc hoặc DataFrame đã nạp sẵn.
         output_path (str): Đường dẫn lưu biểu đồ xu hướng.
     """
     try:
-        data = pd.read_csv(input_path, encoding='utf-8')
+        data = load_dataset(input_path)
         print("Đọc dữ liệu thành công cho phân tích xu hướng.")
 
         # Tổng dân số theo năm
         trend_data = data.groupby('Year')['Population grow ratio'].sum().reset_index()
 
         # Vẽ biểu đồ xu hướng
-        plt.figure(figsize=(10,6))
-        plt.plot(trend_data['Year'], trend_data['Population grow ratio'], marker='o', linestyle='-')
-        plt.title("Xu hướng Dân số Việt Nam (2011-2020)")
-        plt.xlabel("Năm")
-        plt.ylabel("Tổng Dân số")
-        plt.grid(True)
-        plt.tight_layout()
+        fig, ax = new_figure((10, 6))
+        ax.plot(trend_data['Year'], trend_data['Population grow ratio'], marker='o', linestyle='-')
+        ax.set_title("Xu hướng Dân số Việt Nam (2011-2020)")
+        ax.set_xlabel("Năm")
+        ax.set_ylabel("Tổng Dân số")
+        ax.grid(True)
 
         # Lưu biểu đồ
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        plt.savefig(output_path)
-        plt.close()
+        save_figure(fig, output_path)
         print(f"Biểu đồ xu hướng đã được lưu tại: {output_path}")
 
     except Exception as e:
+        record_error(e)
         print(f"Lỗi trong quá trình phân tích xu hướng: {e}")
 
 if __name__ == "__main__":
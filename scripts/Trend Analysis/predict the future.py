@@ -1,47 +1,67 @@
-import numpy as np
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error
-import matplotlib.pyplot as plt
-
-def predict_population_linear(input_path):
-    # Đọc dữ liệu
-    data = pd.read_csv(input_path)
+import os
+import sys
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.forecast import FORECAST_CACHE_DIR, ForecastCache, backtest, backtest_summary, forecast
+from scripts.instrument import instrumented
+from scripts.rendering import new_figure, save_figure, show_figure
+
+@instrumented
+def predict_population_linear(input_path, horizon=10, output_path=None, show=False, cache_dir=FORECAST_CACHE_DIR,
+                              evaluate=False):
+    """
+    Dự báo dân số trung bình cho từng tỉnh và từng vùng bằng xu hướng tuyến tính theo năm.
+
+    Tất cả các tỉnh/vùng được khớp cùng lúc (scripts/forecast.py). Thống kê của lần khớp
+    trước được lưu trong cache_dir, nên khi có thêm năm mới chỉ các dòng mới được cộng vào
+    thay vì khớp lại toàn bộ lịch sử. Sai số chỉ được đánh giá khi evaluate=True (backtest
+    theo thời gian: chỉ dùng các năm trước để dự báo năm sau).
+
+    Args:
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        horizon (int): Số năm dự báo.
+        output_path (str, optional): Nếu có, lưu biểu đồ dự báo theo vùng vào đường dẫn này.
+        show (bool): Hiển thị biểu đồ (không có tác dụng ở chế độ batch).
+        cache_dir (str, optional): Thư mục bộ nhớ đệm của mô hình (None để khớp lại từ đầu).
+        evaluate (bool): In sai số MAE/RMSE/MAPE của dự báo một năm tới (backtest).
+
+    Returns:
+        pd.DataFrame: Bảng dự báo (level, series, Year, actual, predicted, is_forecast).
+    """
+    cache = ForecastCache(cache_dir) if cache_dir else None
+    result = forecast(input_path, 'Average population', horizon=horizon, cache=cache)
     print("Dữ liệu đã được đọc thành công.")
-    
-    # Lấy các cột cần thiết
-    X = data['Year'].values.reshape(-1, 1)
-    y = data['Average population'].values.reshape(-1, 1)
-    
-    # Chia dữ liệu thành tập huấn luyện và kiểm tra
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-    
-    # Mô hình hồi quy tuyến tính
-    model = LinearRegression()
-    model.fit(X_train, y_train)
-    
-    # Dự đoán
-    y_pred = model.predict(X_test)
-    print(f"MSE: {mean_squared_error(y_test, y_pred)}")
-    
-    # Dự đoán dân số cho 10 năm tiếp theo
-    future_years = np.arange(data['Year'].max() + 1, data['Year'].max() + 11).reshape(-1, 1)
-    future_population = model.predict(future_years)
-    
-    # Vẽ biểu đồ
-    plt.figure(figsize=(10, 6))
-    plt.scatter(X, y, label='Dữ liệu gốc', color='blue')
-    plt.plot(X_test, y_pred, label='Dự đoán', color='red')
-    plt.plot(future_years, future_population, label='Dự đoán tương lai', linestyle='--', color='green')
-    plt.xlabel('Year')
-    plt.ylabel('Average Population')
-    plt.title('Population Prediction Using Linear Regression')
-    plt.legend()
-    plt.show()
-
-    return future_years, future_population
-
-# Gọi hàm
-input_csv = "data/cleaned/cleaned_population.csv"
-predict_population_linear(input_csv)
+    if cache is not None:
+        cache.save()
+
+    if evaluate:
+        # Sai số dự báo một năm tới, đánh giá theo thời gian
+        errors = backtest_summary(backtest(input_path, 'Average population', horizon=1))
+        for level, row in errors.iterrows():
+            print(f"[{level}] MAE: {row['MAE']:.2f}, RMSE: {row['RMSE']:.2f}, MAPE: {row['MAPE']:.2f}%")
+
+    if output_path is not None or show:
+        # Vẽ biểu đồ: dữ liệu gốc và dự báo của từng vùng
+        regions = result[result['level'] == 'Region']
+        fig, ax = new_figure((10, 6))
+        for region, series in regions.groupby('series', sort=False):
+            history = series[~series['is_forecast']]
+            future = series[series['is_forecast']]
+            line, = ax.plot(history['Year'], history['actual'], marker='o', label=region)
+            ax.plot(future['Year'], future['predicted'], linestyle='--', color=line.get_color())
+        ax.set_xlabel('Year')
+        ax.set_ylabel('Average Population')
+        ax.set_title('Population Prediction Using Linear Regression')
+        ax.legend()
+        if output_path:
+            save_figure(fig, output_path, show=show)
+        else:
+            show_figure(fig)
+
+    return result
+
+if __name__ == "__main__":
+    input_csv = "data/cleaned/cleaned_population.csv"
+    output_png = "outputs/visualizations/Trend Analysis/population_forecast_by_region.png"
+    predict_population_linear(input_csv, output_path=output_png, show=True, evaluate=True)
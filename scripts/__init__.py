@@ -0,0 +1,59 @@
+# scripts/__init__.py
+"""
+Các module phân tích dân số Việt Nam.
+
+Các script phân tích nằm trong các thư mục có khoảng trắng ("Trend Analysis/Trend Analysis.py",
+"predict the future.py"...) nên không import theo đường dẫn thông thường được. Chúng được
+đăng ký dưới các tên trong ANALYSES và chỉ được nạp khi dùng tới:
+
+    from scripts import trend_analysis
+    from scripts.demographics import analyze_demographics
+
+Module này chỉ dùng thư viện chuẩn: import scripts (hoặc scripts.paths, scripts.pipeline)
+không kéo theo pandas, matplotlib hay seaborn.
+"""
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import sys
+
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Tên module -> file script (tính từ thư mục scripts/)
+ANALYSES = {
+    'preprocess': "data processing/preprocess.py",
+    'filter_by_year': "data processing/Filter_data/Year/filter_data_2011.py",
+    'filter_by_region': "data processing/Filter_data/Region/filter_data_Hong river Delta.py",
+    'trend_analysis': "Trend Analysis/Trend Analysis.py",
+    'trend_example': "Trend Analysis/example.py",
+    'predict': "Trend Analysis/predict the future.py",
+    'demographics': "Demographic Analysis/analyze_demographics.py",
+    'economy': "Economic Impact/analyze_economy.py",
+    'economy_summary': "Economic Impact/new.py",
+    'compare_years': "Comparative Analysis/compare_years.py",
+}
+
+
+class _AnalysisFinder(importlib.abc.MetaPathFinder):
+    """Cho phép `import scripts.<tên>` với các tên trong ANALYSES."""
+
+    def find_spec(self, fullname, path=None, target=None):
+        package, _, name = fullname.rpartition('.')
+        if package != __name__ or name not in ANALYSES:
+            return None
+        return importlib.util.spec_from_file_location(fullname, os.path.join(_SCRIPTS_DIR, ANALYSES[name]))
+
+
+if not any(isinstance(finder, _AnalysisFinder) for finder in sys.meta_path):
+    sys.meta_path.append(_AnalysisFinder())
+
+
+def __getattr__(name):
+    if name in ANALYSES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(ANALYSES))
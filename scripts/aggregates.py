@@ -0,0 +1,147 @@
+# scripts/aggregates.py
+import os
+import weakref
+
+import pandas as pd
+
+from scripts.backends import aggregate, get_backend, yoy_names
+from scripts.dataset import load_dataset, save_dataset, widen
+from scripts.paths import cube_path
+
+# Các thống kê được lưu cho mỗi (Year, Region, chỉ số)
+STATS = ['sum', 'mean', 'min', 'max', 'count']
+
+# Cách gộp từng thống kê khi cuộn lên (ví dụ từ Year x Region lên Year)
+_ROLLUP = {'sum': 'sum', 'min': 'min', 'max': 'max', 'count': 'sum'}
+
+# Cube đã tính cho các DataFrame đang có trong bộ nhớ: id -> (weakref, cube)
+_cubes = {}
+
+
+def build_cube(data):
+    """
+    Tính cube tổng hợp Year x Region x chỉ số trong một lần groupby.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số (mỗi dòng là một tỉnh trong một năm).
+
+    Returns:
+        pd.DataFrame: Chỉ mục (Year, Region), cột hai tầng (chỉ số, thống kê)
+                      với các thống kê sum, mean, min, max, count.
+    """
+    metrics = [col for col in data.select_dtypes('number').columns if col != 'Year']
+    grouped = widen(data, ['Year', 'Region'] + metrics).groupby(['Year', 'Region'], observed=True)[metrics]
+    return _complete(grouped.agg(['sum', 'min', 'max', 'count']), metrics)
+
+
+def _complete(cube, metrics):
+    """Thêm mean (= sum / count, để cuộn lên được) và sắp xếp cột theo STATS."""
+    for metric in metrics:
+        cube[(metric, 'mean')] = cube[(metric, 'sum')] / cube[(metric, 'count')]
+    return cube.reindex(columns=pd.MultiIndex.from_product([metrics, STATS]))
+
+
+def scan_cube(path, metrics=None, yoy=None, backend=None):
+    """
+    Tính cube trực tiếp từ file dữ liệu.
+
+    Với backend duckdb/polars (scripts/backends.py), groupby chạy trong engine trên file và
+    chỉ cube nhỏ được đưa về pandas; với pandas thì nạp dữ liệu rồi gọi build_cube.
+
+    Args:
+        path (str): Đường dẫn file CSV đã làm sạch.
+        metrics (list, optional): Các chỉ số (mặc định mọi cột số trừ Year).
+        yoy (list, optional): Tính cube của cột YoY (%) của các chỉ số này thay cho `metrics`.
+        backend (str, optional): Xem backends.get_backend.
+
+    Returns:
+        pd.DataFrame: Cube như build_cube.
+    """
+    if yoy:
+        metrics = yoy_names(yoy)
+    table = aggregate(path, ['Year', 'Region'], metrics, ['sum', 'min', 'max', 'count'], yoy=yoy, backend=backend)
+    return _complete(table, list(pd.unique(table.columns.get_level_values(0))))
+
+
+def cube_to_frame(cube):
+    """Chuyển cube sang dạng bảng dài (Year, Region, metric, các thống kê) để lưu file."""
+    metrics = list(pd.unique(cube.columns.get_level_values(0)))
+    frame = pd.concat({metric: cube[metric] for metric in metrics}, names=['metric']).reset_index()
+    return frame[['Year', 'Region', 'metric'] + STATS]
+
+
+def frame_to_cube(frame):
+    """Chuyển bảng dài đọc từ file về lại dạng cube."""
+    frame = widen(frame)
+    cube = frame.set_index(['Year', 'Region', 'metric'])[STATS].unstack('metric')
+    cube = cube.swaplevel(axis=1)
+    metrics = list(pd.unique(frame['metric']))
+    return cube.reindex(columns=pd.MultiIndex.from_product([metrics, STATS]))
+
+
+def save_cube(cube, csv_path):
+    """Lưu cube cạnh file dữ liệu đã làm sạch (CSV kèm sidecar Feather)."""
+    path = cube_path(csv_path)
+    save_dataset(cube_to_frame(cube), path)
+    return path
+
+
+def get_cube(source, backend=None):
+    """
+    Lấy cube cho một bộ dữ liệu, chỉ tính lại khi cần.
+
+    Với đường dẫn: dùng file cube đã lưu nếu nó không cũ hơn dữ liệu, ngược lại
+    tính từ dữ liệu (trong engine nếu đã chọn backend duckdb/polars, xem scan_cube). Với DataFrame: cube được tính một lần cho mỗi đối tượng.
+
+    Args:
+        source (str | pd.DataFrame): Đường dẫn file CSV hoặc DataFrame đã nạp sẵn.
+        backend (str, optional): Xem backends.get_backend.
+
+    Returns:
+        pd.DataFrame: Cube như build_cube.
+    """
+    if isinstance(source, str):
+        path = cube_path(source)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+            return frame_to_cube(load_dataset(path))
+        if get_backend(backend) != 'pandas':
+            return scan_cube(source, backend=backend)
+        source = load_dataset(source)
+
+    cached = _cubes.get(id(source))
+    if cached is not None and cached[0]() is source:
+        return cached[1]
+    cube = build_cube(source)
+    _cubes[id(source)] = (weakref.ref(source, lambda _, key=id(source), cubes=_cubes: cubes.pop(key, None)), cube)
+    return cube
+
+
+def rollup(cube, level, metric, stat='mean'):
+    """
+    Gộp cube theo một chiều (Year hoặc Region).
+
+    Args:
+        cube (pd.DataFrame): Cube từ build_cube/get_cube.
+        level (str): 'Year' (toàn quốc theo năm) hoặc 'Region' (theo vùng, mọi năm).
+        metric (str): Tên chỉ số, ví dụ 'Average population'.
+        stat (str): Một trong STATS.
+
+    Returns:
+        pd.Series: Giá trị thống kê theo chiều được giữ lại.
+    """
+    values = cube[metric]
+    grouped = values.groupby(level=level, observed=True, sort=False)
+    if stat == 'mean':
+        totals = grouped[['sum', 'count']].sum()
+        return totals['sum'] / totals['count']
+    return grouped[stat].agg(_ROLLUP[stat])
+
+
+def cube_columns(cube):
+    """Tên các cột dữ liệu gốc có trong cube (Year, Region và các chỉ số)."""
+    return list(cube.index.names) + list(pd.unique(cube.columns.get_level_values(0)))
+
+
+def region_year_table(cube, metric, stat='mean'):
+    """Bảng Year x Region của một chỉ số (thay cho groupby(['Year','Region']).mean().unstack())."""
+    return cube[(metric, stat)].unstack('Region')
@@ -0,0 +1,248 @@
+# scripts/backends.py
+import argparse
+import importlib.util
+import os
+import sys
+
+import pandas as pd
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts.dataset import DTYPES, SIDECAR_SUFFIX, load_dataset, region_order, widen
+from scripts.growth import compute_growth, growth_columns
+from scripts.index import PROVINCE_COLUMN, get_index
+from scripts.instrument import count_rows
+
+# Chọn backend qua biến môi trường (main.py --backend): pandas, duckdb, polars hoặc auto
+BACKEND_ENV = "POPULATION_BACKEND"
+BACKENDS = ['pandas', 'duckdb', 'polars']
+
+# Các thống kê tính được trong mọi backend
+AGGREGATIONS = ['sum', 'mean', 'min', 'max', 'count']
+_SQL = {'sum': 'sum', 'mean': 'avg', 'min': 'min', 'max': 'max', 'count': 'count'}
+_DUCKDB_NUMERIC = {'TINYINT', 'SMALLINT', 'INTEGER', 'BIGINT', 'HUGEINT', 'FLOAT', 'DOUBLE'}
+
+_warned = set()
+
+
+def _installed(name):
+    """duckdb/polars là tùy chọn và chỉ được import khi thực sự tổng hợp bằng chúng (import polars mất ~0.25s)."""
+    return importlib.util.find_spec(name) is not None
+
+
+def get_backend(name=None):
+    """
+    Backend dùng để tổng hợp dữ liệu từ file.
+
+    Args:
+        name (str, optional): pandas, duckdb, polars hoặc auto (duckdb nếu đã cài, rồi tới
+                              polars, không có thì pandas). Mặc định lấy từ POPULATION_BACKEND.
+
+    Returns:
+        str: Một trong BACKENDS. Backend chưa được cài thì dùng pandas (kèm một cảnh báo).
+    """
+    name = (name or os.environ.get(BACKEND_ENV) or 'pandas').lower()
+    if name == 'auto':
+        return 'duckdb' if _installed('duckdb') else 'polars' if _installed('polars') else 'pandas'
+    if name not in BACKENDS:
+        raise ValueError(f"Backend không hợp lệ: {name}, chọn trong {BACKENDS + ['auto']}")
+    if name != 'pandas' and not _installed(name):
+        if name not in _warned:
+            _warned.add(name)
+            print(f"Chưa cài {name} (pip install {name}), dùng pandas.")
+        return 'pandas'
+    return name
+
+
+def _filter_values(value):
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _duckdb_source(path):
+    function = "read_parquet" if path.endswith(".parquet") else "read_csv"
+    return f"{function}('{path.replace(chr(39), chr(39) * 2)}')"
+
+
+def _duckdb_aggregate(path, by, metrics, stats, filters, yoy):
+    import duckdb
+
+    connection = duckdb.connect()
+    try:
+        source = _duckdb_source(path)
+        if metrics is None:
+            columns = connection.sql(f"SELECT * FROM {source}")
+            metrics = [name for name, dtype in zip(columns.columns, columns.types)
+                       if name not in by and name != 'Year' and str(dtype) in _DUCKDB_NUMERIC] + yoy_names(yoy)
+
+        # Chỉ đọc các cột cần thiết (projection pushdown); điều kiện lọc được đẩy xuống lúc quét file
+        needed = list(dict.fromkeys(by + [m for m in metrics if m not in yoy_names(yoy)] + list(filters)
+                                    + (['Region', PROVINCE_COLUMN, 'Year'] + list(yoy) if yoy else [])))
+        relation = f"SELECT {', '.join(map(_quote, needed))} FROM {source}"
+        if yoy:
+            # YoY (%): so với năm trước đó của cùng (vùng, tỉnh), cùng khóa và công thức với compute_growth
+            window = f"OVER (PARTITION BY {_quote('Region')}, {_quote(PROVINCE_COLUMN)} ORDER BY {_quote('Year')})"
+            changes = ", ".join(
+                f"({_quote(m)} / lag({_quote(m)}) {window} - 1) * 100 AS {_quote(name)}"
+                for m, name in zip(yoy, yoy_names(yoy)))
+            relation = f"SELECT *, {changes} FROM ({relation})"
+
+        where, params = [], []
+        for col, value in filters.items():
+            values = _filter_values(value)
+            where.append(f"{_quote(col)} IN ({', '.join('?' * len(values))})")
+            params += values
+
+        keys = ", ".join(map(_quote, by))
+        outputs = [(m, stat) for m in metrics for stat in stats]
+        # Tổng của nhóm không có giá trị nào là 0 như pandas/polars (SQL trả về NULL)
+        selects = [(f"coalesce(sum({_quote(m)}), 0)" if stat == 'sum' else f"{_SQL[stat]}({_quote(m)})")
+                   + f" AS c{i}" for i, (m, stat) in enumerate(outputs)]
+        sql = (f"SELECT {keys}, count(*) AS n, {', '.join(selects)} FROM ({relation})"
+               + (f" WHERE {' AND '.join(where)}" if where else "") + f" GROUP BY {keys}")
+        result = connection.execute(sql, params).df()
+    finally:
+        connection.close()
+    return result, outputs
+
+
+def _polars_scan(path):
+    import polars as pl
+
+    if path.endswith(".parquet"):
+        return pl.scan_parquet(path)
+    sidecar = os.path.splitext(path)[0] + SIDECAR_SUFFIX
+    if os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(path):
+        # Sidecar Arrow/Feather của scripts/dataset.py được quét trực tiếp, không phải phân tích CSV
+        return pl.scan_ipc(sidecar)
+    return pl.scan_csv(path)
+
+
+def _polars_aggregate(path, by, metrics, stats, filters, yoy):
+    import polars as pl
+
+    frame = _polars_scan(path)
+    if metrics is None:
+        schema = frame.collect_schema()
+        metrics = [name for name, dtype in schema.items()
+                   if name not in by and name != 'Year' and dtype.is_numeric()] + yoy_names(yoy)
+
+    needed = list(dict.fromkeys(by + [m for m in metrics if m not in yoy_names(yoy)] + list(filters)
+                                + (['Region', PROVINCE_COLUMN, 'Year'] + list(yoy) if yoy else [])))
+    frame = frame.select(needed)
+    # Cột float32 của sidecar được đổi về số thập phân ngắn nhất (như dataset.widen) trước khi tính
+    frame = frame.with_columns([pl.col(name).cast(pl.Utf8).cast(pl.Float64)
+                                for name, dtype in frame.collect_schema().items() if dtype == pl.Float32])
+    if yoy:
+        frame = frame.sort(['Region', PROVINCE_COLUMN, 'Year']).with_columns([
+            ((pl.col(m) / pl.col(m).shift(1).over(['Region', PROVINCE_COLUMN]) - 1) * 100).alias(name)
+            for m, name in zip(yoy, yoy_names(yoy))])
+    for col, value in filters.items():
+        frame = frame.filter(pl.col(col).is_in(_filter_values(value)))
+
+    outputs = [(m, stat) for m in metrics for stat in stats]
+    frame = frame.group_by(by).agg([pl.len().alias('n')] + [
+        getattr(pl.col(m), stat)().alias(f"c{i}") for i, (m, stat) in enumerate(outputs)])
+    # Kết quả đã tổng hợp rất nhỏ, chuyển sang pandas qua dict (không cần pyarrow)
+    result = pd.DataFrame(frame.collect(engine="streaming").to_dict(as_series=False))
+    return result, outputs
+
+
+def _pandas_aggregate(path, by, metrics, stats, filters, yoy):
+    data = load_dataset(path)
+    if yoy:
+        # compute_growth trả về các dòng theo thứ tự (vùng, tỉnh, năm) của chỉ mục
+        data = get_index(data).data
+        growth = compute_growth(data, list(yoy))
+        data = data.assign(**{name: growth[growth_columns(m)[0]].to_numpy() for m, name in zip(yoy, yoy_names(yoy))})
+    if metrics is None:
+        metrics = [col for col in data.select_dtypes('number').columns if col not in by and col != 'Year']
+    mask = pd.Series(True, index=data.index)
+    for col, value in filters.items():
+        mask &= data[col].isin(_filter_values(value))
+    data = widen(data[mask])
+
+    outputs = [(m, stat) for m in metrics for stat in stats]
+    grouped = data.groupby(by, observed=True)
+    result = grouped[metrics].agg(stats)
+    result.columns = [f"c{outputs.index(col)}" for col in result.columns]
+    result.insert(0, 'n', grouped.size())
+    return result.reset_index(), outputs
+
+
+def yoy_names(yoy):
+    """Tên cột YoY (%) của các chỉ số trong `yoy` (như growth_columns)."""
+    return [growth_columns(m)[0] for m in (yoy or [])]
+
+
+def aggregate(path, by, metrics=None, stats=('mean',), filters=None, yoy=None, backend=None):
+    """
+    Groupby/tổng hợp/lọc một file dữ liệu, chỉ đưa kết quả đã tổng hợp về pandas.
+
+    Với backend duckdb (quét CSV/Parquet) hoặc polars (lazy scan_csv/scan_ipc/scan_parquet),
+    việc đọc file, lọc và groupby chạy trong engine trên nhiều lõi, chỉ đọc các cột cần thiết
+    và đẩy điều kiện lọc xuống lúc quét, nên dữ liệu lớn hơn bộ nhớ vẫn tổng hợp được.
+    Backend pandas nạp file bằng load_dataset rồi groupby như trước. Mọi backend cho cùng
+    kết quả (ví dụ sum của nhóm toàn giá trị thiếu là 0).
+
+    Args:
+        path (str | pd.DataFrame): File CSV (hoặc .parquet) của dữ liệu dân số, hoặc DataFrame
+                                   đã nạp sẵn (khi đó luôn dùng pandas).
+        by (list): Các cột nhóm, ví dụ ['Year', 'Region'].
+        metrics (list, optional): Các chỉ số cần tổng hợp (mặc định mọi cột số trừ Year).
+        stats (list): Các thống kê trong AGGREGATIONS.
+        filters (dict, optional): Cột -> giá trị hoặc danh sách giá trị được giữ lại.
+        yoy (list, optional): Thêm cột YoY (%) của các chỉ số này (so với năm trước đó của
+                              cùng tỉnh) trước khi lọc/tổng hợp, đặt tên theo yoy_names.
+        backend (str, optional): Xem get_backend.
+
+    Returns:
+        pd.DataFrame: Chỉ mục là các cột nhóm (đã sắp xếp, Region theo REGIONS),
+                      cột hai tầng (chỉ số, thống kê).
+    """
+    filters = filters or {}
+    unknown = [stat for stat in stats if stat not in AGGREGATIONS]
+    if unknown:
+        raise ValueError(f"Thống kê không hợp lệ: {unknown}, chọn trong {AGGREGATIONS}")
+    run = {'duckdb': _duckdb_aggregate, 'polars': _polars_aggregate, 'pandas': _pandas_aggregate}
+    name = get_backend(backend) if isinstance(path, str) else 'pandas'
+    result, outputs = run[name](path, list(by), metrics, list(stats), filters, yoy)
+    if name != 'pandas':
+        count_rows(rows_in=int(result['n'].sum()))
+
+    # Kiểu và thứ tự của các cột nhóm như khi groupby trên dữ liệu nạp bằng load_dataset
+    for col in by:
+        if DTYPES.get(col) == 'category':
+            categories = sorted(str(value) for value in pd.unique(result[col]) if pd.notna(value))
+            if col == 'Region':
+                categories = region_order(categories)
+            result[col] = pd.Categorical(result[col].astype(object), categories=categories)
+        elif col in DTYPES:
+            result[col] = result[col].astype(DTYPES[col])
+    result = result.sort_values(list(by)).set_index(list(by))
+
+    table = result[[f"c{i}" for i in range(len(outputs))]]
+    table.columns = pd.MultiIndex.from_tuples(outputs)
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tổng hợp một file dữ liệu dân số bằng pandas/duckdb/polars")
+    parser.add_argument("path", help="File CSV hoặc Parquet")
+    parser.add_argument("--by", action="append", default=[], help="Cột nhóm (lặp lại được)")
+    parser.add_argument("--metric", action="append", help="Chỉ số (lặp lại được, mặc định mọi cột số)")
+    parser.add_argument("--stat", action="append", choices=AGGREGATIONS, help="Thống kê (mặc định mean)")
+    parser.add_argument("--where", action="append", default=[], metavar="COL=VALUE",
+                        help="Điều kiện lọc, ví dụ --where Year=2020 --where 'Region=Mekong Delta'")
+    parser.add_argument("--backend", choices=BACKENDS + ['auto'])
+    args = parser.parse_args()
+
+    where = {}
+    for condition in args.where:
+        col, _, value = condition.partition("=")
+        where.setdefault(col, []).append(int(value) if value.lstrip("-").isdigit() else value)
+    print(aggregate(args.path, args.by or ['Region'], args.metric, args.stat or ['mean'], where,
+                    backend=args.backend).to_string())
@@ -0,0 +1,331 @@
+# scripts/benchmark.py
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows không có module resource, khi đó không đo được RSS
+    resource = None
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts.dataset import CLEANED_CSV, load_dataset, save_dataset
+from scripts.pipeline import ROOT_DIR, load_script
+
+# Các mức phóng to mặc định so với bộ dữ liệu gốc (63 tỉnh x 10 năm)
+DEFAULT_SCALES = [10, 100, 1000]
+
+BENCHMARK_DIR = os.path.join("outputs", "benchmarks")
+DATA_DIR = os.path.join(BENCHMARK_DIR, "data")
+
+# Các chỉ số nhân theo quy mô của đơn vị con; các chỉ số còn lại (tỷ lệ) chỉ thêm nhiễu
+SIZE_METRICS = ['Population density', 'Average population', '15+ labor']
+
+# Các hàm được đo: tên -> (file script, tên hàm, hàm tạo tham số từ (đường dẫn dữ liệu, thư mục kết quả))
+ENTRY_POINTS = {
+    'filter_data': (
+        "data processing/Filter_data/Year/filter_data_2011.py", 'filter_data',
+        lambda path, out: (path, os.path.join(out, "filtered_population.csv"), {'Year': 2016})),
+    'analyze_population_density': (
+        "Trend Analysis/Trend Analysis.py", 'analyze_population_density',
+        lambda path, out: (path, out)),
+    'analyze_average_population': (
+        "Trend Analysis/Trend Analysis.py", 'analyze_average_population',
+        lambda path, out: (path, os.path.join(out, "average_population.png"))),
+    'analyze_population_by_region': (
+        "Trend Analysis/Trend Analysis.py", 'analyze_population_by_region',
+        lambda path, out: (path, out)),
+    'analyze_natural_population_growth': (
+        "Trend Analysis/Trend Analysis.py", 'analyze_natural_population_growth',
+        lambda path, out: (path, out)),
+    'analyze_labor_force': (
+        "Trend Analysis/Trend Analysis.py", 'analyze_labor_force',
+        lambda path, out: (path, out)),
+    'analyze_demographics': (
+        "Demographic Analysis/analyze_demographics.py", 'analyze_demographics',
+        lambda path, out: (path, out)),
+    'analyze_population_and_economics': (
+        "Economic Impact/analyze_economy.py", 'analyze_population_and_economics',
+        lambda path, out: (path, out)),
+    'compare_years': (
+        "Comparative Analysis/compare_years.py", 'compare_years',
+        lambda path, out: (path, out)),
+    'predict_population_linear': (
+        "Trend Analysis/predict the future.py", 'predict_population_linear',
+        # Không dùng bộ nhớ đệm của mô hình: đo lần khớp đầy đủ và không ghi đè cache thật
+        lambda path, out: (path, 10, None, False, None)),
+}
+
+
+def scale_shape(scale):
+    """
+    Số đơn vị con trên mỗi tỉnh và hệ số nhân số năm cho một mức phóng to.
+
+    Dữ liệu cấp huyện/xã có nhiều đơn vị hơn là nhiều năm hơn, nên phần lớn mức phóng
+    to nằm ở số đơn vị; số năm chỉ tăng gấp 2 từ mức 100x và gấp 4 từ mức 1000x.
+    """
+    years_factor = 1 if scale < 100 else 2 if scale < 1000 else 4
+    return math.ceil(scale / years_factor), years_factor
+
+
+def make_synthetic(base, scale, seed=0):
+    """
+    Tạo bộ dữ liệu tổng hợp cùng cấu trúc với cleaned_population.csv, lớn hơn `scale` lần.
+
+    Mỗi tỉnh được tách thành nhiều đơn vị con (cùng vùng), mỗi đơn vị có hệ số quy mô
+    riêng; các năm mới nối tiếp xu hướng tuyến tính của từng tỉnh trong dữ liệu gốc.
+
+    Args:
+        base (pd.DataFrame): Dữ liệu gốc (mỗi dòng là một tỉnh trong một năm).
+        scale (int): Mức phóng to (xấp xỉ số dòng kết quả / số dòng gốc).
+        seed (int): Hạt giống ngẫu nhiên.
+
+    Returns:
+        pd.DataFrame: Dữ liệu tổng hợp, sắp theo năm rồi theo đơn vị như dữ liệu gốc.
+    """
+    rng = np.random.default_rng(seed)
+    units, years_factor = scale_shape(scale)
+    metrics = [col for col in base.select_dtypes('number').columns if col != 'Year']
+
+    first_year = int(base['Year'].min())
+    n_years = int(base['Year'].nunique()) * years_factor
+    years = np.arange(first_year, first_year + n_years)
+
+    # Giá trị năm đầu và độ dốc trung bình mỗi năm của từng tỉnh
+    grouped = base.sort_values('Year').groupby('Provinces/city', observed=True, sort=False)
+    first = grouped[metrics].first()
+    last = grouped[metrics].last()
+    span = (grouped['Year'].max() - grouped['Year'].min()).clip(lower=1)
+    slope = (last - first).div(span, axis=0)
+    regions = grouped['Region'].first()
+
+    provinces = first.index
+    n_units = len(provinces) * units
+    names = np.array([f"{province} {i + 1:04d}" for province in provinces for i in range(units)])
+    parent = np.repeat(np.arange(len(provinces)), units)
+
+    frames = []
+    unit_size = rng.lognormal(0.0, 0.3, size=n_units)
+    for year in years:
+        columns = {'Provinces/city': names,
+                   'Region': regions.to_numpy()[parent],
+                   'Year': np.full(n_units, year)}
+        for metric in metrics:
+            trend = (first[metric].to_numpy() + slope[metric].to_numpy() * (year - first_year))[parent]
+            noise = rng.normal(1.0, 0.02, size=n_units)
+            values = trend * noise * (unit_size if metric in SIZE_METRICS else 1.0)
+            columns[metric] = np.round(values, 2)
+        frames.append(pd.DataFrame(columns))
+    return pd.concat(frames, ignore_index=True)[list(base.columns)]
+
+
+def synthetic_path(scale, seed=0, data_dir=DATA_DIR):
+    return os.path.join(data_dir, f"synthetic_x{scale}_seed{seed}.csv")
+
+
+def ensure_synthetic(scale, seed=0, data_dir=DATA_DIR, base_path=CLEANED_CSV):
+    """Tạo (nếu chưa có) bộ dữ liệu tổng hợp cho một mức phóng to và trả về đường dẫn."""
+    path = synthetic_path(scale, seed, data_dir)
+    if not os.path.exists(path):
+        print(f"Tạo dữ liệu tổng hợp x{scale}: {path}")
+        save_dataset(make_synthetic(load_dataset(base_path), scale, seed), path)
+    return path
+
+
+def _peak_rss_mb():
+    """RSS lớn nhất của tiến trình hiện tại (MB), None nếu hệ điều hành không hỗ trợ."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(name, data_path, output_dir, repeat=1):
+    """
+    Đo một hàm trong tiến trình hiện tại (được gọi trong tiến trình con riêng cho mỗi lần đo).
+
+    Returns:
+        dict: Thời gian của từng lần chạy, RSS lớn nhất, và lỗi nếu hàm báo lỗi.
+    """
+    from scripts.rendering import enable_batch_mode
+    enable_batch_mode()
+
+    script, func_name, make_args = ENTRY_POINTS[name]
+    # Import script (và mọi mã chạy lúc import) không tính vào thời gian đo
+    with contextlib.redirect_stdout(io.StringIO()):
+        func = getattr(load_script(script), func_name)
+    baseline_rss = _peak_rss_mb()
+
+    runs, cpu_runs = [], []
+    log = io.StringIO()
+    for _ in range(repeat):
+        start, cpu_start = time.perf_counter(), time.process_time()
+        with contextlib.redirect_stdout(log):
+            func(*make_args(data_path, output_dir))
+        runs.append(time.perf_counter() - start)
+        cpu_runs.append(time.process_time() - cpu_start)
+
+    # Các hàm phân tích tự bắt lỗi và chỉ in ra thông báo "Lỗi ..."
+    errors = [line for line in log.getvalue().splitlines() if line.startswith("Lỗi")]
+    return {
+        'wall_s': runs,
+        'cpu_s': cpu_runs,
+        'baseline_rss_mb': baseline_rss,
+        'peak_rss_mb': _peak_rss_mb(),
+        'error': errors[0] if errors else None,
+    }
+
+
+def _run_isolated(name, data_path, output_dir, repeat):
+    """Chạy run_case trong một tiến trình Python mới để RSS lớn nhất chỉ tính cho hàm đó."""
+    command = [sys.executable, os.path.abspath(__file__), "--case", name,
+               "--data", data_path, "--out", output_dir, "--repeat", str(repeat)]
+    result = subprocess.run(command, capture_output=True, text=True, encoding='utf-8', cwd=ROOT_DIR)
+    if result.returncode != 0:
+        return {'wall_s': [], 'cpu_s': [], 'baseline_rss_mb': None, 'peak_rss_mb': None,
+                'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "exit code %d" % result.returncode}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmarks(scales=DEFAULT_SCALES, entry_points=None, repeat=1, seed=0, data_dir=DATA_DIR):
+    """
+    Chạy toàn bộ benchmark: mỗi (mức phóng to, hàm) trong một tiến trình riêng.
+
+    Args:
+        scales (list): Các mức phóng to, ví dụ [10, 100, 1000].
+        entry_points (list, optional): Tên các hàm cần đo (mặc định tất cả ENTRY_POINTS).
+        repeat (int): Số lần chạy mỗi hàm (lần đầu là đọc nguội, các lần sau dùng bộ nhớ đệm).
+        seed (int): Hạt giống cho dữ liệu tổng hợp.
+        data_dir (str): Thư mục lưu dữ liệu tổng hợp (được dùng lại giữa các lần chạy).
+
+    Returns:
+        dict: Thông tin môi trường và danh sách kết quả.
+    """
+    names = entry_points or list(ENTRY_POINTS)
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        raise ValueError(f"Không có hàm benchmark: {unknown}")
+
+    results = []
+    for scale in scales:
+        data_path = os.path.abspath(ensure_synthetic(scale, seed, data_dir))
+        rows = len(load_dataset(data_path, columns=['Year']))
+        with tempfile.TemporaryDirectory(prefix="benchmark_") as output_dir:
+            for name in names:
+                measured = _run_isolated(name, data_path, output_dir, repeat)
+                best = min(measured['wall_s']) if measured['wall_s'] else None
+                results.append({
+                    'scale': scale,
+                    'rows': rows,
+                    'entry_point': name,
+                    'wall_s': best,
+                    'cold_wall_s': measured['wall_s'][0] if measured['wall_s'] else None,
+                    'runs_s': measured['wall_s'],
+                    'cpu_s': min(measured['cpu_s']) if measured['cpu_s'] else None,
+                    'peak_rss_mb': measured['peak_rss_mb'],
+                    'baseline_rss_mb': measured['baseline_rss_mb'],
+                    'rows_per_s': rows / best if best else None,
+                    'error': measured['error'],
+                })
+                status = f"LỖI: {measured['error']}" if measured['error'] else f"{best:.3f}s"
+                print(f"[x{scale}] {name}: {status}")
+
+    return {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'commit': _git_commit(),
+        },
+        'repeat': repeat,
+        'seed': seed,
+        'results': results,
+    }
+
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=ROOT_DIR)
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def save_results(report, output_path=None):
+    """Lưu kết quả ra file JSON (mặc định outputs/benchmarks/benchmark_<thời gian>.json)."""
+    if output_path is None:
+        output_path = os.path.join(BENCHMARK_DIR, f"benchmark_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return output_path
+
+
+def compare_results(previous, current, threshold=0.1):
+    """
+    So sánh hai lần chạy benchmark và in các hàm chậm đi/nhanh lên hơn `threshold`.
+
+    Args:
+        previous (dict | str): Kết quả cũ (hoặc đường dẫn file JSON).
+        current (dict | str): Kết quả mới (hoặc đường dẫn file JSON).
+        threshold (float): Tỷ lệ thay đổi tối thiểu để báo (0.1 = 10%).
+
+    Returns:
+        list: Các dòng (scale, entry_point, thời gian cũ, thời gian mới, tỷ lệ).
+    """
+    def _load(report):
+        if isinstance(report, str):
+            with open(report, encoding="utf-8") as f:
+                report = json.load(f)
+        return {(r['scale'], r['entry_point']): r['wall_s'] for r in report['results'] if r['wall_s']}
+
+    old, new = _load(previous), _load(current)
+    rows = []
+    for key in sorted(old.keys() & new.keys()):
+        ratio = new[key] / old[key]
+        rows.append((*key, old[key], new[key], ratio))
+        if abs(ratio - 1) >= threshold:
+            label = "chậm hơn" if ratio > 1 else "nhanh hơn"
+            print(f"[x{key[0]}] {key[1]}: {old[key]:.3f}s -> {new[key]:.3f}s ({label} {abs(ratio - 1):.0%})")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark các bước phân tích trên dữ liệu tổng hợp")
+    parser.add_argument("--scales", type=int, nargs="+", default=DEFAULT_SCALES,
+                        help="Các mức phóng to so với dữ liệu gốc (mặc định: 10 100 1000)")
+    parser.add_argument("--only", nargs="+", choices=list(ENTRY_POINTS), help="Chỉ đo các hàm này")
+    parser.add_argument("--repeat", type=int, default=1, help="Số lần chạy mỗi hàm")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="File JSON kết quả")
+    parser.add_argument("--compare", help="File JSON của lần chạy trước để so sánh")
+    # Dùng nội bộ: đo một hàm trong tiến trình con
+    parser.add_argument("--case", help=argparse.SUPPRESS)
+    parser.add_argument("--data", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.data, args.out, args.repeat)))
+    else:
+        report = run_benchmarks(args.scales, args.only, args.repeat, args.seed)
+        print(f"Đã lưu kết quả benchmark: {save_results(report, args.output)}")
+        if args.compare:
+            compare_results(args.compare, report)
@@ -0,0 +1,172 @@
+# scripts/chart_cache.py
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+# Thư mục lưu các biểu đồ đã vẽ, mỗi file đặt tên theo mã băm nội dung của biểu đồ
+CHART_CACHE_DIR = os.path.join("outputs", "chart_cache")
+
+# Dung lượng tối đa của bộ nhớ đệm (MB), có thể đặt qua biến môi trường CHART_CACHE_MB
+DEFAULT_MAX_MB = float(os.environ.get("CHART_CACHE_MB", "200"))
+
+# Đặt CHART_CACHE=0 để luôn vẽ lại
+CACHE_ENV = "CHART_CACHE"
+
+# Mã vẽ biểu đồ cũng là một phần của khóa: sửa rendering.py thì mọi biểu đồ được vẽ lại
+_RENDERING_SOURCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "rendering.py")
+_renderer_digest = None
+
+
+def _renderer_version():
+    global _renderer_digest
+    if _renderer_digest is None:
+        import matplotlib
+
+        digest = hashlib.sha256(matplotlib.__version__.encode())
+        with open(_RENDERING_SOURCE, "rb") as f:
+            digest.update(f.read())
+        _renderer_digest = digest.hexdigest()
+    return _renderer_digest
+
+
+def chart_key(job):
+    """
+    Mã băm nội dung của một biểu đồ: chuỗi số liệu đã tổng hợp, kiểu dáng (tiêu đề, màu,
+    figsize, độ rộng cột...) và phiên bản mã vẽ. Không gồm đường dẫn file, nên hai biểu
+    đồ giống hệt nhau ở hai nơi dùng chung một bản.
+    """
+    spec = {key: value for key, value in job.items() if key != 'output_path'}
+    payload = json.dumps(spec, sort_keys=True, default=list).encode("utf-8")
+    return hashlib.sha256(payload + _renderer_version().encode()).hexdigest()
+
+
+def _place(source, target):
+    """Đặt file `source` tại `target` bằng hard link (không tốn thêm dung lượng), không được thì sao chép."""
+    if os.path.exists(target):
+        os.remove(target)
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+class ChartCache:
+    """
+    Bộ nhớ đệm biểu đồ theo nội dung (content-addressed).
+
+    Biểu đồ có cùng chart_key với một bản đã vẽ thì không vẽ lại: file đích được giữ nguyên
+    nếu đã là bản đó, ngược lại được hard link (hoặc sao chép) từ bộ nhớ đệm. Khi tổng dung
+    lượng vượt max_mb, các bản dùng lâu nhất (theo mtime, cập nhật mỗi lần trúng) bị xóa.
+
+    Args:
+        cache_dir (str): Thư mục lưu các bản đã vẽ.
+        max_mb (float): Dung lượng tối đa (MB).
+    """
+
+    def __init__(self, cache_dir=CHART_CACHE_DIR, max_mb=DEFAULT_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 2 ** 20)
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".png")
+
+    def fetch(self, job):
+        """
+        Đặt bản đã vẽ của job vào job['output_path'] nếu có.
+
+        Returns:
+            bool: True nếu trúng (không cần vẽ lại).
+        """
+        path = self._path(chart_key(job))
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        target = job['output_path']
+        if not (os.path.exists(target) and os.path.samefile(path, target)):
+            _place(path, target)
+        os.utime(path)
+        self.hits += 1
+        return True
+
+    def store(self, job):
+        """Thêm biểu đồ vừa vẽ tại job['output_path'] vào bộ nhớ đệm."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(chart_key(job))
+        tmp_path = path + ".tmp"
+        _place(job['output_path'], tmp_path)
+        os.replace(tmp_path, path)
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".png"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self):
+        """Xóa các bản dùng lâu nhất cho tới khi tổng dung lượng không vượt quá giới hạn."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            # File đích được hard link tới bản này vẫn còn nguyên, chỉ bản trong bộ nhớ đệm bị xóa
+            os.remove(path)
+            total -= size
+            self.evicted += 1
+
+    def clear(self):
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    def stats(self):
+        """Số lần trúng/trượt trong tiến trình này và dung lượng hiện tại của bộ nhớ đệm."""
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else None,
+            'evicted': self.evicted,
+            'entries': len(entries),
+            'size_mb': round(sum(size for _, size, _ in entries) / 2 ** 20, 2),
+            'max_mb': round(self.max_bytes / 2 ** 20, 2),
+        }
+
+
+_default = None
+
+
+def get_chart_cache():
+    """Bộ nhớ đệm dùng chung của render_jobs, None nếu đã tắt bằng CHART_CACHE=0."""
+    global _default
+    if os.environ.get(CACHE_ENV, "1").lower() in ("0", "false"):
+        return None
+    if _default is None:
+        _default = ChartCache()
+    return _default
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Thông tin và dọn dẹp bộ nhớ đệm biểu đồ")
+    parser.add_argument("--dir", default=CHART_CACHE_DIR)
+    parser.add_argument("--max-mb", type=float, default=DEFAULT_MAX_MB)
+    parser.add_argument("--evict", action="store_true", help="Xóa bớt cho tới khi dưới giới hạn dung lượng")
+    parser.add_argument("--clear", action="store_true", help="Xóa toàn bộ bộ nhớ đệm")
+    args = parser.parse_args()
+
+    cache = ChartCache(args.dir, args.max_mb)
+    if args.clear:
+        cache.clear()
+    elif args.evict:
+        cache.evict()
+    print(json.dumps(cache.stats(), indent=2))
@@ -0,0 +1,188 @@
+# scripts/comparison.py
+import numpy as np
+import pandas as pd
+
+from scripts.dataset import load_dataset, widen
+from scripts.index import PROVINCE_COLUMN, get_index
+
+
+def _nanmean(values, axis):
+    """Trung bình bỏ qua NaN (NaN nếu không có giá trị nào, không cảnh báo 'Mean of empty slice')."""
+    valid = ~np.isnan(values)
+    counts = valid.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(valid, values, 0.0).sum(axis=axis) / counts
+
+
+class YearPanel:
+    """
+    Mảng dày (tỉnh x năm x chỉ số) của bộ dữ liệu, dùng để so sánh mọi cặp năm.
+
+    Mảng được tạo một lần (năm thiếu của một tỉnh là NaN); chênh lệch, phần trăm thay đổi
+    và thay đổi thứ hạng của mọi cặp năm được tính cùng lúc bằng broadcasting, thành các
+    mảng (tỉnh x năm đầu x năm cuối x chỉ số).
+
+    Args:
+        data (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        metrics (list, optional): Các chỉ số (mặc định mọi cột số trừ Year).
+    """
+
+    def __init__(self, data, metrics=None):
+        index = get_index(load_dataset(data))
+        data = index.data
+        if metrics is None:
+            metrics = [col for col in data.select_dtypes('number').columns if col != 'Year']
+        self.metrics = list(metrics)
+
+        # Mỗi chuỗi (vùng, tỉnh) của chỉ mục là một hàng, theo thứ tự của chỉ mục: cùng một tên
+        # tỉnh ở hai vùng là hai hàng riêng
+        codes = np.cumsum(index.series_starts) - 1
+        first = np.flatnonzero(index.series_starts)
+        self.provinces = list(data[PROVINCE_COLUMN].astype(object).to_numpy()[first])
+        self.regions = list(data['Region'].astype(object).to_numpy()[first])
+
+        self.years = np.unique(data['Year'].to_numpy())
+        year_pos = np.searchsorted(self.years, data['Year'].to_numpy())
+        self.values = np.full((len(self.provinces), len(self.years), len(self.metrics)), np.nan)
+        self.values[codes, year_pos] = widen(data, self.metrics).to_numpy(dtype=np.float64)
+        self._ranks = None
+
+    @property
+    def labels(self):
+        """Nhãn của mỗi hàng: tên tỉnh, kèm tên vùng nếu tên tỉnh có ở nhiều vùng."""
+        shared = pd.Series(self.provinces).duplicated(keep=False).to_numpy()
+        return [f"{province} ({region})" if dup else province
+                for province, region, dup in zip(self.provinces, self.regions, shared)]
+
+    def _select(self, metric):
+        return self.values if metric is None else self.values[..., [self.metrics.index(metric)]]
+
+    def deltas(self, metric=None):
+        """
+        Chênh lệch từ năm i tới năm j: [tỉnh, i, j, chỉ số] = giá trị năm j - giá trị năm i.
+        Chỉ tính cho `metric` nếu có (mảng có kích thước tỉnh x năm² cho mỗi chỉ số).
+        """
+        values = self._select(metric)
+        return values[:, None, :, :] - values[:, :, None, :]
+
+    def pct_changes(self, metric=None):
+        """Phần trăm thay đổi từ năm i tới năm j (so với giá trị năm i)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return self.deltas(metric) / self._select(metric)[:, :, None, :] * 100
+
+    def ranks(self):
+        """
+        Thứ hạng của mỗi tỉnh trong từng năm và chỉ số (1 = cao nhất, NaN nếu thiếu giá trị).
+        Các giá trị bằng nhau được xếp theo thứ tự tỉnh. Được tính một lần cho mỗi bảng và dùng
+        chung cho pair_table, rank_shifts và rank_shift_table (không sửa mảng trả về).
+        """
+        if self._ranks is not None:
+            return self._ranks
+        missing = np.isnan(self.values)
+        order = np.argsort(np.where(missing, np.inf, -self.values), axis=0, kind='stable')
+        ranks = np.empty(self.values.shape)
+        positions = np.broadcast_to(np.arange(1, len(self.provinces) + 1, dtype=np.float64)[:, None, None], order.shape)
+        np.put_along_axis(ranks, order, positions, axis=0)
+        ranks[missing] = np.nan
+        self._ranks = ranks
+        return ranks
+
+    def rank_shifts(self, metric=None):
+        """Thay đổi thứ hạng từ năm i tới năm j (dương = tăng hạng): hạng năm i - hạng năm j."""
+        ranks = self.ranks()
+        if metric is not None:
+            ranks = ranks[..., [self.metrics.index(metric)]]
+        return ranks[:, :, None, :] - ranks[:, None, :, :]
+
+    def _year_positions(self, years):
+        positions = np.searchsorted(self.years, years)
+        if np.any(positions >= len(self.years)) or np.any(self.years[np.minimum(positions, len(self.years) - 1)] != years):
+            raise ValueError(f"Không có năm trong dữ liệu: {sorted(set(years) - set(self.years.tolist()))}")
+        return positions
+
+    def pair_table(self, pairs=None):
+        """
+        Bảng dạng dài của mọi cặp năm.
+
+        Chỉ các cặp được chọn được tính (tỉnh x số cặp x chỉ số), không tạo mảng năm x năm.
+
+        Args:
+            pairs (list, optional): Các cặp (năm đầu, năm cuối); mặc định mọi cặp năm đầu < năm cuối.
+                                    Với nhiều đơn vị và nhiều năm, nên giới hạn (ví dụ các năm liên tiếp).
+
+        Returns:
+            pd.DataFrame: Region, Provinces/city, From, To, metric, from_value, to_value,
+                          delta, pct_change, from_rank, to_rank, rank_shift (chỉ các dòng có giá trị).
+        """
+        if pairs is None:
+            start, end = np.triu_indices(len(self.years), 1)
+        else:
+            start = self._year_positions(np.array([pair[0] for pair in pairs]))
+            end = self._year_positions(np.array([pair[1] for pair in pairs]))
+
+        ranks = self.ranks()
+        deltas = self.values[:, end] - self.values[:, start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pct = deltas / self.values[:, start] * 100
+        columns = {
+            'from_value': self.values[:, start],
+            'to_value': self.values[:, end],
+            'delta': deltas,
+            'pct_change': pct,
+            'from_rank': ranks[:, start],
+            'to_rank': ranks[:, end],
+            'rank_shift': ranks[:, start] - ranks[:, end],
+        }
+        n_provinces, n_pairs, n_metrics = deltas.shape
+        keep = ~np.isnan(deltas.ravel())
+        # Các cột nhãn được tạo bằng mã category (lặp lại số nguyên, không lặp lại chuỗi)
+        region_codes, regions = pd.factorize(pd.Series(self.regions, dtype=object))
+        name_codes, names = pd.factorize(pd.Series(self.provinces, dtype=object))
+        provinces = np.repeat(np.arange(n_provinces), n_pairs * n_metrics)[keep]
+        return pd.DataFrame({
+            'Region': pd.Categorical.from_codes(region_codes[provinces], regions),
+            PROVINCE_COLUMN: pd.Categorical.from_codes(name_codes[provinces], names),
+            'From': np.tile(np.repeat(self.years[start], n_metrics), n_provinces)[keep],
+            'To': np.tile(np.repeat(self.years[end], n_metrics), n_provinces)[keep],
+            'metric': pd.Categorical.from_codes(np.tile(np.arange(n_metrics), n_provinces * n_pairs)[keep],
+                                                self.metrics),
+            **{name: values.ravel()[keep] for name, values in columns.items()},
+        })
+
+    def change_matrices(self, kind='pct'):
+        """
+        Ma trận năm x năm của thay đổi trung bình (trên các tỉnh) của mỗi chỉ số.
+
+        Args:
+            kind (str): 'pct' (phần trăm thay đổi), 'delta' (chênh lệch) hoặc 'rank' (thay đổi thứ hạng).
+
+        Returns:
+            dict: Chỉ số -> pd.DataFrame (hàng là năm đầu, cột là năm cuối).
+        """
+        changes = {'pct': self.pct_changes, 'delta': self.deltas, 'rank': self.rank_shifts}[kind]
+        years = self.years
+        # Từng chỉ số một, để bộ nhớ chỉ cần một mảng tỉnh x năm x năm
+        return {metric: pd.DataFrame(_nanmean(changes(metric)[..., 0], axis=0), index=pd.Index(years, name='From'),
+                                     columns=pd.Index(years, name='To'))
+                for metric in self.metrics}
+
+    def rank_shift_table(self, start=None, end=None):
+        """
+        Thay đổi thứ hạng của mỗi tỉnh giữa hai năm (mặc định năm đầu và năm cuối của dữ liệu).
+
+        Returns:
+            pd.DataFrame: Region, Provinces/city và một cột cho mỗi chỉ số.
+        """
+        start, end = self._year_positions(np.array([self.years[0] if start is None else start,
+                                                    self.years[-1] if end is None else end]))
+        ranks = self.ranks()
+        shifts = ranks[:, start] - ranks[:, end]
+        table = pd.DataFrame(shifts, columns=self.metrics)
+        table.insert(0, PROVINCE_COLUMN, self.provinces)
+        table.insert(0, 'Region', self.regions)
+        return table
+
+    def yearly_mean(self, metric):
+        """Giá trị trung bình (trên các tỉnh) của một chỉ số theo năm."""
+        return pd.Series(_nanmean(self.values[..., self.metrics.index(metric)], axis=0),
+                         index=pd.Index(self.years, name='Year'), name=metric)
@@ -0,0 +1,156 @@
+# scripts/correlation.py
+import numpy as np
+import pandas as pd
+
+from scripts.dataset import load_dataset, widen
+from scripts.instrument import instrumented
+
+# Các cách nhóm mặc định: toàn bộ dữ liệu, theo vùng, theo năm
+GROUPINGS = [None, 'Region', 'Year']
+
+# Tên nhóm của dòng tính trên toàn bộ dữ liệu
+ALL = 'All'
+
+
+def _segment_sums(values, starts, n_groups, present):
+    """Tổng theo dòng của từng nhóm (các dòng đã sắp theo nhóm), nhóm không có dòng nào là 0."""
+    sums = np.zeros((n_groups,) + values.shape[1:])
+    if len(values):
+        sums[present] = np.add.reduceat(values, starts, axis=0)
+    return sums
+
+
+def _pair_sums(values, codes, n_groups):
+    """
+    Các tổng của mọi cặp cột (x, y) trong từng nhóm, chỉ trên các dòng có cả x và y.
+
+    Các dòng được sắp theo nhóm một lần, rồi mỗi tổng là một phép cộng theo đoạn
+    (np.add.reduceat) của tích từng dòng (dòng x cột x cột), nên bộ nhớ tỷ lệ với số dòng
+    chứ không phải số nhóm x kích thước nhóm lớn nhất.
+
+    Dữ liệu được trừ trung bình của từng cột trong nhóm trước, để các tổng bình phương
+    không mất độ chính xác.
+    """
+    order = np.argsort(codes, kind='stable')
+    codes, values = codes[order], values[order]
+    sizes = np.bincount(codes, minlength=n_groups)
+    present = sizes > 0
+    starts = (np.cumsum(sizes) - sizes)[present]
+
+    valid = ~np.isnan(values)
+    mask = valid.astype(np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        centers = (_segment_sums(np.where(valid, values, 0.0), starts, n_groups, present)
+                   / _segment_sums(mask, starts, n_groups, present))
+    centers = np.nan_to_num(centers)
+    centered = np.where(valid, values - centers[codes], 0.0)
+
+    def cross(a, b):
+        return _segment_sums(a[:, :, None] * b[:, None, :], starts, n_groups, present)
+
+    sums = {
+        'n': cross(mask, mask),
+        'x': cross(centered, mask),
+        'xx': cross(centered ** 2, mask),
+        'xy': cross(centered, centered),
+    }
+    sums['y'] = sums['x'].transpose(0, 2, 1)
+    sums['yy'] = sums['xx'].transpose(0, 2, 1)
+    return sums, centers
+
+
+@instrumented
+def pairwise_stats(data, columns=None, groupings=GROUPINGS):
+    """
+    Tương quan Pearson và hồi quy tuyến tính (OLS) y ~ x của mọi cặp cột số,
+    trên toàn bộ dữ liệu và theo từng nhóm (vùng, năm).
+
+    Mỗi cách nhóm là một lần tính: các dòng được sắp theo nhóm và các tổng của mọi nhóm,
+    mọi cặp cột được cộng theo đoạn cùng lúc. Mỗi cặp chỉ dùng các dòng có đủ cả hai giá trị
+    (như DataFrame.corr).
+
+    Args:
+        data (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        columns (list, optional): Các cột số (mặc định mọi cột số trừ Year).
+        groupings (list): Các cột nhóm; None là toàn bộ dữ liệu.
+
+    Returns:
+        pd.DataFrame: Bảng dạng dài, mỗi dòng là một (cách nhóm, nhóm, x, y) với các cột
+                      n, corr, slope, intercept, r2 (y = intercept + slope * x).
+    """
+    data = load_dataset(data)
+    if columns is None:
+        columns = [col for col in data.select_dtypes('number').columns if col != 'Year']
+    values = widen(data, columns).to_numpy(dtype=np.float64)
+    k = len(columns)
+    x_index, y_index = np.nonzero(~np.eye(k, dtype=bool))
+
+    tables = []
+    for by in groupings:
+        if by is None:
+            codes, groups = np.zeros(len(data), dtype=np.intp), [ALL]
+        else:
+            codes, groups = pd.factorize(data[by], sort=True)
+            groups = [str(group) for group in groups]
+        sums, centers = _pair_sums(values, codes, len(groups))
+
+        n = sums['n']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = sums['xy'] - sums['x'] * sums['y'] / n
+            var_x = sums['xx'] - sums['x'] ** 2 / n
+            var_y = sums['yy'] - sums['y'] ** 2 / n
+            corr = cov / np.sqrt(var_x * var_y)
+            slope = cov / var_x
+            # Trung bình của x, y trên các dòng của cặp, đưa về đơn vị gốc
+            mean_x = sums['x'] / n + centers[:, :, None]
+            mean_y = sums['y'] / n + centers[:, None, :]
+        intercept = mean_y - slope * mean_x
+
+        n_groups = len(groups)
+        tables.append(pd.DataFrame({
+            'group_by': by or ALL,
+            'group': np.repeat(groups, len(x_index)),
+            'x': np.tile(np.asarray(columns, dtype=object)[x_index], n_groups),
+            'y': np.tile(np.asarray(columns, dtype=object)[y_index], n_groups),
+            'n': n[:, x_index, y_index].ravel().astype(np.int64),
+            'corr': corr[:, x_index, y_index].ravel(),
+            'slope': slope[:, x_index, y_index].ravel(),
+            'intercept': intercept[:, x_index, y_index].ravel(),
+            'r2': corr[:, x_index, y_index].ravel() ** 2,
+        }))
+    return pd.concat(tables, ignore_index=True)
+
+
+def correlation_matrix(stats, group=ALL, group_by=None, columns=None):
+    """
+    Ma trận tương quan (như DataFrame.corr) của một nhóm, lấy từ bảng của pairwise_stats.
+
+    Args:
+        stats (pd.DataFrame): Kết quả của pairwise_stats.
+        group (str): Tên nhóm, ví dụ 'Mekong Delta' hoặc '2020' (mặc định toàn bộ dữ liệu).
+        group_by (str, optional): Cách nhóm ('Region', 'Year'); mặc định toàn bộ dữ liệu.
+        columns (list, optional): Chỉ lấy các chỉ số này, theo thứ tự này (mặc định mọi chỉ số).
+    """
+    rows = stats[(stats['group_by'] == (group_by or ALL)) & (stats['group'] == str(group))]
+    if columns is None:
+        columns = list(pd.unique(rows['x']))
+    matrix = rows.pivot(index='x', columns='y', values='corr').reindex(index=columns, columns=columns)
+    values = matrix.to_numpy(copy=True)
+    np.fill_diagonal(values, 1.0)
+    return pd.DataFrame(values, index=columns, columns=columns)
+
+
+def read_stats(path):
+    """Đọc bảng của pairwise_stats đã lưu (tên nhóm luôn là chuỗi, như khi tính)."""
+    stats = load_dataset(path)
+    return stats.assign(group=stats['group'].astype(str))
+
+
+def regression_line(stats, x, y, group=ALL, group_by=None):
+    """Hệ số (intercept, slope, r2) của đường hồi quy y ~ x của một nhóm, lấy từ bảng của pairwise_stats."""
+    rows = stats[(stats['group_by'] == (group_by or ALL)) & (stats['group'] == str(group))
+                 & (stats['x'] == x) & (stats['y'] == y)]
+    if rows.empty:
+        raise KeyError(f"Không có cặp ({x}, {y}) của nhóm {group}")
+    row = rows.iloc[0]
+    return row['intercept'], row['slope'], row['r2']
@@ -1,38 +1,165 @@
 import pandas as pd
 import os
+import sys
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+from scripts.dataset import CATEGORY_COLUMNS, DTYPES, SidecarWriter
+from scripts.instrument import count_rows, instrumented, record_error
+from scripts.paths import quarantine_path, validation_report_path
+from scripts.schema import Validator, print_report, quarantine_rows, save_report
 
 # Đường dẫn tới file CSV gốc
 data_path = os.path.join("data","raw", "vietnam_population_2011_2016.csv")
 output_path = os.path.join("data", "cleaned", "cleaned_population.csv")
 
-# Đọc dữ liệu từ file CSV
-try:
-    data = pd.read_csv(data_path)
-    print("Đọc dữ liệu thành công.")
-except Exception as e:
-    print(f"Lỗi khi đọc file: {e}")
-    exit()
-
-# Kiểm tra cột
-print("Danh sách cột:", data.columns)
-
-# Làm sạch dữ liệu
-try:
-    # Loại bỏ khoảng trắng trong tên cột nếu có
-    data.rename(columns=lambda x: x.strip(), inplace=True)
-
-    # Kiểm tra và chuyển đổi cột 'year' nếu cần
-    if 'year' in data.columns:
-        data['year'] = pd.to_numeric(data['year'], errors='coerce')  # Chuyển về dạng số
-
-    # Kiểm tra giá trị bị thiếu
-    print("Các giá trị bị thiếu:", data.isnull().sum())
-
-    # Điền giá trị bị thiếu
-    data = data.ffill().bfill()
-
-    # Ghi file đã làm sạch
-    data.to_csv(output_path, index=False)
-    print(f"Dữ liệu đã được làm sạch và lưu vào '{output_path}'.")
-except Exception as e:
-    print(f"Lỗi trong quá trình làm sạch dữ liệu: {e}")
+# Cột dùng để điền giá trị thiếu theo từng tỉnh
+PROVINCE_COLUMN = 'Provinces/city'
+
+# Số dòng đọc mỗi lần
+DEFAULT_CHUNKSIZE = 100_000
+
+
+def _read_chunks(raw_path, chunksize):
+    """Đọc file CSV gốc theo từng phần, đã loại bỏ khoảng trắng (chưa chuyển kiểu)."""
+    for chunk in pd.read_csv(raw_path, encoding='utf-8-sig', chunksize=chunksize):
+        # Loại bỏ khoảng trắng trong tên cột và trong các giá trị chữ
+        chunk.rename(columns=lambda x: x.strip(), inplace=True)
+        for col in chunk.select_dtypes(include=['object', 'string']).columns:
+            chunk[col] = chunk[col].str.strip()
+        count_rows(rows_in=len(chunk))
+        yield chunk
+
+
+def _to_numeric(chunk):
+    """Chuyển các cột số (kể cả 'Year'/'year') về dạng số."""
+    numeric_columns = [col for col, dtype in DTYPES.items() if dtype != 'category']
+    return chunk.assign(**{col: pd.to_numeric(chunk[col], errors='coerce') for col in chunk.columns
+                           if col in numeric_columns or col.lower() == 'year'})
+
+
+def _scan(raw_path, chunksize):
+    """
+    Lượt đọc thứ nhất: kiểm tra từng chunk theo schema (scripts/schema.py), rồi trên các
+    dòng hợp lệ tính giá trị hợp lệ đầu tiên của mỗi tỉnh (để điền ngược), danh sách
+    category và số giá trị bị thiếu của từng cột.
+
+    Returns:
+        tuple: (first_values, categories, missing, chỉ mục các dòng bị loại,
+                các dòng bị loại kèm cột 'violations', báo cáo kiểm tra).
+    """
+    first_values = None
+    categories = {}
+    missing = None
+    validator = Validator()
+    rejected, quarantined = [], []
+    for chunk in _read_chunks(raw_path, chunksize):
+        violations = validator.check(chunk)
+        bad = violations.any(axis=1).to_numpy()
+        if bad.any():
+            rejected.append(chunk.index[bad])
+            quarantined.append(quarantine_rows(chunk, violations))
+            chunk = chunk.loc[~bad]
+        chunk = _to_numeric(chunk)
+
+        missing = chunk.isnull().sum() if missing is None else missing.add(chunk.isnull().sum(), fill_value=0)
+
+        first = chunk.groupby(PROVINCE_COLUMN, dropna=False, sort=False).first()
+        first_values = first if first_values is None else first_values.combine_first(first)
+
+        for col in CATEGORY_COLUMNS:
+            if col in chunk.columns:
+                seen = categories.setdefault(col, {})
+                seen.update(dict.fromkeys(chunk[col].dropna().unique()))
+    categories = {col: list(values) for col, values in categories.items()}
+    rejected = rejected[0].append(rejected[1:]) if rejected else pd.Index([])
+    quarantined = pd.concat(quarantined) if quarantined else None
+    return first_values, categories, missing, rejected, quarantined, validator.report(len(rejected))
+
+
+@instrumented
+def clean_data(raw, cleaned, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Làm sạch dữ liệu dân số theo từng phần (chunk) để xử lý được file lớn hơn RAM.
+
+    Giá trị thiếu được điền theo từng tỉnh: điền xuôi (ffill) bằng giá trị trước đó
+    của cùng tỉnh, kể cả khi giá trị đó nằm ở chunk trước, sau đó các giá trị thiếu ở
+    đầu mỗi tỉnh được điền ngược (bfill) bằng giá trị hợp lệ đầu tiên của tỉnh đó.
+    Kết quả giống với groupby(tỉnh).ffill().bfill() trên toàn bộ dữ liệu.
+
+    Trước khi điền, mỗi dòng được kiểm tra theo schema (kiểu dữ liệu, vùng hợp lệ, khoảng
+    giá trị hợp lý, mỗi tỉnh một dòng mỗi năm) ở lượt đọc thứ nhất. Dòng vi phạm không
+    được ghi vào file đã làm sạch mà được đưa sang file *_quarantine.csv, kèm báo cáo
+    *_validation.json; các bước sau nhận dữ liệu đã đúng schema.
+
+    Args:
+        raw (str): Đường dẫn file CSV gốc.
+        cleaned (str): Đường dẫn lưu file CSV đã làm sạch (kèm sidecar Feather).
+        chunksize (int): Số dòng đọc mỗi lần.
+    """
+    try:
+        first_values, categories, missing, rejected, quarantined, report = _scan(raw, chunksize)
+        print("Đọc dữ liệu thành công.")
+    except Exception as e:
+        record_error(e)
+        print(f"Lỗi khi đọc file: {e}")
+        return
+
+    # Báo cáo kiểm tra và các dòng bị loại (file luôn được ghi để không còn bản của lần chạy trước)
+    print_report(report)
+    save_report(report, validation_report_path(cleaned))
+    if quarantined is None:
+        quarantined = pd.DataFrame(columns=list(missing.index) + ['violations'])
+    os.makedirs(os.path.dirname(cleaned) or ".", exist_ok=True)
+    quarantined.to_csv(quarantine_path(cleaned), index=False, encoding='utf-8')
+
+    # Kiểm tra cột và giá trị bị thiếu
+    print("Danh sách cột:", list(missing.index))
+    print("Các giá trị bị thiếu:", missing.astype(int))
+
+    # Các chunk được ghi vào file tạm, chỉ thay thế file đã làm sạch khi mọi chunk thành công
+    # (như SidecarWriter), để một lần chạy lỗi giữa chừng không để lại file bị cắt cụt
+    tmp_path = cleaned + ".tmp"
+    try:
+        carry = None  # giá trị cuối cùng của mỗi tỉnh ở các chunk trước
+        header = True
+        with SidecarWriter(cleaned, categories) as sidecar:
+            for chunk in _read_chunks(raw, chunksize):
+                # Bỏ các dòng đã bị loại ở lượt đọc thứ nhất (không kiểm tra lại)
+                if len(rejected):
+                    chunk = chunk.loc[~chunk.index.isin(rejected)]
+                chunk = _to_numeric(chunk)
+                provinces = chunk[PROVINCE_COLUMN]
+                columns = [col for col in chunk.columns if col != PROVINCE_COLUMN]
+
+                # Điền xuôi trong chunk, rồi điền phần đầu chunk bằng giá trị mang sang
+                filled = chunk.groupby(PROVINCE_COLUMN, dropna=False, sort=False)[columns].ffill()
+                if carry is not None:
+                    filled = filled.fillna(carry.reindex(provinces)[columns].set_axis(chunk.index))
+
+                # Phần còn thiếu là các dòng đầu tiên của tỉnh: điền ngược bằng giá trị hợp lệ đầu tiên
+                filled = filled.fillna(first_values.reindex(provinces)[columns].set_axis(chunk.index))
+
+                last = filled.groupby(provinces, dropna=False, sort=False).last()
+                carry = last if carry is None else last.combine_first(carry)
+
+                chunk = chunk.assign(**{col: filled[col] for col in columns})
+
+                # Ghi file đã làm sạch (kèm bản Feather để các bước sau đọc nhanh)
+                chunk.to_csv(tmp_path, index=False, encoding='utf-8', mode='w' if header else 'a', header=header)
+                sidecar.write(chunk)
+                count_rows(rows_out=len(chunk))
+                header = False
+
+        # Sidecar được thay thế trước nên không cũ hơn CSV (os.replace giữ mtime của file tạm)
+        os.replace(tmp_path, cleaned)
+        print(f"Dữ liệu đã được làm sạch và lưu vào '{cleaned}'.")
+    except Exception as e:
+        record_error(e)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        print(f"Lỗi trong quá trình làm sạch dữ liệu: {e}")
+
+
+if __name__ == "__main__":
+    clean_data(data_path, output_path)
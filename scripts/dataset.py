@@ -0,0 +1,397 @@
+# scripts/dataset.py
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow là tùy chọn, không có thì chỉ dùng CSV
+    pa = None
+    feather = None
+
+from scripts.instrument import count_rows
+from scripts.paths import CLEANED_CSV  # đường dẫn mặc định tới dữ liệu đã làm sạch
+
+# Đuôi file nhị phân dạng cột (Arrow/Feather) đi kèm mỗi file CSV
+SIDECAR_SUFFIX = ".feather"
+
+# Các vùng theo thứ tự địa lý (Bắc -> Nam), dùng làm thứ tự cho cột Region
+REGIONS = [
+    "Hong river Delta",
+    "Midlands and northern mountains",
+    "North Central and Central Coast",
+    "Highlands",
+    "South East",
+    "Mekong Delta",
+]
+
+CATEGORY_COLUMNS = ['Provinces/city', 'Region']
+METRIC_COLUMNS = ['Population density', 'Average population', 'Sex ratio',
+                  'Population grow ratio', '15+ labor']
+
+# Tên cột tỷ lệ lao động (15+ labor / Average population), như trong exploration.ipynb
+LABOR_RATE = 'Labor_rate (%)'
+
+# Kiểu dữ liệu cố định cho từng cột của bộ dữ liệu dân số
+DTYPES = {
+    'Provinces/city': 'category',
+    'Region': 'category',
+    'Year': 'int16',
+    **{col: 'float32' for col in METRIC_COLUMNS},
+}
+
+# float32 phân biệt được mọi giá trị của nó với 9 chữ số có nghĩa; giá trị có không quá 7 chữ số
+# có nghĩa (mọi số liệu đọc từ CSV) luôn đọc lại đúng
+FLOAT32_DIGITS = (7, 8, 9)
+# Các cột ngoài DTYPES: cột chữ có số giá trị khác nhau / số dòng không quá ngưỡng này thì dùng category
+CATEGORY_MAX_RATIO = 0.5
+
+# Bộ nhớ đệm: (đường dẫn tuyệt đối, các cột) -> ((mtime, size), DataFrame)
+_cache = {}
+
+
+def _order_categories(data):
+    """Sắp xếp category theo thứ tự xuất hiện (Region theo thứ tự REGIONS)."""
+    for col in CATEGORY_COLUMNS:
+        if col not in data.columns or not isinstance(data[col].dtype, pd.CategoricalDtype):
+            continue
+        values = data[col]
+        codes = pd.unique(values.cat.codes)
+        order = list(values.cat.categories[codes[codes >= 0]])
+        order += [c for c in values.cat.categories if c not in set(order)]
+        if col == 'Region':
+            order = region_order(order)
+        data[col] = values.cat.reorder_categories(order)
+    return data
+
+
+def region_order(regions):
+    """Sắp xếp danh sách vùng theo REGIONS, các vùng lạ giữ nguyên thứ tự ở cuối."""
+    return [r for r in REGIONS if r in regions] + [r for r in regions if r not in REGIONS]
+
+
+def downcast(values):
+    """
+    Kiểu gọn nhất cho một cột không có trong DTYPES.
+
+    Số nguyên được hạ xuống kiểu nhỏ nhất chứa được, số thực xuống float32 nếu as_float64
+    đọc lại đúng từng giá trị (số liệu thập phân ngắn, không phải kết quả tính toán), và cột
+    chữ lặp lại nhiều thành category.
+    """
+    dtype = values.dtype
+    if isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_bool_dtype(dtype):
+        return values
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(values, downcast='integer')
+    if pd.api.types.is_float_dtype(dtype):
+        if dtype == np.float32:
+            return values
+        compact = values.astype(np.float32)
+        if np.array_equal(as_float64(compact), values.to_numpy(np.float64), equal_nan=True):
+            return compact
+        return values
+    if pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+        if values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+            return values.astype('category')
+    return values
+
+
+def _round_significant(values, digits):
+    """Làm tròn mỗi giá trị về `digits` chữ số có nghĩa (kết quả là số float64 gần nhất)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    exponent = np.where(np.isfinite(magnitude), digits - 1 - magnitude, 0)
+    scale = 10.0 ** np.abs(exponent)
+    with np.errstate(over='ignore', invalid='ignore'):
+        return np.where(exponent >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale)
+
+
+def as_float64(values):
+    """
+    Giá trị float64 của một cột/mảng số, dùng trước khi tính toán hoặc xuất kết quả.
+
+    Giá trị float32 (các chỉ số của load_dataset) được đổi về số thập phân ngắn nhất có cùng
+    giá trị float32, như khi in ra: 6761.3 thay vì 6761.2998046875. Nhờ vậy kết quả tính
+    toán và file xuất ra giống như khi tính trên dữ liệu float64 đọc từ CSV.
+
+    Args:
+        values (pd.Series | np.ndarray): Cột hoặc mảng số.
+
+    Returns:
+        np.ndarray: Mảng float64 cùng kích thước.
+    """
+    values = np.asarray(values)
+    if values.dtype != np.float32:
+        return values.astype(np.float64)
+    wide = values.astype(np.float64)
+    result = wide.copy()
+    pending = np.isfinite(wide) & (wide != 0)
+    for digits in FLOAT32_DIGITS:
+        if not pending.any():
+            break
+        rounded = _round_significant(wide, digits)
+        done = pending & (rounded.astype(np.float32) == values)
+        result[done] = rounded[done]
+        pending &= ~done
+    return result
+
+
+def widen(data, columns=None):
+    """
+    Bản DataFrame với các cột float32 đổi sang float64 bằng as_float64 (các cột khác giữ nguyên).
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dạng gọn (ví dụ kết quả của load_dataset).
+        columns (list, optional): Chỉ lấy các cột này, theo thứ tự này.
+    """
+    if columns is not None:
+        data = data[list(columns)]
+    narrow = [col for col in data.columns if data[col].dtype == np.float32]
+    if not narrow:
+        return data
+    return data.assign(**{col: as_float64(data[col]) for col in narrow})
+
+
+def add_labor_rate(data):
+    """Bản DataFrame kèm cột LABOR_RATE (%), tính trên giá trị float64 của hai cột gốc."""
+    labor_rate = as_float64(data['15+ labor']) / as_float64(data['Average population']) * 100
+    return data.assign(**{LABOR_RATE: labor_rate})
+
+
+def apply_dtypes(data, categories=None):
+    """
+    Ép DataFrame về dạng gọn (trả về bản mới, không sao chép các cột đã đúng kiểu).
+
+    Các cột trong DTYPES dùng kiểu cố định (category, int16, float32); các cột khác
+    được hạ kiểu bằng downcast(). Khi ghi theo nhiều phần (có categories) thì chỉ ép
+    các cột trong DTYPES, để mọi phần có cùng schema.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu cần ép kiểu.
+        categories (dict, optional): Danh sách category cố định cho từng cột category,
+                                     dùng khi dữ liệu được ghi thành nhiều phần.
+    """
+    data = data.copy(deep=False)
+    for col in data.columns:
+        dtype = DTYPES.get(col)
+        if categories and col in categories:
+            data[col] = pd.Categorical(data[col], categories=categories[col])
+        elif dtype is not None and str(data[col].dtype) != dtype:
+            data[col] = data[col].astype(dtype)
+        elif dtype is None and not categories:
+            data[col] = downcast(data[col])
+    return data if categories else _order_categories(data)
+
+
+def memory_report(data, baseline=None):
+    """
+    Bộ nhớ của từng cột (tính cả chuỗi ký tự) và tổng, tùy chọn so với một bản khác.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu cần đo.
+        baseline (pd.DataFrame, optional): Cùng dữ liệu ở dạng khác (ví dụ pd.read_csv mặc định).
+
+    Returns:
+        pd.DataFrame: Các cột dtype, bytes, bytes_per_row (và baseline_*, ratio nếu có baseline),
+                      dòng cuối 'Tổng' là tổng của cả bảng.
+    """
+    rows = max(len(data), 1)
+    usage = data.memory_usage(index=False, deep=True)
+    report = pd.DataFrame({'dtype': data.dtypes.astype(str), 'bytes': usage})
+    if baseline is not None:
+        base_usage = baseline.memory_usage(index=False, deep=True)
+        report['baseline_dtype'] = baseline.dtypes.astype(str).reindex(report.index)
+        report['baseline_bytes'] = base_usage.reindex(report.index)
+    report.loc['Tổng', 'bytes'] = usage.sum()
+    report['bytes_per_row'] = report['bytes'] / rows
+    if baseline is not None:
+        report.loc['Tổng', 'baseline_bytes'] = report['baseline_bytes'].iloc[:-1].sum()
+        report['ratio'] = report['baseline_bytes'] / report['bytes']
+    return report
+
+
+def sidecar_path(csv_path):
+    """Đường dẫn file Feather đi kèm một file CSV."""
+    return os.path.splitext(csv_path)[0] + SIDECAR_SUFFIX
+
+
+def _fresh_sidecar(csv_path):
+    """Trả về đường dẫn sidecar nếu nó tồn tại và không cũ hơn file CSV."""
+    if feather is None:
+        return None
+    path = sidecar_path(csv_path)
+    if not os.path.exists(path):
+        return None
+    if os.path.exists(csv_path) and os.path.getmtime(path) < os.path.getmtime(csv_path):
+        return None
+    return path
+
+
+def write_sidecar(data, csv_path):
+    """
+    Ghi bản nhị phân dạng cột (Feather, không nén) cạnh file CSV.
+
+    Các cột category được lưu dưới dạng dictionary-encoded, và vì file không nén
+    nên có thể đọc lại bằng memory mapping.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu cần ghi.
+        csv_path (str): Đường dẫn file CSV tương ứng.
+
+    Returns:
+        str | None: Đường dẫn sidecar, hoặc None nếu không có pyarrow.
+    """
+    if feather is None:
+        return None
+    path = sidecar_path(csv_path)
+    table = pa.Table.from_pandas(apply_dtypes(data), preserve_index=False)
+    feather.write_feather(table, path, compression='uncompressed')
+    return path
+
+
+class SidecarWriter:
+    """
+    Ghi sidecar Feather theo từng phần (dùng khi dữ liệu được xử lý theo chunk).
+
+    Category của các cột category phải biết trước để mọi phần dùng chung một
+    dictionary. File được ghi ra file tạm và chỉ thay thế sidecar cũ khi close().
+
+    Args:
+        csv_path (str): Đường dẫn file CSV tương ứng.
+        categories (dict): Tên cột category -> danh sách category.
+    """
+
+    def __init__(self, csv_path, categories):
+        self.path = sidecar_path(csv_path)
+        self.categories = {col: region_order(values) if col == 'Region' else list(values)
+                           for col, values in categories.items()}
+        self._tmp_path = self.path + ".tmp"
+        self._writer = None
+
+    def write(self, chunk):
+        if feather is None:
+            return
+        table = pa.Table.from_pandas(apply_dtypes(chunk, self.categories), preserve_index=False)
+        if self._writer is None:
+            self._writer = pa.ipc.new_file(self._tmp_path, table.schema)
+        self._writer.write_table(table)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            os.replace(self._tmp_path, self.path)
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        elif self._writer is not None:
+            self._writer.close()
+            os.remove(self._tmp_path)
+            self._writer = None
+
+
+def save_dataset(data, csv_path):
+    """Ghi dữ liệu ra file CSV và sidecar Feather đi kèm."""
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    data.to_csv(csv_path, index=False, encoding='utf-8')
+    write_sidecar(data, csv_path)
+    count_rows(rows_out=len(data))
+
+
+def _read_sidecar(path, columns):
+    """
+    Đọc sidecar qua memory map, chỉ các cột được chọn (chọn ở mức Arrow, trước khi chuyển sang pandas).
+
+    Với split_blocks mỗi cột là một khối riêng nên pandas không gộp (sao chép) các cột cùng kiểu:
+    cột số không có giá trị thiếu và mã của cột category là các mảng chỉ đọc trỏ thẳng vào
+    file đã map (zero-copy), chỉ được nạp vào bộ nhớ khi thực sự được đọc. Vẫn phải sao chép:
+    cột có giá trị null (điền NaN), cột gồm nhiều phần (sidecar ghi theo nhiều chunk bởi
+    SidecarWriter) và danh sách category (nhỏ).
+    """
+    with pa.memory_map(path) as source:
+        names = pa.ipc.open_file(source).schema.names
+    if columns is not None:
+        columns = [col for col in columns if col in names]
+    table = feather.read_table(path, columns=columns, memory_map=True)
+    return table.to_pandas(split_blocks=True, self_destruct=True)
+
+
+def _read_csv(path, columns):
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda col: col.strip() in wanted
+    data = pd.read_csv(path, encoding='utf-8', dtype=DTYPES, usecols=usecols)
+    data.rename(columns=lambda x: x.strip(), inplace=True)
+    return data
+
+
+def load_dataset(source=CLEANED_CSV, columns=None):
+    """
+    Đọc bộ dữ liệu dân số một lần duy nhất và giữ trong bộ nhớ.
+
+    Nếu có file Feather đi kèm và không cũ hơn CSV thì đọc từ Feather (memory map, các
+    cột không thiếu giá trị trỏ thẳng vào file, xem _read_sidecar), ngược lại mới phân tích file CSV. Kết quả được lưu đệm theo (đường dẫn, mtime,
+    kích thước) của file, nên các hàm phân tích gọi lại với cùng một file sẽ không
+    phải đọc lại. DataFrame trả về được dùng chung, các hàm gọi không được sửa trực tiếp.
+
+    Args:
+        source (str | pd.DataFrame): Đường dẫn file CSV hoặc DataFrame đã nạp sẵn.
+        columns (list, optional): Chỉ đọc các cột này (bỏ qua các cột không có trong file).
+
+    Returns:
+        pd.DataFrame: Dữ liệu dạng gọn (xem apply_dtypes): Region/Provinces/city dạng
+                      category, Year dạng int16 và các chỉ số dạng float32 (dùng widen/as_float64
+                      trước khi tính toán).
+    """
+    if isinstance(source, pd.DataFrame):
+        return source
+
+    csv_path = os.path.abspath(source)
+    path = _fresh_sidecar(csv_path) or csv_path
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    wanted = tuple(columns) if columns is not None else None
+
+    cached = _cache.get((csv_path, wanted))
+    if cached is not None and cached[0] == key:
+        count_rows(rows_in=len(cached[1]))
+        return cached[1]
+
+    # Đã có toàn bộ dữ liệu trong bộ nhớ thì chỉ cần lấy ra các cột cần thiết
+    full = _cache.get((csv_path, None))
+    if wanted is not None and full is not None and full[0] == key:
+        data = full[1][[col for col in wanted if col in full[1].columns]]
+    elif path == csv_path:
+        data = apply_dtypes(_read_csv(path, wanted))
+    else:
+        data = apply_dtypes(_read_sidecar(path, wanted))
+
+    _cache[(csv_path, wanted)] = (key, data)
+    count_rows(rows_in=len(data))
+    return data
+
+
+def clear_cache():
+    """Xóa toàn bộ dữ liệu đã lưu đệm."""
+    _cache.clear()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Báo cáo bộ nhớ của bộ dữ liệu ở dạng gọn so với pd.read_csv mặc định")
+    parser.add_argument("path", nargs="?", default=CLEANED_CSV)
+    args = parser.parse_args()
+
+    report = memory_report(load_dataset(args.path), baseline=pd.read_csv(args.path, encoding='utf-8'))
+    with pd.option_context('display.width', 200, 'display.max_columns', None):
+        print(report)
+    total = report.loc['Tổng']
+    print(f"Bộ nhớ mỗi dòng: {total['baseline_bytes'] / max(len(load_dataset(args.path)), 1):.1f} -> "
+          f"{total['bytes_per_row']:.1f} byte (giảm {total['ratio']:.1f} lần)")
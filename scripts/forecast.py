@@ -0,0 +1,332 @@
+# scripts/forecast.py
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from scripts.dataset import load_dataset, widen
+from scripts.instrument import instrumented
+
+# Các cấp dự báo mặc định: từng tỉnh và từng vùng
+DEFAULT_LEVELS = ('Provinces/city', 'Region')
+
+# Cột của bảng dự báo trả về
+FORECAST_COLUMNS = ['level', 'series', 'Year', 'actual', 'predicted', 'is_forecast']
+
+# Thư mục lưu thống kê đủ của các mô hình dự báo
+FORECAST_CACHE_DIR = os.path.join("outputs", "forecast_cache")
+
+
+def series_table(data, metric, by, agg='sum'):
+    """
+    Bảng năm x chuỗi của một chỉ số (mỗi cột là một tỉnh hoặc một vùng).
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số.
+        metric (str): Chỉ số cần dự báo, ví dụ 'Average population'.
+        by (str): 'Provinces/city' hoặc 'Region'.
+        agg (str): Cách gộp các tỉnh khi by là vùng (mặc định cộng dồn).
+
+    Returns:
+        pd.DataFrame: Chỉ mục là Year (tăng dần), cột là tên chuỗi, NaN nếu thiếu năm.
+    """
+    table = widen(data, ['Year', by, metric]).groupby(['Year', by], observed=True)[metric].agg(agg).unstack(by)
+    return table.sort_index().astype(np.float64)
+
+
+def _design(years, origin, degree):
+    """Ma trận thiết kế đa thức [1, t, t^2, ...] với t = năm - origin."""
+    t = np.asarray(years, dtype=np.float64) - origin
+    return np.vander(t, degree + 1, increasing=True)
+
+
+def normal_equations(years, values, origin, degree=1):
+    """
+    Thống kê đủ của bài toán bình phương tối thiểu cho mỗi chuỗi: X^T W X và X^T W y.
+
+    Các thống kê này cộng dồn được theo dòng (năm), nên khi có thêm năm mới chỉ cần
+    cộng phần của các năm mới vào (với bậc 1 đây chính là các tổng n, x, y, xy, x^2).
+
+    Args:
+        years (array): Các năm (độ dài T).
+        values (array): Ma trận T x S giá trị (NaN là thiếu dữ liệu).
+        origin (float): Năm gốc để tính t.
+        degree (int): Bậc đa thức.
+
+    Returns:
+        tuple: (gram dạng S x (bậc + 1) x (bậc + 1), rhs dạng S x (bậc + 1)).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    X = _design(years, origin, degree)
+    weights = ~np.isnan(values)
+    y = np.where(weights, values, 0.0)
+    gram = np.einsum('ti,ts,tj->sij', X, weights.astype(np.float64), X)
+    rhs = np.einsum('ti,ts->si', X, y)
+    return gram, rhs
+
+
+def year_terms(years, values, origin, degree=1):
+    """
+    Phần của từng năm trong thống kê đủ của normal_equations (tổng theo năm của kết quả
+    này chính là normal_equations), dùng để lấy thống kê của mọi tiền tố năm bằng cumsum.
+
+    Returns:
+        tuple: (gram dạng T x S x (bậc + 1) x (bậc + 1), rhs dạng T x S x (bậc + 1)).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    X = _design(years, origin, degree)
+    weights = ~np.isnan(values)
+    y = np.where(weights, values, 0.0)
+    gram = np.einsum('ti,ts,tj->tsij', X, weights.astype(np.float64), X)
+    rhs = np.einsum('ti,ts->tsi', X, y)
+    return gram, rhs
+
+
+def solve_normal_equations(gram, rhs):
+    """Hệ số S x (bậc + 1) từ thống kê đủ; NaN với chuỗi không đủ điểm."""
+    degree = gram.shape[-1] - 1
+    # gram[s, 0, 0] là số năm có dữ liệu của chuỗi s; ít điểm hơn số hệ số thì ma trận
+    # suy biến: giải với ma trận đơn vị rồi bỏ kết quả
+    enough = gram[:, 0, 0] > degree
+    gram = np.where(enough[:, None, None], gram, np.eye(degree + 1))
+    coefs = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    coefs[~enough] = np.nan
+    return coefs
+
+
+def fit_trends(years, values, degree=1, origin=None):
+    """
+    Khớp xu hướng đa thức cho tất cả các chuỗi cùng lúc bằng một bài toán bình phương tối thiểu.
+
+    Mỗi chuỗi s có phương trình chuẩn (X^T W_s X) b_s = X^T W_s y_s, với W_s đánh dấu
+    các năm có dữ liệu. Các ma trận này được tính chung bằng einsum và giải một lần bằng
+    np.linalg.solve trên mảng (số chuỗi, bậc + 1, bậc + 1), không lặp qua từng chuỗi.
+
+    Args:
+        years (array): Các năm (độ dài T).
+        values (array): Ma trận T x S giá trị (NaN là thiếu dữ liệu).
+        degree (int): Bậc đa thức (1 = tuyến tính).
+        origin (float, optional): Năm gốc để tính t (mặc định năm đầu tiên).
+
+    Returns:
+        tuple: (hệ số dạng S x (bậc + 1), origin). Hệ số là NaN với chuỗi không đủ điểm.
+    """
+    origin = float(np.min(years)) if origin is None else origin
+    gram, rhs = normal_equations(years, values, origin, degree)
+    return solve_normal_equations(gram, rhs), origin
+
+
+class ForecastCache:
+    """
+    Bộ nhớ đệm thống kê đủ (X^T W X, X^T W y) của từng chuỗi để khớp lại gần như tức thì.
+
+    Với mỗi (chỉ số, cấp) bộ nhớ đệm giữ các năm đã cộng vào, giá trị của các năm đó và
+    thống kê đủ của từng chuỗi. Khi có thêm năm mới, update() chỉ cộng phần của các dòng
+    mới vào thống kê; chuỗi nào có dữ liệu cũ bị sửa (hoặc chuỗi mới) thì tính lại từ đầu
+    riêng chuỗi đó. Nếu một năm cũ biến mất hoặc đổi bậc đa thức thì tính lại toàn bộ.
+
+    Args:
+        cache_dir (str, optional): Thư mục lưu các file .npz; None thì chỉ giữ trong bộ nhớ.
+        degree (int): Bậc đa thức của xu hướng.
+    """
+
+    def __init__(self, cache_dir=FORECAST_CACHE_DIR, degree=1):
+        self.cache_dir = cache_dir
+        self.degree = degree
+        self._states = {}
+        # Thống kê của lần update() gần nhất: số năm mới, số chuỗi dùng lại / tính lại
+        self.last_update = {}
+
+    def _path(self, metric, level):
+        name = re.sub(r'[^0-9A-Za-z]+', '_', f"{metric}__{level}").strip('_')
+        return os.path.join(self.cache_dir, f"{name}.npz")
+
+    def _load(self, metric, level):
+        key = (metric, level)
+        if key not in self._states and self.cache_dir is not None:
+            path = self._path(metric, level)
+            if os.path.exists(path):
+                with np.load(path, allow_pickle=False) as saved:
+                    self._states[key] = {name: saved[name] for name in saved.files}
+        state = self._states.get(key)
+        if state is not None and int(state['degree']) != self.degree:
+            return None
+        return state
+
+    def save(self):
+        """Ghi thống kê của mọi (chỉ số, cấp) ra thư mục cache_dir."""
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for (metric, level), state in self._states.items():
+            np.savez(self._path(metric, level), **state)
+
+    def clear(self):
+        self._states.clear()
+
+    def update(self, metric, level, table):
+        """
+        Đưa bảng năm x chuỗi mới nhất vào bộ nhớ đệm và trả về hệ số của mọi chuỗi.
+
+        Args:
+            metric (str): Tên chỉ số.
+            level (str): Cấp của các chuỗi ('Provinces/city' hoặc 'Region').
+            table (pd.DataFrame): Bảng như series_table (toàn bộ lịch sử).
+
+        Returns:
+            tuple: (hệ số dạng S x (bậc + 1) theo thứ tự cột của table, origin).
+        """
+        years = table.index.to_numpy().astype(np.int64)
+        names = np.asarray(table.columns, dtype=str)
+        values = table.to_numpy(dtype=np.float64)
+        state = self._load(metric, level)
+
+        if state is None or not np.isin(state['years'], years).all():
+            origin = float(years.min())
+            gram, rhs = normal_equations(years, values, origin, self.degree)
+            self.last_update = {'new_years': len(years), 'reused': 0, 'refit': len(names)}
+        else:
+            origin = float(state['origin'])
+            old_rows = np.searchsorted(years, state['years'])
+            new_rows = np.flatnonzero(~np.isin(years, state['years']))
+            columns = pd.Index(state['series']).get_indexer(names)
+            known = columns >= 0
+
+            # Chuỗi đã biết mà dữ liệu các năm cũ không đổi thì dùng lại thống kê
+            old_values = state['values'][:, columns[known]]
+            current = values[old_rows][:, known]
+            same = ((current == old_values) | (np.isnan(current) & np.isnan(old_values))).all(axis=0)
+            reuse = np.zeros(len(names), dtype=bool)
+            reuse[np.flatnonzero(known)[same]] = True
+
+            gram = np.empty((len(names), self.degree + 1, self.degree + 1))
+            rhs = np.empty((len(names), self.degree + 1))
+            # Chỉ cộng phần của các năm mới
+            new_gram, new_rhs = normal_equations(years[new_rows], values[new_rows][:, reuse], origin, self.degree)
+            gram[reuse] = state['gram'][columns[reuse]] + new_gram
+            rhs[reuse] = state['rhs'][columns[reuse]] + new_rhs
+            # Chuỗi mới hoặc có dữ liệu cũ bị sửa: tính lại toàn bộ lịch sử của riêng chuỗi đó
+            gram[~reuse], rhs[~reuse] = normal_equations(years, values[:, ~reuse], origin, self.degree)
+            self.last_update = {'new_years': len(new_rows), 'reused': int(reuse.sum()),
+                                'refit': int((~reuse).sum())}
+
+        self._states[(metric, level)] = {
+            'degree': np.array(self.degree), 'origin': np.array(origin),
+            'years': years, 'series': names, 'values': values, 'gram': gram, 'rhs': rhs,
+        }
+        return solve_normal_equations(gram, rhs), origin
+
+
+def predict_trends(coefs, origin, years):
+    """Giá trị dự báo T x S cho các năm từ hệ số của fit_trends."""
+    X = _design(years, origin, coefs.shape[1] - 1)
+    return X @ coefs.T
+
+
+def _tidy(level, table, predicted, years, last_year):
+    """Bảng dài (level, series, Year, actual, predicted, is_forecast) từ các ma trận T x S."""
+    names = np.asarray(table.columns, dtype=object)
+    actual = table.reindex(years).to_numpy()
+    return pd.DataFrame({
+        'level': level,
+        'series': np.tile(names, len(years)),
+        'Year': np.repeat(years, len(names)),
+        'actual': actual.ravel(),
+        'predicted': predicted.ravel(),
+        'is_forecast': np.repeat(years > last_year, len(names)),
+    })
+
+
+@instrumented
+def forecast(source, metric='Average population', levels=DEFAULT_LEVELS, horizon=10, degree=1, cache=None):
+    """
+    Dự báo một chỉ số cho từng tỉnh và từng vùng bằng xu hướng đa thức theo năm.
+
+    Args:
+        source (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        metric (str): Chỉ số cần dự báo.
+        levels (tuple): Các cấp dự báo ('Provinces/city', 'Region').
+        horizon (int): Số năm dự báo sau năm cuối cùng có dữ liệu.
+        degree (int): Bậc đa thức của xu hướng.
+        cache (ForecastCache, optional): Dùng lại thống kê đã khớp, chỉ cộng thêm các năm mới
+                                         (bậc lấy theo cache.degree).
+
+    Returns:
+        pd.DataFrame: Bảng dài với các cột FORECAST_COLUMNS, gồm cả giá trị khớp cho các
+                      năm đã có (is_forecast=False) và giá trị dự báo (is_forecast=True).
+    """
+    data = load_dataset(source, columns=['Year', metric, *levels])
+    frames = []
+    for level in levels:
+        table = series_table(data, metric, level)
+        history = table.index.to_numpy()
+        last_year = int(history.max())
+        years = np.concatenate([history, np.arange(last_year + 1, last_year + horizon + 1)])
+        if cache is not None:
+            coefs, origin = cache.update(metric, level, table)
+        else:
+            coefs, origin = fit_trends(history, table.to_numpy(), degree)
+        frames.append(_tidy(level, table, predict_trends(coefs, origin, years), years, last_year))
+    return pd.concat(frames, ignore_index=True)[FORECAST_COLUMNS]
+
+
+@instrumented
+def backtest(source, metric='Average population', levels=DEFAULT_LEVELS, horizon=1, min_train=3, degree=1):
+    """
+    Kiểm tra lại theo thời gian (cửa sổ mở rộng): khớp trên các năm <= mốc cắt rồi dự báo
+    `horizon` năm tiếp theo, lặp lại với mỗi mốc cắt. Không bao giờ dùng năm tương lai để khớp.
+
+    Thống kê đủ của mọi mốc cắt là tổng tích lũy theo năm của year_terms (tính một lần), nên
+    mỗi mốc cắt chỉ cần giải phương trình chuẩn, không khớp lại từ đầu.
+
+    Args:
+        source (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        metric (str): Chỉ số cần dự báo.
+        levels (tuple): Các cấp dự báo.
+        horizon (int): Số năm dự báo sau mỗi mốc cắt.
+        min_train (int): Số năm tối thiểu để khớp.
+        degree (int): Bậc đa thức của xu hướng.
+
+    Returns:
+        pd.DataFrame: Các cột level, series, cutoff, Year, step, actual, predicted, error.
+    """
+    data = load_dataset(source, columns=['Year', metric, *levels])
+    frames = []
+    for level in levels:
+        table = series_table(data, metric, level)
+        years = table.index.to_numpy()
+        values = table.to_numpy()
+        names = np.asarray(table.columns, dtype=object)
+        origin = float(np.min(years))
+        gram, rhs = year_terms(years, values, origin, degree)
+        gram, rhs = np.cumsum(gram, axis=0), np.cumsum(rhs, axis=0)
+        for cut in range(min_train, len(years)):
+            test = slice(cut, min(cut + horizon, len(years)))
+            coefs = solve_normal_equations(gram[cut - 1], rhs[cut - 1])
+            predicted = predict_trends(coefs, origin, years[test])
+            n_test = predicted.shape[0]
+            frames.append(pd.DataFrame({
+                'level': level,
+                'series': np.tile(names, n_test),
+                'cutoff': years[cut - 1],
+                'Year': np.repeat(years[test], len(names)),
+                'step': np.repeat(np.arange(1, n_test + 1), len(names)),
+                'actual': values[test].ravel(),
+                'predicted': predicted.ravel(),
+            }))
+    result = pd.concat(frames, ignore_index=True)
+    result['error'] = result['predicted'] - result['actual']
+    return result
+
+
+def backtest_summary(result, by=('level',)):
+    """Sai số MAE, RMSE và MAPE (%) của backtest theo các cột `by`."""
+    errors = result.dropna(subset=['error']).assign(
+        abs_error=lambda df: df['error'].abs(),
+        sq_error=lambda df: df['error'] ** 2,
+        pct_error=lambda df: (df['error'] / df['actual']).abs() * 100)
+    summary = errors.groupby(list(by), observed=True).agg(
+        MAE=('abs_error', 'mean'), RMSE=('sq_error', 'mean'), MAPE=('pct_error', 'mean'), n=('error', 'size'))
+    summary['RMSE'] = np.sqrt(summary['RMSE'])
+    return summary
@@ -0,0 +1,125 @@
+# scripts/growth.py
+import numpy as np
+import pandas as pd
+
+from scripts.dataset import METRIC_COLUMNS, load_dataset, save_dataset, widen
+from scripts.index import INDEX_COLUMNS, PROVINCE_COLUMN, get_index
+from scripts.instrument import instrumented, record_error
+from scripts.paths import GROWTH_CSV, LABOR_GROWTH_CSV
+
+# Số năm của trung bình trượt mặc định
+DEFAULT_WINDOW = 3
+
+
+def growth_columns(metric, window=DEFAULT_WINDOW):
+    """Tên các cột tăng trưởng của một chỉ số: (YoY %, thay đổi, CAGR %, trung bình trượt)."""
+    return (f"{metric} YoY (%)", f"{metric} change", f"{metric} CAGR (%)", f"{metric} {window}y avg")
+
+
+def _rolling_mean(values, first, window):
+    """
+    Trung bình trượt `window` năm trong từng tỉnh (NaN khi chưa đủ `window` giá trị),
+    tính bằng hiệu của tổng tích lũy thay vì lặp theo nhóm.
+    """
+    n = len(values)
+    valid = ~np.isnan(values)
+    sums = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(np.where(valid, values, 0.0), axis=0)])
+    counts = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(valid, axis=0)])
+    rows = np.arange(n)
+    lower = rows - window + 1
+    full = (lower >= first)[:, None]
+    lower = np.clip(lower, 0, None)
+    window_sum = sums[rows + 1] - sums[lower]
+    window_count = counts[rows + 1] - counts[lower]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = window_sum / window_count
+    return np.where(full & (window_count == window), mean, np.nan)
+
+
+@instrumented
+def compute_growth(data, metrics=None, window=DEFAULT_WINDOW):
+    """
+    Tốc độ tăng trưởng của mọi chỉ số cho từng tỉnh, trong một lần tính trên mảng đã sắp xếp.
+
+    Dữ liệu được sắp xếp một lần theo (vùng, tỉnh, năm) (scripts/index.py), nên giá trị
+    năm trước của mỗi dòng chỉ là dòng liền trên, trừ dòng đầu tiên của mỗi tỉnh. Tất cả
+    các chỉ số được tính cùng lúc trên ma trận (số dòng x số chỉ số), không dùng apply.
+
+        - YoY (%): thay đổi so với năm trước đó của cùng tỉnh
+        - change: chênh lệch tuyệt đối so với năm trước đó
+        - CAGR (%): tốc độ tăng trưởng kép bình quân năm kể từ năm đầu tiên của tỉnh
+        - {window}y avg: trung bình trượt `window` năm
+
+    Args:
+        data (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        metrics (list, optional): Các chỉ số cần tính (mặc định mọi chỉ số có trong dữ liệu).
+        window (int): Số năm của trung bình trượt.
+
+    Returns:
+        pd.DataFrame: Region, Provinces/city, Year và các cột growth_columns của từng chỉ số.
+    """
+    index = get_index(load_dataset(data))
+    sorted_data = index.data
+    if metrics is None:
+        metrics = [col for col in METRIC_COLUMNS if col in sorted_data.columns]
+
+    values = widen(sorted_data, metrics).to_numpy(dtype=np.float64)
+    years = sorted_data['Year'].to_numpy(dtype=np.float64)
+    starts = index.series_starts
+    rows = np.arange(len(values))
+    # Vị trí dòng đầu tiên của tỉnh chứa mỗi dòng
+    first = np.maximum.accumulate(np.where(starts, rows, 0))
+
+    previous = np.vstack([np.full((1, len(metrics)), np.nan), values[:-1]])
+    previous[starts] = np.nan
+    elapsed = (years - years[first])[:, None]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = values - previous
+        # Như pct_change() * 100 của pandas
+        yoy = (values / previous - 1) * 100
+        cagr = (np.power(values / values[first], 1 / elapsed) - 1) * 100
+    cagr = np.where(elapsed > 0, cagr, np.nan)
+    rolling = _rolling_mean(values, first, window)
+
+    result = {col: sorted_data[col] for col in INDEX_COLUMNS}
+    for i, metric in enumerate(metrics):
+        yoy_col, change_col, cagr_col, avg_col = growth_columns(metric, window)
+        result[yoy_col] = yoy[:, i]
+        result[change_col] = change[:, i]
+        result[cagr_col] = cagr[:, i]
+        result[avg_col] = rolling[:, i]
+    return pd.DataFrame(result, index=sorted_data.index)
+
+
+def labor_growth_by_province(data):
+    """
+    Bảng labor_growth_rate_by_province.csv: dữ liệu gốc kèm cột 'Growth_Rate (%)' là tốc độ
+    tăng của lực lượng lao động 15+ so với năm trước, sắp theo tên tỉnh rồi theo năm.
+    """
+    index = get_index(load_dataset(data))
+    growth = compute_growth(data, ['15+ labor'])
+    result = index.data.assign(**{'Growth_Rate (%)': growth[growth_columns('15+ labor')[0]]})
+    order = np.lexsort((result['Year'].to_numpy(), result[PROVINCE_COLUMN].astype(str).to_numpy()))
+    return result.take(order).reset_index(drop=True)
+
+
+@instrumented
+def build_growth_tables(input_path, growth_path=GROWTH_CSV, labor_path=LABOR_GROWTH_CSV, window=DEFAULT_WINDOW):
+    """
+    Tính và lưu các bảng tăng trưởng dùng chung cho các phân tích khác.
+
+    Args:
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        growth_path (str): Nơi lưu bảng tăng trưởng của mọi chỉ số.
+        labor_path (str): Nơi lưu bảng tăng trưởng lao động theo tỉnh.
+        window (int): Số năm của trung bình trượt.
+    """
+    try:
+        data = load_dataset(input_path)
+        save_dataset(compute_growth(data, window=window), growth_path)
+        save_dataset(labor_growth_by_province(data), labor_path)
+        print(f"Đã lưu bảng tăng trưởng tại: {growth_path} và {labor_path}")
+    except Exception as e:
+        record_error(e)
+        print(f"Lỗi trong quá trình tính tốc độ tăng trưởng: {e}")
@@ -0,0 +1,160 @@
+# scripts/index.py
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from scripts.dataset import as_float64
+
+PROVINCE_COLUMN = 'Provinces/city'
+
+# Thứ tự sắp xếp của chỉ mục: vùng -> tỉnh -> năm
+INDEX_COLUMNS = ['Region', PROVINCE_COLUMN, 'Year']
+
+# Chỉ mục đã tạo cho các DataFrame đang có trong bộ nhớ: id -> (weakref, chỉ mục)
+_indexes = {}
+
+
+def _sort_keys(values):
+    """Khóa sắp xếp của một cột: mã category (giữ thứ tự category) hoặc chính giá trị."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy()
+    if values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+        return pd.factorize(values, sort=True)[0]
+    return values.to_numpy()
+
+
+def _offsets(keys, *labels):
+    """
+    Bảng vị trí {nhãn: (đầu, cuối)} của các đoạn liên tiếp có cùng khóa.
+    Với nhiều mảng nhãn, nhãn của mỗi đoạn là bộ (nhãn 1, nhãn 2, ...).
+    """
+    if len(keys) == 0:
+        return {}
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    stops = np.r_[starts[1:], len(keys)]
+    if len(labels) == 1:
+        return {labels[0][start]: (start, stop) for start, stop in zip(starts, stops)}
+    return {tuple(values[start] for values in labels): (start, stop) for start, stop in zip(starts, stops)}
+
+
+class PopulationIndex:
+    """
+    Dữ liệu đã sắp xếp theo (Region, Provinces/city, Year) kèm bảng vị trí của từng vùng/tỉnh.
+
+    Sau khi sắp xếp một lần, mỗi vùng và mỗi tỉnh là một đoạn dòng liên tiếp, nên lấy dữ
+    liệu của một vùng/tỉnh chỉ là cắt theo vị trí (không quét toàn bộ dữ liệu, không sao
+    chép), và các phép tính theo chuỗi thời gian của từng tỉnh không cần sắp xếp lại.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số có các cột Region, Provinces/city, Year.
+    """
+
+    def __init__(self, data):
+        missing = [col for col in INDEX_COLUMNS if col not in data.columns]
+        if missing:
+            raise KeyError(f"Thiếu các cột sau: {missing}")
+
+        # np.lexsort sắp theo khóa cuối cùng trước, nên truyền theo thứ tự ngược
+        keys = [_sort_keys(data[col]) for col in INDEX_COLUMNS]
+        order = np.lexsort(keys[::-1])
+        if np.array_equal(order, np.arange(len(order))):
+            self.data = data.reset_index(drop=True)
+        else:
+            self.data = data.take(order).reset_index(drop=True)
+
+        regions = self.data['Region']
+        provinces = self.data[PROVINCE_COLUMN]
+        region_keys = _sort_keys(regions)
+        # Khóa của tỉnh gồm cả vùng, để một tỉnh nằm ở hai vùng vẫn là hai đoạn khác nhau
+        province_keys = region_keys.astype(np.int64) * (len(provinces) + 1) + _sort_keys(provinces)
+        self.region_offsets = _offsets(region_keys, regions.to_numpy())
+        # Khóa (vùng, tỉnh) -> (đầu, cuối); tên tỉnh -> các khóa của tỉnh đó
+        self.province_offsets = _offsets(province_keys, regions.to_numpy(), provinces.to_numpy())
+        self._province_keys = {}
+        for key in self.province_offsets:
+            self._province_keys.setdefault(key[1], []).append(key)
+
+        # Dòng đầu tiên của mỗi chuỗi thời gian (mỗi tỉnh)
+        self.series_starts = np.r_[True, province_keys[1:] != province_keys[:-1]][:len(self.data)]
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def regions(self):
+        return list(self.region_offsets)
+
+    @property
+    def provinces(self):
+        """Tên các tỉnh/thành phố (mỗi tên một lần, theo thứ tự của chỉ mục)."""
+        return list(self._province_keys)
+
+    def _take_spans(self, spans):
+        """Các dòng của các đoạn (đầu, cuối): cắt theo vị trí nếu chỉ có một đoạn."""
+        if len(spans) == 1:
+            start, stop = spans[0]
+            return self.data.iloc[start:stop]
+        positions = np.concatenate([np.arange(start, stop) for start, stop in sorted(spans)] or [[]])
+        return self.data.take(positions.astype(np.intp))
+
+    def region(self, name):
+        """Dữ liệu của một vùng (cắt theo vị trí, không sao chép)."""
+        start, stop = self.region_offsets.get(name, (0, 0))
+        return self.data.iloc[start:stop]
+
+    def province(self, name, region=None):
+        """
+        Dữ liệu của một tỉnh/thành phố (cắt theo vị trí, không sao chép). Tên tỉnh có ở
+        nhiều vùng thì gồm mọi đoạn của tỉnh đó, trừ khi chỉ rõ `region`.
+        """
+        if region is not None:
+            return self._take_spans([self.province_offsets.get((region, name), (0, 0))])
+        return self.provinces_of([name])
+
+    def provinces_of(self, names):
+        """Dữ liệu của một nhóm tỉnh (thay cho data[data['Provinces/city'].isin(names)])."""
+        spans = [self.province_offsets[key] for name in names for key in self._province_keys.get(name, [])]
+        return self._take_spans(spans) if spans else self.data.iloc[0:0]
+
+    def iter_regions(self):
+        """Lần lượt (vùng, dữ liệu của vùng) theo thứ tự REGIONS, tổng cộng O(số dòng)."""
+        for name, (start, stop) in self.region_offsets.items():
+            yield name, self.data.iloc[start:stop]
+
+    def iter_provinces(self):
+        """Lần lượt ((vùng, tỉnh), dữ liệu của tỉnh), mỗi tỉnh đã sắp theo năm."""
+        for name, (start, stop) in self.province_offsets.items():
+            yield name, self.data.iloc[start:stop]
+
+    def pct_change(self, column):
+        """
+        Tỷ lệ thay đổi so với năm trước của cùng tỉnh (như groupby(tỉnh).pct_change()).
+
+        Returns:
+            pd.Series: Cùng chỉ mục với self.data, NaN ở năm đầu tiên của mỗi tỉnh.
+        """
+        values = as_float64(self.data[column])
+        result = np.full(len(values), np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[1:] = values[1:] / values[:-1] - 1
+        result[self.series_starts] = np.nan
+        return pd.Series(result, index=self.data.index, name=column)
+
+
+def get_index(data):
+    """
+    Lấy chỉ mục đã sắp xếp cho một DataFrame, mỗi đối tượng chỉ sắp xếp một lần.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số (thường là kết quả của load_dataset).
+
+    Returns:
+        PopulationIndex: Chỉ mục của dữ liệu.
+    """
+    cached = _indexes.get(id(data))
+    if cached is not None and cached[0]() is data:
+        return cached[1]
+    index = PopulationIndex(data)
+    _indexes[id(data)] = (weakref.ref(data, lambda _, key=id(data), indexes=_indexes: indexes.pop(key, None)), index)
+    return index
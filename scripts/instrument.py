@@ -0,0 +1,187 @@
+# scripts/instrument.py
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import pstats
+import time
+import tracemalloc
+
+# File JSON lines mặc định của main.py; đặt POPULATION_METRICS để ghi khi gọi các script trực tiếp
+METRICS_ENV = "POPULATION_METRICS"
+DEFAULT_METRICS_PATH = os.path.join("outputs", "logs", "pipeline_metrics.jsonl")
+
+_config = {
+    'path': os.environ.get(METRICS_ENV) or None,  # None: chỉ giữ kết quả trong bộ nhớ
+    'trace_memory': False,
+    'profile_dir': None,
+}
+
+# Các phép đo đang chạy (lồng nhau: bước của pipeline -> hàm phân tích -> ...)
+_active = []
+
+# Kết quả của các phép đo đã xong trong tiến trình này
+records = []
+
+# Bộ nhớ đỉnh (tuyệt đối) đã thấy của từng phép đo đang chạy, vì reset_peak() của phép đo con xóa đỉnh cũ
+_peaks = []
+
+# Kết quả cProfile của các phép đo ngoài cùng: (thời gian, tên, pstats.Stats)
+_profiles = []
+
+
+def configure(path=None, trace_memory=False, profile_dir=None):
+    """
+    Bật ghi kết quả đo.
+
+    Args:
+        path (str, optional): File JSON lines nhận mỗi kết quả đo trên một dòng.
+        trace_memory (bool): Đo bộ nhớ đỉnh bằng tracemalloc (chậm hơn đáng kể).
+        profile_dir (str, optional): Chạy cProfile cho các phép đo ngoài cùng và lưu kết quả
+                                     của phép đo chậm nhất vào thư mục này (xem dump_profile).
+    """
+    _config.update(path=path, trace_memory=trace_memory, profile_dir=profile_dir)
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def count_rows(rows_in=0, rows_out=0):
+    """Cộng số dòng đọc vào / ghi ra cho mọi phép đo đang chạy (gọi từ các hàm đọc/ghi dữ liệu)."""
+    for record in _active:
+        record['rows_in'] += rows_in
+        record['rows_out'] += rows_out
+
+
+def count_charts(charts=1, cached=0):
+    """
+    Cộng số biểu đồ cho mọi phép đo đang chạy.
+
+    Args:
+        charts (int): Số biểu đồ đã thực sự vẽ và lưu.
+        cached (int): Số biểu đồ lấy lại từ bộ nhớ đệm biểu đồ (không vẽ lại).
+    """
+    for record in _active:
+        record['charts'] += charts
+        record['charts_cached'] += cached
+
+
+def record_error(error):
+    """
+    Ghi nhận lỗi đã bị bắt trong một hàm phân tích (các hàm này in lỗi ra rồi tiếp tục),
+    để kết quả đo vẫn có trạng thái 'error' thay vì 'ok'.
+    """
+    if _active:
+        _active[-1]['status'] = 'error'
+        _active[-1]['error'] = f"{type(error).__name__}: {error}"
+
+
+def _emit(record):
+    records.append(record)
+    if _config['path']:
+        os.makedirs(os.path.dirname(_config['path']) or ".", exist_ok=True)
+        with open(_config['path'], "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+
+@contextlib.contextmanager
+def measure(name, kind='function'):
+    """
+    Đo một đoạn mã: thời gian thực, thời gian CPU, bộ nhớ đỉnh, số dòng vào/ra và số biểu đồ
+    (đã vẽ / lấy từ bộ nhớ đệm).
+
+    Kết quả được thêm vào `records` và (nếu đã configure) ghi thành một dòng JSON.
+
+    Args:
+        name (str): Tên phép đo (tên hàm hoặc tên bước).
+        kind (str): 'stage' cho các bước của pipeline, 'function' cho các hàm.
+    """
+    record = {
+        'name': name, 'kind': kind, 'parent': _active[-1]['name'] if _active else None,
+        'started': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'rows_in': 0, 'rows_out': 0, 'charts': 0, 'charts_cached': 0, 'status': 'ok', 'error': None,
+    }
+    tracing = _config['trace_memory'] and tracemalloc.is_tracing()
+    if tracing:
+        start_current, peak = tracemalloc.get_traced_memory()
+        if _peaks:
+            _peaks[-1] = max(_peaks[-1], peak)
+        _peaks.append(start_current)
+        tracemalloc.reset_peak()
+    profiler = cProfile.Profile() if _config['profile_dir'] and not _active else None
+
+    _active.append(record)
+    start, cpu_start = time.perf_counter(), time.process_time()
+    if profiler is not None:
+        profiler.enable()
+    try:
+        yield record
+    except BaseException as e:
+        record['status'] = 'error'
+        record['error'] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        record['wall_s'] = round(time.perf_counter() - start, 6)
+        record['cpu_s'] = round(time.process_time() - cpu_start, 6)
+        _active.pop()
+        record['peak_mem_mb'] = None
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], _peaks.pop())
+            record['peak_mem_mb'] = round((peak - start_current) / 2 ** 20, 3)
+            if _peaks:
+                _peaks[-1] = max(_peaks[-1], peak)
+        if profiler is not None:
+            _profiles.append((record['wall_s'], name, pstats.Stats(profiler)))
+        _emit(record)
+
+
+def instrumented(func=None, *, name=None):
+    """
+    Decorator: đo mỗi lần gọi hàm bằng measure().
+
+    Dùng @instrumented hoặc @instrumented(name="...").
+    """
+    if func is None:
+        return functools.partial(instrumented, name=name)
+
+    label = name or func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with measure(label):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def dump_profile(profile_dir=None, limit=30):
+    """
+    Lưu kết quả cProfile của phép đo ngoài cùng chậm nhất (file .prof và bản tóm tắt .txt).
+
+    Returns:
+        str | None: Đường dẫn file .prof, None nếu chưa bật profile.
+    """
+    profile_dir = profile_dir or _config['profile_dir']
+    if not profile_dir or not _profiles:
+        return None
+    wall_s, name, stats = max(_profiles, key=lambda item: item[0])
+    os.makedirs(profile_dir, exist_ok=True)
+    path = os.path.join(profile_dir, f"{name}.prof")
+    stats.dump_stats(path)
+    with open(os.path.splitext(path)[0] + ".txt", "w", encoding="utf-8") as f:
+        f.write(f"# {name}: {wall_s:.3f}s\n")
+        pstats.Stats(path, stream=f).sort_stats("cumulative").print_stats(limit)
+    return path
+
+
+def format_summary(kind='stage'):
+    """Bảng tóm tắt (dạng văn bản) các phép đo loại `kind` đã chạy trong tiến trình này."""
+    rows = [record for record in records if record['kind'] == kind]
+    lines = [f"{'name':<16}{'wall_s':>9}{'cpu_s':>9}{'peak_mb':>9}{'rows_in':>10}{'rows_out':>10}{'charts':>8}  status"]
+    for record in rows:
+        peak = '-' if record['peak_mem_mb'] is None else f"{record['peak_mem_mb']:.1f}"
+        lines.append(f"{record['name']:<16}{record['wall_s']:>9.3f}{record['cpu_s']:>9.3f}{peak:>9}"
+                     f"{record['rows_in']:>10}{record['rows_out']:>10}{record['charts']:>8}  {record['status']}")
+    return "\n".join(lines)
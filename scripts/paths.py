@@ -0,0 +1,42 @@
+# scripts/paths.py
+import os
+
+# Các đường dẫn dùng chung. Module này (như scripts/__init__.py) chỉ dùng thư viện chuẩn,
+# để main.py khai báo pipeline mà không phải import pandas/matplotlib.
+
+# Dữ liệu đã làm sạch
+CLEANED_CSV = os.path.join("data", "cleaned", "cleaned_population.csv")
+
+# Thư mục chứa các biểu đồ đã vẽ
+VISUALIZATIONS_DIR = os.path.join("outputs", "visualizations")
+
+# Bảng tốc độ tăng trưởng của mọi chỉ số (mỗi dòng là một tỉnh trong một năm)
+GROWTH_CSV = os.path.join("data", "derived", "growth_rates.csv")
+
+# Bảng tốc độ tăng lực lượng lao động theo tỉnh (trước đây tạo trong comparative_analysis.ipynb)
+LABOR_GROWTH_CSV = os.path.join("data", "filtered", "Region", "labor_growth_rate_by_province.csv")
+
+# So sánh mọi cặp năm của mọi chỉ số theo tỉnh, và thay đổi thứ hạng giữa năm đầu và năm cuối
+YEAR_PAIRS_CSV = os.path.join("data", "derived", "year_pair_changes.csv")
+RANK_SHIFTS_CSV = os.path.join("data", "derived", "rank_shifts.csv")
+
+# Tương quan và hồi quy tuyến tính của mọi cặp chỉ số, trên toàn bộ dữ liệu, theo vùng và theo năm
+CORRELATIONS_CSV = os.path.join("data", "derived", "correlations.csv")
+
+# Báo cáo Excel tổng hợp
+REPORT_XLSX = os.path.join("outputs", "reports", "summary_report.xlsx")
+
+
+def cube_path(csv_path):
+    """Đường dẫn file cube đi kèm file dữ liệu đã làm sạch."""
+    return os.path.splitext(csv_path)[0] + "_cube.csv"
+
+
+def quarantine_path(csv_path):
+    """File chứa các dòng bị loại ra khi làm sạch `csv_path` (xem scripts/schema.py)."""
+    return os.path.splitext(csv_path)[0] + "_quarantine.csv"
+
+
+def validation_report_path(csv_path):
+    """File báo cáo vi phạm schema (JSON) đi kèm `csv_path`."""
+    return os.path.splitext(csv_path)[0] + "_validation.json"
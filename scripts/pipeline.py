@@ -0,0 +1,209 @@
+# scripts/pipeline.py
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import sys
+
+from scripts import instrument
+from scripts.instrument import measure
+
+# Thư mục gốc của dự án (chứa main.py)
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# File lưu dấu vân tay của lần chạy gần nhất cho từng bước
+MANIFEST_PATH = os.path.join("outputs", "pipeline_manifest.json")
+
+
+def load_script(relative_path):
+    """
+    Import một file script trong thư mục scripts/ theo đường dẫn
+    (các thư mục như "Trend Analysis" có khoảng trắng nên không import thông thường được).
+
+    Script có tên trong scripts.ANALYSES được import dưới tên đó (scripts.trend_analysis...),
+    nên chỉ được nạp một lần dù gọi từ main.py hay import trực tiếp.
+
+    Args:
+        relative_path (str): Đường dẫn tính từ thư mục scripts/.
+
+    Returns:
+        module: Module đã được nạp.
+    """
+    from scripts import ANALYSES
+
+    relative_path = relative_path.replace(os.sep, "/")
+    for alias, script in ANALYSES.items():
+        if script == relative_path:
+            return importlib.import_module(f"scripts.{alias}")
+
+    name = "scripts._" + os.path.splitext(relative_path)[0].replace("/", "_").replace(" ", "_")
+    if name in sys.modules:
+        return sys.modules[name]
+    path = os.path.join(ROOT_DIR, "scripts", relative_path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _hash_file(digest, path):
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+
+
+def fingerprint(inputs, params=None):
+    """
+    Tính dấu vân tay (sha256) từ nội dung các file đầu vào và tham số của bước.
+
+    Args:
+        inputs (list): Các file hoặc thư mục đầu vào.
+        params (dict, optional): Tham số của bước (ví dụ bộ lọc của filter_data).
+
+    Returns:
+        str: Chuỗi hex của dấu vân tay.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode("utf-8"))
+    for path in inputs:
+        digest.update(path.encode("utf-8"))
+        if os.path.isdir(path):
+            for folder, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    file_path = os.path.join(folder, name)
+                    digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+                    _hash_file(digest, file_path)
+        elif os.path.exists(path):
+            _hash_file(digest, path)
+        else:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+class Stage:
+    """
+    Một bước (node) của pipeline.
+
+    Args:
+        name (str): Tên bước.
+        func (callable): Hàm thực hiện bước, được gọi với **params.
+        inputs (list): Các file/thư mục đầu vào (bao gồm cả file mã nguồn của bước).
+        outputs (list): Các file/thư mục đầu ra.
+        params (dict, optional): Tham số truyền cho func, cũng được đưa vào dấu vân tay.
+        deps (list, optional): Tên các bước phải chạy trước.
+    """
+
+    def __init__(self, name, func, inputs, outputs, params=None, deps=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = dict(params or {})
+        self.deps = list(deps or [])
+
+    def outputs_exist(self):
+        return all(os.path.exists(path) for path in self.outputs)
+
+
+class Pipeline:
+    """
+    Bộ chạy các bước theo thứ tự phụ thuộc, bỏ qua bước có đầu vào không đổi.
+
+    Args:
+        stages (list): Danh sách Stage.
+        manifest_path (str): File lưu dấu vân tay của lần chạy trước.
+    """
+
+    def __init__(self, stages, manifest_path=MANIFEST_PATH):
+        self.stages = {stage.name: stage for stage in stages}
+        self.manifest_path = manifest_path
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, manifest):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    def order(self, selected=None):
+        """Thứ tự chạy (topological) của các bước được chọn và các bước chúng phụ thuộc."""
+        ordered, visiting = [], set()
+
+        def visit(name):
+            if name in ordered:
+                return
+            if name in visiting:
+                raise ValueError(f"Vòng lặp phụ thuộc tại bước '{name}'")
+            visiting.add(name)
+            for dep in self.stages[name].deps:
+                visit(dep)
+            visiting.discard(name)
+            ordered.append(name)
+
+        for name in (selected or self.stages):
+            visit(name)
+        return ordered
+
+    def run(self, selected=None, force=False):
+        """
+        Chạy pipeline.
+
+        Args:
+            selected (list, optional): Chỉ chạy các bước này (cùng các bước phụ thuộc).
+            force (bool): Chạy lại tất cả các bước bất kể dấu vân tay.
+
+        Mỗi bước được chạy đo bằng scripts.instrument.measure (thời gian, bộ nhớ, số dòng,
+        số biểu đồ); xem main.py --metrics.
+
+        Một bước là "failed" nếu thiếu đầu ra hoặc có phép đo (của bước hoặc của hàm bên trong)
+        bị lỗi; dấu vân tay của bước đó không được lưu.
+
+        Returns:
+            dict: Tên bước -> "run" | "skipped" | "failed".
+        """
+        manifest = self._load_manifest()
+        status = {}
+        for name in self.order(selected):
+            stage = self.stages[name]
+            # Dấu vân tay tính tại thời điểm chạy, sau khi các bước phía trước đã ghi đầu ra
+            key = fingerprint(stage.inputs, stage.params)
+            previous = manifest.get(name, {})
+            if not force and previous.get("fingerprint") == key and stage.outputs_exist():
+                print(f"[{name}] Đầu vào không đổi, bỏ qua.")
+                status[name] = "skipped"
+                continue
+
+            print(f"[{name}] Đang chạy...")
+            first = len(instrument.records)
+            with measure(name, kind='stage') as record:
+                stage.func(**stage.params)
+                # Các hàm phân tích tự bắt lỗi (record_error chỉ đánh dấu phép đo trong cùng):
+                # một phép đo con bị lỗi nghĩa là bước này lỗi, dù đầu ra cũ vẫn còn trên đĩa
+                errors = [r for r in instrument.records[first:] if r['status'] == 'error']
+                if errors and record['status'] == 'ok':
+                    record['status'] = 'error'
+                    record['error'] = f"{errors[0]['name']}: {errors[0]['error']}"
+                if not stage.outputs_exist():
+                    record['status'] = 'error'
+                    record['error'] = record['error'] or "missing outputs"
+            if record['status'] == 'error':
+                missing = [p for p in stage.outputs if not os.path.exists(p)]
+                print(f"[{name}] Lỗi: {record['error']}" if not missing else
+                      f"[{name}] Không tìm thấy đầu ra: {missing}")
+                # Không ghi dấu vân tay: lần chạy sau sẽ chạy lại bước này
+                manifest.pop(name, None)
+                status[name] = "failed"
+            else:
+                manifest[name] = {"fingerprint": key, "outputs": stage.outputs}
+                status[name] = "run"
+            self._save_manifest(manifest)
+        return status
@@ -0,0 +1,276 @@
+# scripts/query.py
+import argparse
+import operator
+import os
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts.dataset import CLEANED_CSV, load_dataset, save_dataset
+from scripts.instrument import instrumented, record_error
+
+# Thư mục mặc định của các file đã tách theo từng năm / từng vùng
+FILTERED_DIRS = {
+    'Year': os.path.join("data", "filtered", "Year"),
+    'Region': os.path.join("data", "filtered", "Region"),
+}
+
+# Các toán tử so sánh dùng được trong bộ lọc dạng {'>=': 2012, '<=': 2016}
+_COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+}
+
+
+def _resolve_column(data, column):
+    """Tìm cột theo tên, không phân biệt hoa thường (ví dụ 'year' -> 'Year')."""
+    if column in data.columns:
+        return column
+    matches = [col for col in data.columns if col.lower() == str(column).lower()]
+    if not matches:
+        raise KeyError(f"Không có cột '{column}' trong dữ liệu")
+    return matches[0]
+
+
+def _is_list(value):
+    return isinstance(value, (list, tuple, set, frozenset, np.ndarray, pd.Index))
+
+
+def _predicate(values, condition):
+    """Mặt nạ boolean (numpy) cho một cột và một điều kiện."""
+    if isinstance(condition, dict):
+        mask = np.ones(len(values), dtype=bool)
+        for op, operand in condition.items():
+            if op in _COMPARISONS:
+                mask &= np.asarray(_COMPARISONS[op](values, operand), dtype=bool)
+            elif op == 'between':
+                low, high = operand
+                mask &= np.asarray(values.between(low, high), dtype=bool)
+            elif op == 'in':
+                mask &= np.asarray(values.isin(list(operand)), dtype=bool)
+            elif op == 'not':
+                mask &= ~_predicate(values, operand)
+            else:
+                raise ValueError(f"Toán tử lọc không hợp lệ: '{op}'")
+        return mask
+    if _is_list(condition):
+        return np.asarray(values.isin(list(condition)), dtype=bool)
+    return np.asarray(values == condition, dtype=bool)
+
+
+def compile_filters(data, filters):
+    """
+    Gộp tất cả điều kiện lọc thành một mặt nạ boolean duy nhất.
+
+    Mỗi điều kiện có thể là:
+        - một giá trị: so sánh bằng, ví dụ {'Year': 2016}
+        - một danh sách: isin, ví dụ {'Region': ['Highlands', 'South East']}
+        - một dict toán tử: {'between': (2012, 2016)}, {'>=': 500, '<': 1000},
+          {'in': [...]}, {'not': giá trị/danh sách/dict toán tử}
+
+    Args:
+        data (pd.DataFrame): Dữ liệu cần lọc.
+        filters (dict): Tên cột -> điều kiện.
+
+    Returns:
+        np.ndarray: Mặt nạ boolean có độ dài bằng số dòng của data.
+    """
+    mask = np.ones(len(data), dtype=bool)
+    for column, condition in (filters or {}).items():
+        mask &= _predicate(data[_resolve_column(data, column)], condition)
+    return mask
+
+
+def filter_frame(data, filters):
+    """Lọc dữ liệu bằng một mặt nạ duy nhất (chỉ sao chép dữ liệu một lần)."""
+    if not filters:
+        return data
+    return data[compile_filters(data, filters)]
+
+
+def partition(data, by, filters=None):
+    """
+    Chia dữ liệu thành các phần theo giá trị của một cột trong một lần duyệt.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu.
+        by (str): Cột dùng để chia, ví dụ 'Year' hoặc 'Region'.
+        filters (dict, optional): Điều kiện lọc áp dụng trước khi chia.
+
+    Returns:
+        dict: Giá trị -> DataFrame con.
+    """
+    data = filter_frame(data, filters)
+    column = _resolve_column(data, by)
+    groups = data.groupby(column, observed=True, sort=False).indices
+    return {key: data.take(positions) for key, positions in groups.items()}
+
+
+@instrumented
+def write_partitions(data, by, output_dir, template="filtered_population_{}.csv", filters=None):
+    """
+    Ghi mỗi phần của dữ liệu (theo cột by) ra một file CSV (kèm sidecar Feather).
+
+    Args:
+        data (pd.DataFrame): Dữ liệu.
+        by (str): Cột dùng để chia.
+        output_dir (str): Thư mục lưu.
+        template (str): Mẫu tên file, {} được thay bằng giá trị của cột.
+        filters (dict, optional): Điều kiện lọc áp dụng trước khi chia.
+
+    Returns:
+        list: Đường dẫn các file đã ghi.
+    """
+    paths = []
+    for key, part in partition(data, by, filters).items():
+        path = os.path.join(output_dir, template.format(key))
+        save_dataset(part, path)
+        paths.append(path)
+    return paths
+
+
+@instrumented
+def filter_data(input_path, output_path, filters):
+    """
+    Lọc dữ liệu theo các điều kiện được cung cấp.
+
+    Args:
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        output_path (str): Đường dẫn lưu dữ liệu đã lọc.
+        filters (dict): Các điều kiện lọc dưới dạng cột và giá trị (xem compile_filters).
+                        Ví dụ: {'Year': 2016, 'Provinces/city': 'Ha Noi'}
+                        Hỗ trợ thêm danh sách (isin), khoảng và ngưỡng, phủ định:
+                        {'Year': {'between': (2012, 2016)},
+                         'Population density': {'>=': 500},
+                         'Region': {'not': ['Highlands']}}
+    """
+    try:
+        # Đọc dữ liệu đã làm sạch
+        data = load_dataset(input_path)
+        print("Đọc dữ liệu đã làm sạch thành công.")
+
+        # Áp dụng các điều kiện lọc (gộp thành một mặt nạ, chỉ sao chép dữ liệu một lần)
+        data = filter_frame(data, filters)
+
+        # Lưu dữ liệu đã lọc (kèm bản Feather)
+        save_dataset(data, output_path)
+        print(f"Dữ liệu đã lọc và lưu tại: {output_path}")
+
+    except Exception as e:
+        record_error(e)
+        print(f"Lỗi trong quá trình lọc dữ liệu: {e}")
+
+
+@instrumented
+def split_data(input_path, output_dir, by, filters=None):
+    """
+    Tách dữ liệu thành một file cho mỗi giá trị của cột `by` trong một lần duyệt.
+
+    Args:
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        output_dir (str): Thư mục lưu các file đã lọc.
+        by (str): Cột dùng để tách, ví dụ 'Year' hoặc 'Region'.
+        filters (dict, optional): Điều kiện lọc áp dụng trước khi tách (như filter_data).
+    """
+    try:
+        data = load_dataset(input_path)
+        print("Đọc dữ liệu đã làm sạch thành công.")
+
+        paths = write_partitions(data, by, output_dir, filters=filters)
+        print(f"Đã tách dữ liệu theo {by} thành {len(paths)} file trong: {output_dir}")
+
+    except Exception as e:
+        record_error(e)
+        print(f"Lỗi trong quá trình lọc dữ liệu: {e}")
+
+
+def _parse_value(text):
+    try:
+        return int(text)
+    except ValueError:
+        try:
+            return float(text)
+        except ValueError:
+            return text
+
+
+def parse_conditions(conditions):
+    """
+    Chuyển các điều kiện dạng chuỗi của dòng lệnh thành bộ lọc của compile_filters.
+
+    'COL=VALUE' lặp lại với cùng cột là isin; 'COL>=VALUE', 'COL<VALUE', 'COL!=VALUE'...
+    là các toán tử so sánh, ví dụ ['Year>=2012', 'Year<=2016', 'Region=Mekong Delta'].
+    """
+    filters = {}
+    for condition in conditions:
+        match = re.match(r"^(.+?)(==|!=|>=|<=|>|<|=)(.*)$", condition)
+        if match is None:
+            raise ValueError(f"Điều kiện lọc không hợp lệ: '{condition}' (dạng COL=VALUE hoặc COL>=VALUE)")
+        column, op, value = match.group(1).strip(), match.group(2), _parse_value(match.group(3).strip())
+        if op in ('=', '=='):
+            current = filters.get(column)
+            if current is None:
+                filters[column] = value
+            elif isinstance(current, list):
+                current.append(value)
+            elif isinstance(current, dict):
+                current.setdefault('in', []).append(value)
+            else:
+                filters[column] = [current, value]
+        else:
+            current = filters.get(column)
+            if not isinstance(current, dict):
+                current = filters[column] = {} if current is None else {'in': _as_values(current)}
+            current[op] = value
+    return filters
+
+
+def _as_values(value):
+    return list(value) if isinstance(value, list) else [value]
+
+
+def main(argv=None, by=None):
+    """
+    Dòng lệnh lọc/tách dữ liệu, dùng chung cho các script trong Filter_data/.
+
+        python scripts/query.py --where Year=2016 --output data/filtered/filtered_population.csv
+        python scripts/query.py --by Region --where "Year>=2012"
+
+    Args:
+        argv (list, optional): Tham số dòng lệnh (mặc định sys.argv).
+        by (str, optional): Cột tách mặc định khi không có --by/--output.
+    """
+    parser = argparse.ArgumentParser(description="Lọc hoặc tách dữ liệu dân số đã làm sạch")
+    parser.add_argument("--input", default=CLEANED_CSV, help="Dữ liệu đã làm sạch")
+    parser.add_argument("--where", action="append", default=[], metavar="COND",
+                        help="Điều kiện lọc (lặp lại được): COL=VALUE, COL>=VALUE, COL!=VALUE...")
+    parser.add_argument("--output", help="Lưu dữ liệu đã lọc vào một file")
+    parser.add_argument("--by", default=by, help="Tách thành một file cho mỗi giá trị của cột này")
+    parser.add_argument("--output-dir", help="Thư mục của các file đã tách (mặc định data/filtered/<cột>)")
+    args = parser.parse_args(argv)
+
+    try:
+        filters = parse_conditions(args.where)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.output:
+        filter_data(args.input, args.output, filters)
+    elif args.by:
+        output_dir = args.output_dir or FILTERED_DIRS.get(args.by)
+        if output_dir is None:
+            parser.error(f"Cần --output-dir khi tách theo cột {args.by}")
+        split_data(args.input, output_dir, args.by, filters or None)
+    else:
+        parser.error("Cần --output (lọc vào một file) hoặc --by (tách theo cột)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# scripts/rendering.py
+import atexit
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from scripts.chart_cache import get_chart_cache
+from scripts.instrument import count_charts
+
+# Số tiến trình vẽ mặc định, có thể đặt qua biến môi trường CHART_WORKERS
+DEFAULT_WORKERS = int(os.environ.get("CHART_WORKERS", "0")) or os.cpu_count() or 1
+
+# Chế độ batch (chạy không giao diện): bật bằng main.py --batch hoặc POPULATION_BATCH=1
+BATCH_ENV = "POPULATION_BATCH"
+_batch = os.environ.get(BATCH_ENV, "").lower() not in ("", "0", "false")
+if _batch:
+    import matplotlib
+    matplotlib.use("Agg")
+
+# Kiểu dáng mặc định, giống các biểu đồ cột trong Trend Analysis.py
+DEFAULT_STYLE = {
+    'title': "",
+    'xlabel': "Years",
+    'ylabel': "",
+    'figsize': (10, 6),
+    'color': None,
+    'colors': None,
+    'alpha': None,
+    'bar_width': 0.15,
+    'legend_title': None,
+    'marker': 'o',
+    'grid_axis': 'y',
+    'title_fontsize': 14,
+    'label_fontsize': 12,
+    'tick_fontsize': 10,
+    'legend_fontsize': 10,
+    'cmap': 'RdBu_r',
+    'annotate': None,
+    'colorbar_label': "",
+}
+
+_executor = None
+_executor_workers = None
+
+# Figure dùng lại theo bố cục (figsize, nrows, ncols) để không phải tạo mới cho mỗi biểu đồ
+_figures = {}
+
+
+def enable_batch_mode():
+    """
+    Bật chế độ batch: dùng backend Agg, bỏ qua mọi lệnh show() và tạo biểu đồ
+    bằng API hướng đối tượng (Figure) thay vì pyplot.
+    """
+    global _batch
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    # Các tiến trình con (pool vẽ) cũng kế thừa chế độ này
+    os.environ[BATCH_ENV] = "1"
+    _batch = True
+
+
+def is_batch_mode():
+    return _batch
+
+
+def _reusable_figure(figsize, nrows=1, ncols=1, **subplot_kw):
+    from matplotlib.figure import Figure
+
+    key = (tuple(figsize), nrows, ncols)
+    fig = _figures.get(key)
+    if fig is None:
+        fig = _figures[key] = Figure(figsize=figsize)
+    else:
+        fig.clear()
+    return fig, fig.subplots(nrows, ncols, **subplot_kw)
+
+
+def new_figure(figsize=(10, 6), nrows=1, ncols=1, **subplot_kw):
+    """
+    Tạo figure và các trục để vẽ.
+
+    Ở chế độ batch trả về một Figure dùng lại (không qua pyplot), ngược lại
+    dùng plt.subplots để vẫn có thể hiển thị bằng show().
+
+    Returns:
+        tuple: (fig, axes) giống plt.subplots.
+    """
+    if _batch:
+        return _reusable_figure(figsize, nrows, ncols, **subplot_kw)
+    import matplotlib.pyplot as plt
+    return plt.subplots(nrows, ncols, figsize=figsize, **subplot_kw)
+
+
+def show_figure(fig):
+    """Hiển thị figure (bỏ qua ở chế độ batch) rồi giải phóng nó."""
+    if _batch:
+        return
+    import matplotlib.pyplot as plt
+    plt.show()
+    plt.close(fig)
+
+
+def save_figure(fig, output_path, show=False):
+    """
+    Căn chỉnh bố cục, lưu figure ra file và (tùy chọn) hiển thị.
+
+    Args:
+        fig: Figure từ new_figure.
+        output_path (str): Đường dẫn file ảnh.
+        show (bool): Gọi show() sau khi lưu (không có tác dụng ở chế độ batch).
+    """
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    fig.savefig(output_path)
+    count_charts()
+    if show:
+        show_figure(fig)
+    elif not _batch:
+        import matplotlib.pyplot as plt
+        plt.close(fig)
+
+
+def chart_job(kind, x, series, output_path, **style):
+    """
+    Tạo mô tả một biểu đồ dưới dạng dữ liệu thuần (có thể gửi sang tiến trình khác).
+
+    Args:
+        kind (str): 'bar' (một chuỗi), 'grouped_bar' hoặc 'line' (nhiều chuỗi), hoặc 'heatmap'
+                    (mỗi chuỗi là một hàng của ma trận, thang màu đối xứng quanh 0; 'annotate'
+                    là định dạng số ghi trong ô, ví dụ "{:.1f}").
+        x (list): Nhãn trục x.
+        series (dict): Tên chuỗi -> danh sách giá trị (đã tổng hợp).
+        output_path (str): Đường dẫn file PNG.
+        **style: Ghi đè các khóa trong DEFAULT_STYLE.
+
+    Returns:
+        dict: Mô tả biểu đồ.
+    """
+    unknown = set(style) - set(DEFAULT_STYLE)
+    if unknown:
+        raise ValueError(f"Tham số kiểu dáng không hợp lệ: {sorted(unknown)}")
+    return {
+        'kind': kind,
+        'x': [str(value) for value in x],
+        'series': {str(name): [float(v) for v in values] for name, values in series.items()},
+        'style': {**DEFAULT_STYLE, **style},
+        'output_path': output_path,
+    }
+
+
+def facet_job(kind, x, panels, output_path, ncols=3, sharey=True, **style):
+    """
+    Tạo mô tả một figure dạng lưới (small multiples): mỗi ô là một biểu đồ `kind` nhỏ,
+    các ô dùng chung trục x (và trục y nếu sharey). Cả lưới được căn bố cục một lần và
+    lưu thành một file, thay vì một figure cho mỗi vùng.
+
+    Args:
+        kind (str): Loại biểu đồ của mỗi ô ('bar', 'grouped_bar' hoặc 'line').
+        x (list): Nhãn trục x (chung cho mọi ô).
+        panels (dict): Tiêu đề ô -> {tên chuỗi: danh sách giá trị}.
+        output_path (str): Đường dẫn file PNG.
+        ncols (int): Số cột của lưới.
+        sharey (bool): Các ô dùng chung thang đo trục y.
+        **style: Như chart_job; 'title', 'xlabel', 'ylabel' là của cả figure. Mặc định
+                 figsize theo số hàng/cột của lưới.
+
+    Returns:
+        dict: Mô tả biểu đồ (dùng với render_chart/render_jobs).
+    """
+    ncols = max(1, min(ncols, len(panels)))
+    nrows = math.ceil(len(panels) / ncols)
+    style.setdefault('figsize', (4.5 * ncols, 3.2 * nrows))
+    job = chart_job(kind, x, {}, output_path, **style)
+    job.update({
+        'kind': 'facets',
+        'panel_kind': kind,
+        'panels': {str(title): {str(name): [float(v) for v in values] for name, values in series.items()}
+                   for title, series in panels.items()},
+        'layout': {'nrows': nrows, 'ncols': ncols, 'sharey': sharey},
+    })
+    return job
+
+
+def _series_color(style, i):
+    """Màu của chuỗi thứ i: theo danh sách 'colors' nếu có, ngược lại dùng 'color'."""
+    if style['colors']:
+        return style['colors'][i % len(style['colors'])]
+    return style['color']
+
+
+def _draw(ax, job):
+    style = job['style']
+    x_labels = job['x']
+    series = job['series']
+
+    if job['kind'] == 'bar':
+        values = next(iter(series.values()))
+        ax.bar(x_labels, values, color=style['color'], alpha=style['alpha'])
+    elif job['kind'] == 'grouped_bar':
+        bar_width = style['bar_width']
+        x = np.arange(len(x_labels))
+        for i, (name, values) in enumerate(series.items()):
+            ax.bar(x + i * bar_width, values, width=bar_width, label=name, color=_series_color(style, i))
+        ax.set_xticks(x + bar_width * (len(series) / 2 - 0.5))
+        ax.set_xticklabels(x_labels, fontsize=style['tick_fontsize'])
+    elif job['kind'] == 'line':
+        for i, (name, values) in enumerate(series.items()):
+            ax.plot(x_labels, values, label=name, marker=style['marker'], color=_series_color(style, i))
+    elif job['kind'] == 'heatmap':
+        matrix = np.array(list(series.values()), dtype=np.float64).reshape(len(series), len(x_labels))
+        finite = np.isfinite(matrix)
+        limit = np.abs(matrix[finite]).max() if finite.any() else 1.0
+        image = ax.imshow(matrix, cmap=style['cmap'], vmin=-limit, vmax=limit, aspect='auto')
+        ax.set_xticks(np.arange(len(x_labels)), x_labels, rotation=45, ha='right', fontsize=style['tick_fontsize'])
+        ax.set_yticks(np.arange(len(series)), list(series), fontsize=style['tick_fontsize'])
+        if style['annotate']:
+            for row, col in zip(*np.nonzero(finite)):
+                ax.text(col, row, style['annotate'].format(matrix[row, col]), ha='center', va='center',
+                        fontsize=style['tick_fontsize'] - 2)
+        ax.figure.colorbar(image, ax=ax, label=style['colorbar_label'])
+    else:
+        raise ValueError(f"Loại biểu đồ không hỗ trợ: {job['kind']}")
+
+    ax.set_title(style['title'], fontsize=style['title_fontsize'])
+    ax.set_xlabel(style['xlabel'], fontsize=style['label_fontsize'])
+    ax.set_ylabel(style['ylabel'], fontsize=style['label_fontsize'])
+    if job['kind'] == 'heatmap':
+        return
+    if job['kind'] != 'bar':
+        ax.legend(title=style['legend_title'], fontsize=style['legend_fontsize'])
+    ax.grid(True, linestyle='--', alpha=0.6, axis=style['grid_axis'])
+
+
+def _draw_facets(job):
+    style = job['style']
+    layout = job['layout']
+    fig, axes = _reusable_figure(style['figsize'], layout['nrows'], layout['ncols'],
+                                 sharex=True, sharey=layout['sharey'], squeeze=False)
+    axes = axes.ravel()
+    panel_style = {**style, 'title_fontsize': style['label_fontsize'], 'xlabel': "", 'ylabel': ""}
+    count = len(job['panels'])
+    for i, (title, series) in enumerate(job['panels'].items()):
+        ax = axes[i]
+        _draw(ax, {'kind': job['panel_kind'], 'x': job['x'], 'series': series,
+                   'style': {**panel_style, 'title': title}})
+        # Chú thích giống nhau ở mọi ô, chỉ giữ ở ô đầu tiên
+        if i > 0 and ax.get_legend() is not None:
+            ax.get_legend().remove()
+        ax.label_outer()
+        # Ô không có ô nào bên dưới vẫn cần nhãn trục x
+        if i + layout['ncols'] >= count:
+            ax.tick_params(labelbottom=True)
+        ax.tick_params(axis='x', labelrotation=45)
+    for ax in axes[count:]:
+        ax.set_visible(False)
+
+    fig.suptitle(style['title'], fontsize=style['title_fontsize'])
+    fig.supxlabel(style['xlabel'], fontsize=style['label_fontsize'])
+    fig.supylabel(style['ylabel'], fontsize=style['label_fontsize'])
+    return fig
+
+
+def _render(job):
+    # Biểu đồ dạng job không bao giờ hiển thị, nên luôn dùng Figure (không qua pyplot)
+    if job['kind'] == 'facets':
+        fig = _draw_facets(job)
+    else:
+        fig, ax = _reusable_figure(job['style']['figsize'])
+        _draw(ax, job)
+    fig.tight_layout()
+    return fig
+
+
+def render_png(job):
+    """Vẽ một biểu đồ (chart_job hoặc facet_job) vào bộ nhớ. Trả về nội dung file PNG (bytes)."""
+    buffer = io.BytesIO()
+    _render(job).savefig(buffer, format='png')
+    return buffer.getvalue()
+
+
+def render_chart(job):
+    """Vẽ và lưu một biểu đồ từ mô tả của chart_job hoặc facet_job. Trả về đường dẫn file."""
+    fig = _render(job)
+    os.makedirs(os.path.dirname(job['output_path']) or ".", exist_ok=True)
+    # File cũ có thể là hard link tới bộ nhớ đệm biểu đồ: xóa trước để không ghi đè lên bản đệm
+    if os.path.exists(job['output_path']):
+        os.remove(job['output_path'])
+    fig.savefig(job['output_path'])
+    return job['output_path']
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+
+def get_executor(workers=None):
+    """Pool tiến trình vẽ dùng chung (backend Agg), tạo khi cần."""
+    return _get_executor(workers or DEFAULT_WORKERS)
+
+
+def _get_executor(workers):
+    global _executor, _executor_workers
+    if _executor is None or _executor_workers != workers:
+        shutdown()
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+        _executor_workers = workers
+    return _executor
+
+
+def shutdown():
+    """Đóng pool tiến trình vẽ (nếu có)."""
+    global _executor, _executor_workers
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
+        _executor_workers = None
+
+
+atexit.register(shutdown)
+
+
+def render_jobs(jobs, workers=None, cache=True):
+    """
+    Vẽ song song nhiều biểu đồ trên một pool tiến trình dùng backend Agg.
+
+    Pool được giữ lại giữa các lần gọi để không phải khởi động lại tiến trình
+    (và import lại matplotlib) cho mỗi hàm phân tích. Biểu đồ có số liệu và kiểu dáng
+    giống một bản đã vẽ được lấy từ bộ nhớ đệm biểu đồ (scripts/chart_cache.py) thay vì vẽ lại.
+
+    Args:
+        jobs (list): Các mô tả biểu đồ từ chart_job hoặc facet_job.
+        workers (int, optional): Số tiến trình, mặc định DEFAULT_WORKERS. 1 = vẽ tuần tự.
+        cache (bool): Dùng bộ nhớ đệm biểu đồ (trừ khi đã tắt bằng CHART_CACHE=0).
+
+    Returns:
+        list: Đường dẫn các file đã lưu, theo thứ tự của jobs.
+    """
+    jobs = list(jobs)
+    workers = workers or DEFAULT_WORKERS
+    chart_cache = get_chart_cache() if cache else None
+    pending = jobs if chart_cache is None else [job for job in jobs if not chart_cache.fetch(job)]
+    # Đếm ở tiến trình chính: các tiến trình vẽ không thấy phép đo đang chạy
+    count_charts(len(pending), cached=len(jobs) - len(pending))
+
+    if workers <= 1 or len(pending) <= 1:
+        for job in pending:
+            render_chart(job)
+    else:
+        list(_get_executor(workers).map(render_chart, pending))
+
+    if chart_cache is not None and pending:
+        for job in pending:
+            chart_cache.store(job)
+        chart_cache.evict()
+    return [job['output_path'] for job in jobs]
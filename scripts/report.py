@@ -0,0 +1,266 @@
+# scripts/report.py
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import xlsxwriter
+except ImportError:  # xlsxwriter là tùy chọn, chỉ cần cho bước tổng hợp báo cáo
+    xlsxwriter = None
+
+from scripts import aggregates, correlation
+from scripts.aggregates import build_cube, region_year_table, rollup
+from scripts.correlation import correlation_matrix, pairwise_stats, read_stats
+from scripts.dataset import (CLEANED_CSV, LABOR_RATE, METRIC_COLUMNS, add_labor_rate, load_dataset, save_dataset,
+                             widen)
+from scripts.instrument import instrumented
+from scripts.paths import CORRELATIONS_CSV, REPORT_XLSX, VISUALIZATIONS_DIR
+from scripts.pipeline import fingerprint
+
+# Bảng của từng sheet đã tính được lưu ở đây, sheet nào đầu vào không đổi thì không tính lại
+CACHE_DIR = os.path.join("outputs", "reports", ".cache")
+
+# Các chỉ số tổng hợp theo vùng (như Economic Impact/new.py)
+REGION_SUMMARY_NAMES = {
+    'Population density': 'Density',
+    'Average population': 'Population',
+    '15+ labor': 'Labor',
+    'Population grow ratio': 'Growth',
+}
+
+
+class _Summaries:
+    """
+    Các kết quả trung gian dùng chung cho mọi sheet, chỉ tính khi có sheet cần tính lại.
+
+    Toàn bộ số liệu theo (Year, Region) được lấy từ một lần groupby duy nhất (build_cube)
+    trên dữ liệu đã thêm cột tỷ lệ lao động. Bảng tương quan/hồi quy được đọc từ stats_path
+    (bước economy ghi bảng này cho mọi chỉ số và tỷ lệ lao động), chỉ tính lại khi file
+    không có, cũ hơn dữ liệu hoặc thiếu chỉ số.
+    """
+
+    def __init__(self, input_path, stats_path=CORRELATIONS_CSV):
+        self.input_path = input_path
+        self.stats_path = stats_path
+        self._data = None
+        self._cube = None
+        self._stats = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = add_labor_rate(widen(load_dataset(self.input_path)))
+        return self._data
+
+    @property
+    def cube(self):
+        if self._cube is None:
+            self._cube = build_cube(self.data)
+        return self._cube
+
+    @property
+    def stats(self):
+        if self._stats is None:
+            if self._stats_fresh():
+                stats = read_stats(self.stats_path)
+                if set(self.metrics) <= set(stats['x']):
+                    self._stats = stats
+            if self._stats is None:
+                self._stats = pairwise_stats(self.data, self.metrics)
+        return self._stats
+
+    def _stats_fresh(self):
+        if not self.stats_path or not os.path.exists(self.stats_path):
+            return False
+        return (not isinstance(self.input_path, str)
+                or os.path.getmtime(self.stats_path) >= os.path.getmtime(self.input_path))
+
+    @property
+    def metrics(self):
+        return [col for col in METRIC_COLUMNS + [LABOR_RATE] if col in self.data.columns]
+
+
+def region_summary_sheet(summaries):
+    """Trung bình, nhỏ nhất, lớn nhất của các chỉ số theo vùng."""
+    return pd.DataFrame({
+        f"{name}_{stat}": rollup(summaries.cube, 'Region', metric, stat)
+        for metric, name in REGION_SUMMARY_NAMES.items()
+        for stat in ['mean', 'min', 'max']
+    }).rename_axis('Region').reset_index()
+
+
+def describe_sheet(summaries):
+    """Thống kê mô tả (describe) của các chỉ số."""
+    return summaries.data[summaries.metrics].describe().rename_axis('statistic').reset_index()
+
+
+def correlation_sheet(summaries):
+    """Ma trận tương quan giữa các chỉ số."""
+    return correlation_matrix(summaries.stats, columns=summaries.metrics).rename_axis('metric').reset_index()
+
+
+def regression_sheet(summaries):
+    """Tương quan và hồi quy y ~ x của mọi cặp chỉ số, trên toàn bộ dữ liệu, theo vùng và theo năm."""
+    return summaries.stats
+
+
+def labor_rate_sheet(summaries):
+    """Tỷ lệ lao động trung bình (%) theo năm và vùng."""
+    return region_year_table(summaries.cube, LABOR_RATE).rename_axis(columns=None).reset_index()
+
+
+def labor_extremes_sheet(summaries):
+    """Vùng có lực lượng lao động cao nhất/thấp nhất mỗi năm (như analyze_labor_force)."""
+    table = region_year_table(summaries.cube, '15+ labor')
+    # Bỏ các năm không có số liệu của vùng nào (nanargmax/nanargmin lỗi trên dòng toàn NaN)
+    table = table[table.notna().any(axis=1)]
+    values = table.to_numpy(dtype=np.float64)
+    highest, lowest = np.nanargmax(values, axis=1), np.nanargmin(values, axis=1)
+    rows = np.arange(len(table))
+    regions = np.asarray(table.columns, dtype=object)
+    return pd.DataFrame({
+        'Year': table.index,
+        'Highest region': regions[highest],
+        'Highest labor (thousand)': values[rows, highest],
+        'Lowest region': regions[lowest],
+        'Lowest labor (thousand)': values[rows, lowest],
+    })
+
+
+def charts_sheet(summaries, visualizations_dir=VISUALIZATIONS_DIR):
+    """Danh sách các biểu đồ đã vẽ (đường dẫn tính từ thư mục gốc của dự án)."""
+    paths = []
+    for folder, _, files in sorted(os.walk(visualizations_dir)):
+        paths += [os.path.join(folder, name) for name in sorted(files) if name.lower().endswith('.png')]
+    return pd.DataFrame({
+        'Folder': [os.path.relpath(os.path.dirname(path), visualizations_dir) for path in paths],
+        'Chart': [os.path.splitext(os.path.basename(path))[0] for path in paths],
+        'Path': paths,
+    })
+
+
+# Các sheet của báo cáo: tên -> (hàm tính bảng, đầu vào là dữ liệu, bảng tương quan hay thư mục biểu đồ)
+SHEETS = {
+    'Region summary': (region_summary_sheet, 'data'),
+    'Describe': (describe_sheet, 'data'),
+    'Correlation': (correlation_sheet, 'stats'),
+    'Regression': (regression_sheet, 'stats'),
+    'Labor rate': (labor_rate_sheet, 'data'),
+    'Labor extremes': (labor_extremes_sheet, 'data'),
+    'Charts': (charts_sheet, 'charts'),
+}
+
+
+def _sheet_fingerprint(name, input_path, visualizations_dir, stats_path=CORRELATIONS_CSV):
+    builder, source = SHEETS[name]
+    inputs = {'data': [input_path], 'stats': [input_path, stats_path], 'charts': [visualizations_dir]}[source]
+    # Mã của hàm tính sheet (và phần dùng chung: _Summaries, cube, bảng tương quan) cũng là
+    # đầu vào: sửa một hàm chỉ tính lại các sheet dùng nó
+    code = inspect.getsource(builder)
+    if source != 'charts':
+        code += inspect.getsource(_Summaries) + inspect.getsource(aggregates)
+    if source == 'stats':
+        code += inspect.getsource(correlation)
+    return fingerprint([os.path.normpath(path) for path in inputs if path], {'sheet': name, 'code': code})
+
+
+def _cache_path(cache_dir, name):
+    return os.path.join(cache_dir, name.replace(' ', '_') + ".csv")
+
+
+def _cell(value):
+    """Giá trị ghi được vào ô Excel (NaN -> ô trống, kiểu numpy -> kiểu Python)."""
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value if value is None or isinstance(value, (int, str)) else str(value)
+
+
+def _write_table(workbook, name, table, report_dir):
+    """Ghi một bảng lên sheet theo từng dòng (ở chế độ constant_memory dòng đã ghi được giải phóng ngay)."""
+    sheet = workbook.add_worksheet(name)
+    header = workbook.add_format({'bold': True, 'bg_color': '#DDEBF7', 'border': 1})
+    number = workbook.add_format({'num_format': '#,##0.00'})
+    sheet.write_row(0, 0, list(table.columns), header)
+    sheet.set_column(0, len(table.columns) - 1, 18)
+
+    link_column = table.columns.get_loc('Path') if 'Path' in table.columns else None
+    for row, values in enumerate(table.itertuples(index=False, name=None), start=1):
+        for col, value in enumerate(values):
+            value = _cell(value)
+            if col == link_column:
+                # Biểu đồ được liên kết tới file PNG (không nhúng ảnh vào báo cáo)
+                target = os.path.relpath(value, report_dir).replace(os.sep, '/')
+                sheet.write_url(row, col, f"external:{target}", string=value)
+            elif isinstance(value, float):
+                sheet.write_number(row, col, value, number)
+            else:
+                sheet.write(row, col, value)
+    sheet.freeze_panes(1, 0)
+
+
+@instrumented
+def build_report(input_path=CLEANED_CSV, output_path=REPORT_XLSX, visualizations_dir=VISUALIZATIONS_DIR,
+                 cache_dir=CACHE_DIR, stats_path=CORRELATIONS_CSV):
+    """
+    Tổng hợp báo cáo Excel từ dữ liệu đã làm sạch và các biểu đồ đã vẽ.
+
+    Mỗi sheet có dấu vân tay riêng (đầu vào và mã của hàm tính sheet); chỉ các sheet có
+    dấu vân tay thay đổi mới được tính lại, các sheet khác đọc lại bảng đã lưu. File XLSX
+    được ghi bằng xlsxwriter ở chế độ constant_memory (ghi từng dòng, bộ nhớ không tăng
+    theo kích thước bảng), biểu đồ được liên kết tới file PNG thay vì nhúng vào.
+
+    Args:
+        input_path (str): Đường dẫn dữ liệu đã làm sạch.
+        output_path (str): Đường dẫn file XLSX.
+        visualizations_dir (str): Thư mục chứa các biểu đồ đã vẽ.
+        cache_dir (str): Thư mục lưu bảng và dấu vân tay của từng sheet.
+        stats_path (str, optional): Bảng tương quan/hồi quy đã tính ở bước economy (None để tính lại).
+
+    Returns:
+        dict: Tên sheet -> "rebuilt" hoặc "cached".
+    """
+    if xlsxwriter is None:
+        print("Lỗi: cần cài xlsxwriter để tạo báo cáo (pip install XlsxWriter).")
+        return {}
+
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+
+    summaries = _Summaries(input_path, stats_path)
+    tables, status = {}, {}
+    for name, (builder, source) in SHEETS.items():
+        key = _sheet_fingerprint(name, input_path, visualizations_dir, stats_path)
+        path = _cache_path(cache_dir, name)
+        if manifest.get(name) == key and os.path.exists(path):
+            tables[name] = widen(load_dataset(path))
+            status[name] = "cached"
+            continue
+        table = builder(summaries, visualizations_dir) if source == 'charts' else builder(summaries)
+        save_dataset(table, path)
+        manifest[name] = key
+        tables[name] = table
+        status[name] = "rebuilt"
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    workbook = xlsxwriter.Workbook(output_path, {'constant_memory': True})
+    try:
+        report_dir = os.path.dirname(os.path.abspath(output_path))
+        for name, table in tables.items():
+            _write_table(workbook, name, table, report_dir)
+    finally:
+        workbook.close()
+
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    rebuilt = [name for name, state in status.items() if state == "rebuilt"]
+    print(f"Báo cáo đã được lưu tại: {output_path} (tính lại: {', '.join(rebuilt) or 'không có'})")
+    return status
@@ -0,0 +1,229 @@
+# scripts/schema.py
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts.dataset import DTYPES, REGIONS
+
+# Mô tả bộ dữ liệu dân số: cột -> ràng buộc
+#   dtype     kiểu dữ liệu (giá trị không chuyển được sang kiểu số là vi phạm 'type')
+#   not_null  không được thiếu (các chỉ số được phép thiếu vì bước làm sạch điền theo tỉnh)
+#   allowed   danh sách giá trị hợp lệ
+#   min/max   khoảng giá trị hợp lý (gồm cả hai đầu)
+SCHEMA = {
+    'Provinces/city': {'dtype': DTYPES['Provinces/city'], 'not_null': True},
+    'Region': {'dtype': DTYPES['Region'], 'not_null': True, 'allowed': REGIONS},
+    'Year': {'dtype': DTYPES['Year'], 'not_null': True, 'min': 1990, 'max': 2100},
+    'Population density': {'dtype': DTYPES['Population density'], 'min': 1, 'max': 50_000},
+    'Average population': {'dtype': DTYPES['Average population'], 'min': 1, 'max': 20_000},
+    'Sex ratio': {'dtype': DTYPES['Sex ratio'], 'min': 80, 'max': 130},
+    'Population grow ratio': {'dtype': DTYPES['Population grow ratio'], 'min': -20, 'max': 20},
+    '15+ labor': {'dtype': DTYPES['15+ labor'], 'min': 0, 'max': 20_000},
+}
+
+# Mỗi tỉnh chỉ có một dòng cho mỗi năm
+UNIQUE_KEY = ['Provinces/city', 'Year']
+
+# Ràng buộc giữa các cột: (tên, cột trái, cột phải) với trái <= phải
+ROW_RULES = [
+    ('15+ labor <= Average population', '15+ labor', 'Average population'),
+]
+
+# Số ví dụ (tỉnh, năm) giữ lại cho mỗi loại vi phạm trong báo cáo
+MAX_EXAMPLES = 5
+
+
+class SchemaError(ValueError):
+    """Dữ liệu thiếu cột bắt buộc, không kiểm tra được từng dòng."""
+
+
+def check_columns(columns, schema=SCHEMA):
+    """Báo lỗi SchemaError nếu thiếu cột nào trong schema."""
+    missing = [col for col in schema if col not in columns]
+    if missing:
+        raise SchemaError(f"Thiếu các cột sau: {missing}")
+
+
+def _numeric(values):
+    if pd.api.types.is_numeric_dtype(values.dtype):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan), np.zeros(len(values), dtype=bool)
+    numbers = pd.to_numeric(values, errors='coerce')
+    bad_type = (values.notna() & numbers.isna()).to_numpy()
+    return numbers.to_numpy(dtype=np.float64, na_value=np.nan), bad_type
+
+
+def _key_column(values, spec):
+    """
+    Giá trị của một cột khóa ở dạng chuẩn, không phụ thuộc kiểu mà pandas suy ra cho từng chunk:
+    cột chữ được bỏ khoảng trắng, cột số thành Int64 (chunk có NaN đọc Year là float, 2011.0
+    phải trùng với 2011). Giá trị không phải số nguyên thành NA (dòng đó đã vi phạm 'type').
+    """
+    if spec['dtype'] == 'category':
+        return values.astype('string').str.strip()
+    numbers = pd.to_numeric(values, errors='coerce').astype(np.float64)
+    return numbers.where(numbers == numbers.round()).astype('Int64')
+
+
+def _key_hashes(data, unique, schema=SCHEMA):
+    """Khóa (tỉnh, năm) của mỗi dòng dưới dạng một số nguyên int64 (hash của khóa đã chuẩn hóa)."""
+    keys = pd.DataFrame({col: _key_column(data[col], schema.get(col, {'dtype': 'category'})) for col in unique})
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy().view(np.int64)
+
+
+def _duplicates(hashes, valid, seen):
+    """
+    Dòng trùng khóa với một dòng hợp lệ đứng trước nó (trong chunk này hoặc trong `seen`).
+
+    Chỉ dòng hợp lệ mới "giữ chỗ" cho khóa: dòng hợp lệ đầu tiên sau một dòng sai cùng khóa
+    không bị coi là trùng lặp.
+    """
+    codes, uniques = pd.factorize(hashes)
+    positions = np.arange(len(hashes))
+    # Vị trí dòng hợp lệ đầu tiên của mỗi khóa trong chunk
+    first_valid = np.full(len(uniques), len(hashes))
+    np.minimum.at(first_valid, codes[valid], positions[valid])
+    in_seen = np.fromiter((key in seen for key in uniques.tolist()), dtype=bool, count=len(uniques))
+    return in_seen[codes] | (first_valid[codes] < positions)
+
+
+class Validator:
+    """
+    Kiểm tra dữ liệu theo SCHEMA trong một lần duyệt bằng phép toán trên mảng.
+
+    Mỗi quy tắc cho ra một mảng bool (dòng vi phạm); kết quả là ma trận dòng x quy tắc.
+    Có thể gọi lần lượt trên từng chunk của một file: hash int64 của các khóa (tỉnh, năm)
+    hợp lệ đã gặp ở chunk trước được giữ trong một set, cập nhật dần theo từng chunk, để phát
+    hiện dòng trùng lặp giữa các chunk (giữ dòng hợp lệ xuất hiện trước).
+
+    Args:
+        schema (dict): Ràng buộc theo cột.
+        unique (list): Các cột tạo thành khóa duy nhất.
+        row_rules (list): Ràng buộc giữa các cột.
+    """
+
+    def __init__(self, schema=SCHEMA, unique=UNIQUE_KEY, row_rules=ROW_RULES):
+        self.schema = schema
+        self.unique = unique
+        self.row_rules = row_rules
+        self._seen = set()
+        self.rows = 0
+        self.counts = {}
+        self.examples = {}
+
+    def check(self, data):
+        """
+        Kiểm tra một DataFrame (hoặc một chunk).
+
+        Returns:
+            pd.DataFrame: Ma trận bool (cùng chỉ mục với data), mỗi cột là một quy tắc.
+        """
+        check_columns(data.columns, self.schema)
+        rules = {}
+        numbers = {}
+        for col, spec in self.schema.items():
+            values = data[col]
+            if spec.get('not_null'):
+                rules[f"{col}: missing"] = values.isna().to_numpy()
+            if spec.get('allowed') is not None:
+                rules[f"{col}: not allowed"] = (values.notna() & ~values.isin(spec['allowed'])).to_numpy()
+            if spec['dtype'] != 'category':
+                numbers[col], rules[f"{col}: type"] = _numeric(values)
+                # NaN so sánh luôn False: giá trị thiếu không bị tính là ngoài khoảng
+                with np.errstate(invalid='ignore'):
+                    if 'min' in spec:
+                        rules[f"{col}: < {spec['min']}"] = numbers[col] < spec['min']
+                    if 'max' in spec:
+                        rules[f"{col}: > {spec['max']}"] = numbers[col] > spec['max']
+
+        for name, left, right in self.row_rules:
+            with np.errstate(invalid='ignore'):
+                rules[name] = numbers[left] > numbers[right]
+
+        hashes = _key_hashes(data, self.unique, self.schema)
+        valid = ~np.any(np.column_stack(list(rules.values())), axis=1) if rules else np.ones(len(data), dtype=bool)
+        duplicate = _duplicates(hashes, valid, self._seen)
+        rules[f"duplicate ({', '.join(self.unique)})"] = duplicate
+        # Chỉ nhớ khóa của các dòng được giữ lại
+        self._seen.update(hashes[valid & ~duplicate].tolist())
+
+        violations = pd.DataFrame(rules, index=data.index)
+        self._record(data, violations)
+        return violations
+
+    def _record(self, data, violations):
+        self.rows += len(data)
+        counts = violations.sum()
+        for rule in counts[counts > 0].index:
+            self.counts[rule] = self.counts.get(rule, 0) + int(counts[rule])
+            examples = self.examples.setdefault(rule, [])
+            if len(examples) < MAX_EXAMPLES:
+                bad = data.loc[violations[rule].to_numpy(), self.unique].head(MAX_EXAMPLES - len(examples))
+                examples += [" / ".join(str(value) for value in row) for row in bad.itertuples(index=False)]
+
+    def report(self, quarantined):
+        """Báo cáo gọn: số dòng, số dòng bị loại, số vi phạm và vài ví dụ của mỗi quy tắc."""
+        return {
+            'rows': self.rows,
+            'valid': self.rows - quarantined,
+            'quarantined': quarantined,
+            'violations': dict(sorted(self.counts.items(), key=lambda item: -item[1])),
+            'examples': self.examples,
+        }
+
+
+def quarantine_rows(data, violations):
+    """Các dòng vi phạm, kèm cột 'violations' liệt kê các quy tắc bị vi phạm."""
+    bad = violations.any(axis=1).to_numpy()
+    if not bad.any():
+        return data.iloc[:0].assign(violations=pd.Series(dtype=object))
+    flags = violations.to_numpy()[bad]
+    names = np.asarray(violations.columns, dtype=object)
+    labels = ["; ".join(names[row]) for row in flags]
+    return data.loc[bad].assign(violations=labels)
+
+
+def validate(data, schema=SCHEMA):
+    """
+    Kiểm tra toàn bộ một DataFrame.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số.
+        schema (dict): Ràng buộc theo cột.
+
+    Returns:
+        tuple: (dữ liệu hợp lệ, các dòng bị loại kèm cột 'violations', báo cáo dạng dict).
+    """
+    validator = Validator(schema)
+    violations = validator.check(data)
+    quarantined = quarantine_rows(data, violations)
+    return data.loc[~violations.any(axis=1).to_numpy()], quarantined, validator.report(len(quarantined))
+
+
+def save_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def print_report(report):
+    print(f"Kiểm tra dữ liệu: {report['rows']} dòng, {report['quarantined']} dòng bị loại.")
+    for rule, count in report['violations'].items():
+        print(f"  - {rule}: {count} (ví dụ: {', '.join(report['examples'].get(rule, []))})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Kiểm tra một file dữ liệu dân số theo schema")
+    parser.add_argument("path", help="File CSV cần kiểm tra")
+    args = parser.parse_args()
+
+    raw = pd.read_csv(args.path, encoding='utf-8-sig', dtype=str)
+    raw.rename(columns=lambda x: x.strip(), inplace=True)
+    raw = raw.apply(lambda col: col.str.strip())
+    _, _, result = validate(raw)
+    print_report(result)
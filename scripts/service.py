@@ -0,0 +1,362 @@
+# scripts/service.py
+import argparse
+import asyncio
+import collections
+import json
+import os
+import sys
+import time
+from urllib.parse import parse_qs, urlsplit
+
+# Cho phép import các module dùng chung trong thư mục scripts/ khi chạy trực tiếp file này
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from scripts.dataset import CLEANED_CSV, METRIC_COLUMNS, load_dataset, widen
+from scripts.query import filter_frame
+from scripts.rendering import chart_job, enable_batch_mode, facet_job, get_executor, render_png
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8050
+
+# Số kết quả (bảng JSON hoặc ảnh PNG) giữ trong bộ nhớ đệm LRU
+DEFAULT_CACHE_SIZE = 256
+
+AGGREGATIONS = ('mean', 'sum', 'min', 'max', 'median', 'count')
+
+# Tham số của GET không phải là bộ lọc
+_QUERY_KEYS = {'by', 'metrics', 'metric', 'agg', 'kind', 'series', 'title', 'filters'}
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            500: "Internal Server Error"}
+
+
+class LRUCache:
+    """
+    Bộ nhớ đệm LRU có giới hạn số phần tử, kèm số lần trúng/trượt.
+
+    Args:
+        maxsize (int): Số phần tử tối đa; phần tử dùng lâu nhất bị loại trước.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._items = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key not in self._items:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._items.move_to_end(key)
+        return self._items[key]
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.maxsize:
+            self._items.popitem(last=False)
+
+    def clear(self):
+        self._items.clear()
+
+    def stats(self):
+        return {'size': len(self._items), 'maxsize': self.maxsize, 'hits': self.hits, 'misses': self.misses}
+
+
+def _as_list(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(',') if part.strip()]
+    return list(value)
+
+
+def _parse_value(text):
+    """Giá trị bộ lọc từ chuỗi truy vấn: số nếu đọc được, ngược lại giữ nguyên chuỗi."""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_query_string(query_string):
+    """
+    Chuyển chuỗi truy vấn của GET thành truy vấn dạng dict (như phần thân JSON của POST).
+
+    Các tham số by/metrics/metric/agg/kind/series/title giữ nguyên ý nghĩa; 'filters' là
+    bộ lọc dạng JSON; mọi tham số khác là bộ lọc bằng (lặp lại tham số để lọc theo danh sách),
+    ví dụ ?Region=Mekong%20Delta&Year=2015&metrics=15%2B%20labor.
+    """
+    params = parse_qs(query_string, keep_blank_values=False)
+    query = {key: values[-1] for key, values in params.items() if key in _QUERY_KEYS}
+    filters = json.loads(query.pop('filters')) if 'filters' in query else {}
+    for key, values in params.items():
+        if key not in _QUERY_KEYS:
+            values = [_parse_value(value) for value in values]
+            filters[key] = values[0] if len(values) == 1 else values
+    if filters:
+        query['filters'] = filters
+    return query
+
+
+def aggregate(data, filters=None, by=None, metrics=None, agg='mean'):
+    """
+    Lọc rồi tổng hợp dữ liệu trong một lần groupby.
+
+    Args:
+        data (pd.DataFrame): Dữ liệu dân số.
+        filters (dict, optional): Bộ lọc như filter_data (xem scripts/query.py).
+        by (list, optional): Các cột nhóm (mặc định ['Year']). Danh sách rỗng: tổng hợp toàn bộ.
+        metrics (list, optional): Các chỉ số (mặc định mọi chỉ số có trong dữ liệu).
+        agg (str): Một trong AGGREGATIONS.
+
+    Returns:
+        pd.DataFrame: Một dòng cho mỗi nhóm.
+    """
+    if agg not in AGGREGATIONS:
+        raise ValueError(f"Phép tổng hợp không hợp lệ: {agg} (chọn một trong {list(AGGREGATIONS)})")
+    by = ['Year'] if by is None else _as_list(by)
+    metrics = _as_list(metrics) or [col for col in METRIC_COLUMNS if col in data.columns]
+    unknown = [col for col in by + metrics if col not in data.columns]
+    if unknown:
+        raise KeyError(f"Không tìm thấy cột: {unknown}")
+
+    if filters:
+        data = filter_frame(data, filters)
+    data = widen(data, list(dict.fromkeys(by + metrics)))
+    if not by:
+        return data[metrics].agg(agg).to_frame().T
+    return data.groupby(by, observed=True)[metrics].agg(agg).reset_index()
+
+
+def build_chart_job(data, query):
+    """
+    Mô tả biểu đồ cho một truy vấn: chỉ số `metric` theo năm, mỗi giá trị của cột `series`
+    (mặc định Region) là một chuỗi. kind: 'bar' (một chuỗi), 'grouped_bar', 'line' hoặc
+    'facets' (mỗi chuỗi một ô, xem facet_job).
+    """
+    metric = query.get('metric')
+    if not metric:
+        raise ValueError("Thiếu tham số 'metric'")
+    series_column = query.get('series', 'Region')
+    agg = query.get('agg', 'mean')
+    table = aggregate(data, query.get('filters'), ['Year', series_column], [metric], agg)
+    table = table.pivot(index='Year', columns=series_column, values=metric)
+    if table.empty:
+        raise ValueError("Không có dữ liệu khớp với bộ lọc")
+
+    years = table.index.astype(str)
+    series = {str(name): table[name] for name in table.columns}
+    kind = query.get('kind') or ('bar' if len(series) == 1 else 'grouped_bar')
+    title = query.get('title') or f"{metric} ({agg})"
+    if kind == 'facets':
+        return facet_job('bar', years, {name: {name: values} for name, values in series.items()}, None,
+                         title=title, ylabel=metric, color='skyblue', alpha=0.8)
+    if kind == 'bar' and len(series) > 1:
+        raise ValueError("kind='bar' chỉ vẽ được một chuỗi, hãy dùng grouped_bar, line hoặc facets")
+    return chart_job(kind, years, series, None, title=title, ylabel=metric, figsize=(10, 6),
+                     legend_title=series_column, color='skyblue')
+
+
+def query_result(data, query):
+    """Bảng tổng hợp của một truy vấn (xem aggregate), dạng dict có thể chuyển thành JSON."""
+    table = aggregate(data, query.get('filters'), query.get('by'), query.get('metrics'), query.get('agg', 'mean'))
+    return {'columns': list(table.columns), 'rows': json.loads(table.to_json(orient='records'))}
+
+
+class QueryService:
+    """
+    Dịch vụ truy vấn giữ dữ liệu đã làm sạch trong bộ nhớ.
+
+    Bảng tổng hợp được tính trên DataFrame đã nạp trong một luồng khác, biểu đồ được vẽ vào
+    bộ nhớ trên pool tiến trình vẽ (scripts/rendering.py), để không chặn vòng lặp sự kiện. Cả hai
+    loại kết quả được lưu trong bộ nhớ đệm LRU theo nội dung truy vấn; khi file dữ liệu
+    thay đổi (load_dataset trả về bản mới) bộ nhớ đệm được xóa.
+
+    Args:
+        input_path (str | pd.DataFrame): Đường dẫn dữ liệu đã làm sạch hoặc DataFrame đã nạp sẵn.
+        cache_size (int): Số kết quả tối đa trong bộ nhớ đệm.
+        workers (int, optional): Số tiến trình vẽ.
+    """
+
+    def __init__(self, input_path=CLEANED_CSV, cache_size=DEFAULT_CACHE_SIZE, workers=None):
+        self.input_path = input_path
+        self.workers = workers
+        self.cache = LRUCache(cache_size)
+        self._data = None
+        self._pending = {}
+
+    @property
+    def data(self):
+        data = load_dataset(self.input_path)
+        if data is not self._data:
+            self._data = data
+            self.cache.clear()
+        return data
+
+    def _shared(self, key, compute):
+        """
+        Kết quả của `compute()` cho một khóa. Các truy vấn giống nhau đến cùng lúc dùng chung
+        một task, kết quả được lưu vào bộ nhớ đệm khi task xong.
+
+        Mỗi yêu cầu chờ task qua asyncio.shield, nên một kết nối bị hủy (client ngắt) không
+        hủy task mà các yêu cầu khác đang chờ.
+        """
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(compute())
+            pending.add_done_callback(lambda task: self._finish(key, task))
+        return asyncio.shield(pending)
+
+    def _finish(self, key, task):
+        self._pending.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self.cache.put(key, task.result())
+
+    async def query(self, query):
+        """Bảng tổng hợp của một truy vấn, dạng dict có thể chuyển thành JSON."""
+        data = self.data
+        key = json.dumps(['query', query], sort_keys=True, default=str)
+        result = self.cache.get(key)
+        if result is not None:
+            return result
+        # groupby của pandas chạy trên luồng khác, không chặn vòng lặp sự kiện (các kết nối khác)
+        loop = asyncio.get_running_loop()
+        return await self._shared(key, lambda: loop.run_in_executor(None, query_result, data, query))
+
+    async def chart(self, query):
+        """Ảnh PNG (bytes) của một truy vấn biểu đồ."""
+        data = self.data
+        key = json.dumps(['chart', query], sort_keys=True, default=str)
+        png = self.cache.get(key)
+        if png is not None:
+            return png
+
+        async def render():
+            loop = asyncio.get_running_loop()
+            job = await loop.run_in_executor(None, build_chart_job, data, query)
+            return await loop.run_in_executor(get_executor(self.workers), render_png, job)
+
+        return await self._shared(key, render)
+
+    async def handle(self, method, target, body=b""):
+        """
+        Xử lý một yêu cầu HTTP.
+
+            GET  /health              trạng thái và thống kê bộ nhớ đệm
+            GET  /columns             các cột và kiểu dữ liệu
+            GET  /query?...           bảng tổng hợp (JSON), POST /query với thân JSON
+            GET  /chart?...           biểu đồ PNG, POST /chart với thân JSON
+
+        Returns:
+            tuple: (mã trạng thái, content type, nội dung bytes).
+        """
+        url = urlsplit(target)
+        route = url.path.rstrip('/') or '/'
+        try:
+            if method == 'POST':
+                query = json.loads(body or b"{}")
+                if not isinstance(query, dict):
+                    raise ValueError("Thân yêu cầu phải là một object JSON")
+            elif method == 'GET':
+                query = parse_query_string(url.query)
+            else:
+                return _json(405, {'error': f"Không hỗ trợ phương thức {method}"})
+
+            if route == '/health':
+                return _json(200, {'status': 'ok', 'rows': len(self.data), 'cache': self.cache.stats()})
+            if route == '/columns':
+                return _json(200, {col: str(dtype) for col, dtype in self.data.dtypes.items()})
+            if route == '/query':
+                return _json(200, await self.query(query))
+            if route == '/chart':
+                return 200, "image/png", await self.chart(query)
+            return _json(404, {'error': f"Không có đường dẫn {url.path}"})
+        except (KeyError, ValueError, TypeError) as e:
+            # KeyError thêm dấu nháy quanh thông báo khi dùng str(e)
+            return _json(400, {'error': str(e.args[0]) if e.args else str(e)})
+        except Exception as e:
+            print(f"Lỗi khi xử lý {method} {target}: {e}")
+            return _json(500, {'error': str(e)})
+
+
+def _json(status, payload):
+    return status, "application/json; charset=utf-8", json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+async def _read_request(reader):
+    """Đọc một yêu cầu HTTP/1.1. Trả về (method, target, headers, body) hoặc None khi kết nối đóng."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length') or 0)
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+async def _serve_connection(service, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            start = time.perf_counter()
+            status, content_type, payload = await service.handle(method, target, body)
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            writer.write(
+                f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                f"X-Response-Time-Ms: {(time.perf_counter() - start) * 1000:.1f}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload)
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(input_path=CLEANED_CSV, host=DEFAULT_HOST, port=DEFAULT_PORT, cache_size=DEFAULT_CACHE_SIZE,
+                workers=None):
+    """Chạy dịch vụ cho tới khi bị dừng (Ctrl+C)."""
+    service = QueryService(input_path, cache_size, workers)
+    print(f"Đã nạp {len(service.data)} dòng từ {input_path}")
+    # Vẽ thử một biểu đồ nhỏ để tiến trình vẽ import xong matplotlib trước yêu cầu đầu tiên
+    await asyncio.get_running_loop().run_in_executor(
+        get_executor(workers), render_png, chart_job('bar', ['0'], {'': [0]}, None, figsize=(1, 1)))
+    server = await asyncio.start_server(lambda r, w: _serve_connection(service, r, w), host, port)
+    print(f"Dịch vụ truy vấn đang chạy tại http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dịch vụ HTTP truy vấn số liệu và biểu đồ dân số")
+    parser.add_argument("--data", default=CLEANED_CSV, help="Dữ liệu đã làm sạch")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE,
+                        help="Số kết quả giữ trong bộ nhớ đệm LRU")
+    parser.add_argument("--workers", type=int, help="Số tiến trình vẽ biểu đồ")
+    args = parser.parse_args()
+
+    enable_batch_mode()
+    try:
+        asyncio.run(serve(args.data, args.host, args.port, args.cache_size, args.workers))
+    except KeyboardInterrupt:
+        pass
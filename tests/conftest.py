@@ -0,0 +1,70 @@
+# tests/conftest.py
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Cho phép import các module trong scripts/ khi chạy pytest từ thư mục gốc của dự án
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from scripts.dataset import REGIONS, clear_cache, save_dataset  # noqa: E402
+
+
+def make_population(n_provinces=12, years=range(2011, 2017), seed=0, missing=0.0):
+    """
+    Bộ dữ liệu dân số giả cùng cấu trúc với cleaned_population.csv: mỗi tỉnh một dòng cho
+    mỗi năm, các chỉ số làm tròn 1-2 chữ số thập phân như dữ liệu gốc.
+
+    Args:
+        n_provinces (int): Số tỉnh (chia đều cho các vùng trong REGIONS).
+        years (iterable): Các năm.
+        seed (int): Hạt giống ngẫu nhiên.
+        missing (float): Tỷ lệ giá trị thiếu (NaN) trong các chỉ số.
+    """
+    rng = np.random.default_rng(seed)
+    years = list(years)
+    provinces = [f"Province {i:02d}" for i in range(n_provinces)]
+    regions = [REGIONS[i % len(REGIONS)] for i in range(n_provinces)]
+    rows = len(provinces) * len(years)
+
+    base = rng.uniform(500, 5000, n_provinces)
+    trend = rng.uniform(0.005, 0.03, n_provinces)
+    step = np.tile(np.arange(len(years)), n_provinces)
+    population = (np.repeat(base, len(years)) * (1 + np.repeat(trend, len(years))) ** step).round(1)
+    data = pd.DataFrame({
+        'Provinces/city': np.repeat(provinces, len(years)),
+        'Region': np.repeat(regions, len(years)),
+        'Year': np.tile(years, n_provinces),
+        'Population density': rng.uniform(50, 4000, rows).round(1),
+        'Average population': population,
+        'Sex ratio': rng.uniform(90, 110, rows).round(1),
+        'Population grow ratio': rng.uniform(-1, 3, rows).round(2),
+        '15+ labor': (population * rng.uniform(0.5, 0.7, rows)).round(1),
+    })
+    if missing:
+        metrics = data.columns[3:]
+        data[metrics] = data[metrics].mask(rng.random((rows, len(metrics))) < missing)
+    return data
+
+
+@pytest.fixture(autouse=True)
+def _fresh_dataset_cache():
+    """Mỗi test đọc lại file của nó (load_dataset lưu đệm theo đường dẫn)."""
+    clear_cache()
+    yield
+    clear_cache()
+
+
+@pytest.fixture
+def population():
+    return make_population()
+
+
+@pytest.fixture
+def population_csv(tmp_path, population):
+    """File CSV (kèm sidecar Feather nếu có pyarrow) của bộ dữ liệu giả."""
+    path = str(tmp_path / "cleaned_population.csv")
+    save_dataset(population, path)
+    return path
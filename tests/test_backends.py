@@ -0,0 +1,135 @@
+# tests/test_backends.py
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.aggregates import build_cube, scan_cube
+from scripts.backends import AGGREGATIONS, aggregate, get_backend, yoy_names
+from scripts.dataset import METRIC_COLUMNS, save_dataset
+from scripts.growth import compute_growth, growth_columns
+
+from conftest import make_population
+
+
+def _engine(name):
+    if name != 'pandas':
+        pytest.importorskip(name)
+    return name
+
+
+@pytest.fixture(params=['pandas', 'duckdb', 'polars'])
+def backend(request):
+    return _engine(request.param)
+
+
+@pytest.fixture
+def data():
+    data = make_population(n_provinces=18, missing=0.1, seed=10)
+    # Một nhóm (vùng, năm) không có giá trị nào của Sex ratio
+    data.loc[(data['Region'] == 'Highlands') & (data['Year'] == 2012), 'Sex ratio'] = np.nan
+    return data
+
+
+@pytest.fixture
+def data_csv(tmp_path, data):
+    path = str(tmp_path / "cleaned_population.csv")
+    save_dataset(data, path)
+    return path
+
+
+def _by_key(table):
+    """Sắp theo khóa nhóm với Region là chuỗi: thứ tự vùng phụ thuộc engine và kiểu cột."""
+    levels = [table.index.get_level_values(name) for name in table.index.names]
+    levels = [level.astype(str) if level.name == 'Region' else level for level in levels]
+    return table.set_axis(pd.MultiIndex.from_arrays(levels), axis=0).sort_index()
+
+
+def _compare(result, expected):
+    result, expected = _by_key(result), _by_key(expected)
+    assert list(result.index) == list(expected.index)
+    result = result[expected.columns]
+    np.testing.assert_allclose(result.to_numpy(np.float64), expected.to_numpy(np.float64),
+                               rtol=1e-12, atol=1e-9, equal_nan=True)
+
+
+@pytest.mark.parametrize("by", [['Region'], ['Year'], ['Year', 'Region']])
+def test_aggregate_matches_pandas_groupby(data_csv, data, backend, by):
+    result = aggregate(data_csv, by, METRIC_COLUMNS, AGGREGATIONS, backend=backend)
+    _compare(result, data.groupby(by)[METRIC_COLUMNS].agg(AGGREGATIONS))
+
+
+def test_sum_of_empty_group_is_zero(data_csv, backend):
+    result = aggregate(data_csv, ['Year', 'Region'], ['Sex ratio'], ['sum', 'mean', 'count'], backend=backend)
+    row = result.loc[(2012, 'Highlands'), 'Sex ratio']
+    assert row['sum'] == 0.0
+    assert np.isnan(row['mean'])
+    assert row['count'] == 0
+
+
+def test_filters_pushdown(data_csv, data, backend):
+    result = aggregate(data_csv, ['Region'], ['Average population'], ['sum'],
+                       filters={'Year': [2012, 2014], 'Region': 'Mekong Delta'}, backend=backend)
+    part = data[data['Year'].isin([2012, 2014]) & (data['Region'] == 'Mekong Delta')]
+    assert list(result.index) == ['Mekong Delta']
+    assert result.iloc[0, 0] == pytest.approx(part['Average population'].sum(), rel=1e-12)
+
+
+def test_yoy_matches_compute_growth(data_csv, data, backend):
+    result = aggregate(data_csv, ['Year'], None, ['mean', 'count'], yoy=['Population density'], backend=backend)
+    assert yoy_names(['Population density'])[0] in result.columns.get_level_values(0)
+    growth = compute_growth(data, ['Population density'])
+    column = growth_columns('Population density')[0]
+    expected = growth.groupby('Year')[column].agg(['mean', 'count'])
+    _compare(result[column], expected)
+
+
+def test_yoy_keys_on_region_and_province(tmp_path, data, backend):
+    # Cùng một tên tỉnh ở hai vùng là hai chuỗi riêng, như compute_growth
+    moved = data[data['Provinces/city'] == 'Province 01'].assign(Region='Highlands', **{'15+ labor': 1.0})
+    data = pd.concat([data, moved], ignore_index=True)
+    path = str(tmp_path / "two_regions.csv")
+    save_dataset(data, path)
+    result = aggregate(path, ['Region'], None, ['sum'], yoy=['15+ labor'], backend=backend)
+    column = growth_columns('15+ labor')[0]
+    expected = compute_growth(data, ['15+ labor']).groupby('Region')[column].agg(['sum'])
+    _compare(result[column], expected)
+
+
+def test_engines_are_imported_lazily():
+    code = "import sys, scripts.aggregates; print('polars' in sys.modules or 'duckdb' in sys.modules)"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=root).stdout
+    assert output.strip() == 'False'
+
+
+def test_scan_cube_matches_build_cube(data_csv, data, backend):
+    _compare(scan_cube(data_csv, backend=backend), build_cube(data))
+
+
+def test_dataframe_input_uses_pandas(data):
+    result = aggregate(data, ['Region'], ['15+ labor'], ['max'], backend='duckdb')
+    assert result.loc['South East', ('15+ labor', 'max')] == data.loc[data['Region'] == 'South East', '15+ labor'].max()
+
+
+def test_unknown_backend_and_stat(data_csv):
+    with pytest.raises(ValueError):
+        get_backend('spark')
+    with pytest.raises(ValueError):
+        aggregate(data_csv, ['Region'], stats=['median'])
+
+
+def test_backend_is_a_stage_param(monkeypatch):
+    # Đổi backend làm đổi dấu vân tay của các bước tổng hợp, không đổi các bước khác
+    main = pytest.importorskip("main")
+    monkeypatch.delenv("POPULATION_BACKEND", raising=False)
+    pandas_stages = main.build_pipeline().stages
+    duckdb_stages = main.build_pipeline(backend='duckdb').stages
+    changed = {name for name in pandas_stages if pandas_stages[name].params != duckdb_stages[name].params}
+    assert changed == {'cube', 'trends', 'economy'}
+    assert pandas_stages['cube'].params['backend'] == 'pandas'
+    monkeypatch.setenv("POPULATION_BACKEND", "Polars")
+    assert main.build_pipeline().stages['trends'].params['backend'] == 'polars'
@@ -0,0 +1,80 @@
+# tests/test_chart_cache.py
+import os
+
+import pytest
+
+pytest.importorskip("matplotlib")
+
+from scripts import chart_cache, instrument
+from scripts.chart_cache import ChartCache, chart_key
+from scripts.rendering import chart_job, render_jobs
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    # Bộ nhớ đệm mặc định của render_jobs nằm trong thư mục tạm của từng test
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(chart_cache.CACHE_ENV, raising=False)
+    monkeypatch.setattr(chart_cache, "_default", None)
+    return tmp_path / chart_cache.CHART_CACHE_DIR
+
+
+def _job(output_path, values=(1.0, 2.0, 3.0), **style):
+    return chart_job('bar', ['a', 'b', 'c'], {'value': list(values)}, str(output_path), **style)
+
+
+def test_key_ignores_output_path_only(tmp_path):
+    job = _job(tmp_path / "a.png")
+    assert chart_key(job) == chart_key(_job(tmp_path / "b.png"))
+    assert chart_key(job) != chart_key(_job(tmp_path / "a.png", values=(1.0, 2.0, 4.0)))
+    assert chart_key(job) != chart_key(_job(tmp_path / "a.png", title="Khác"))
+
+
+def test_fetch_after_store(tmp_path):
+    cache = ChartCache(str(tmp_path / "cache"))
+    job = _job(tmp_path / "out" / "a.png")
+    assert not cache.fetch(job)
+    os.makedirs(tmp_path / "out")
+    (tmp_path / "out" / "a.png").write_bytes(b"png")
+
+    cache.store(job)
+    copy = _job(tmp_path / "out" / "copy.png")
+    assert cache.fetch(copy)
+    assert (tmp_path / "out" / "copy.png").read_bytes() == b"png"
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_evict_keeps_size_under_limit(tmp_path):
+    cache = ChartCache(str(tmp_path / "cache"), max_mb=1.5 / 2 ** 10)
+    for i in range(3):
+        path = tmp_path / f"{i}.png"
+        path.write_bytes(b"x" * 1024)
+        cache.store(_job(path, values=(i, i, i)))
+    cache.evict()
+    assert cache.stats()['entries'] == 1
+    assert cache.evicted == 2
+
+
+def test_render_jobs_counts_drawn_and_cached(cache_dir, tmp_path):
+    jobs = [_job(tmp_path / f"{i}.png", values=(i, 1.0, 2.0)) for i in range(3)]
+    with instrument.measure("cold") as cold:
+        render_jobs(jobs, workers=1)
+    assert (cold['charts'], cold['charts_cached']) == (3, 0)
+    assert all(os.path.getsize(job['output_path']) > 0 for job in jobs)
+
+    # Lần thứ hai: hai biểu đồ không đổi lấy từ bộ nhớ đệm, một biểu đồ có số liệu mới được vẽ lại
+    jobs[2] = _job(tmp_path / "2.png", values=(9.0, 1.0, 2.0))
+    with instrument.measure("warm") as warm:
+        render_jobs(jobs, workers=1)
+    assert (warm['charts'], warm['charts_cached']) == (1, 2)
+    assert len(list(cache_dir.glob("*.png"))) == 4
+
+
+def test_cache_can_be_disabled(cache_dir, tmp_path, monkeypatch):
+    monkeypatch.setenv(chart_cache.CACHE_ENV, "0")
+    job = _job(tmp_path / "a.png")
+    for _ in range(2):
+        with instrument.measure("off") as record:
+            render_jobs([job], workers=1)
+        assert (record['charts'], record['charts_cached']) == (1, 0)
+    assert not cache_dir.exists()
@@ -0,0 +1,69 @@
+# tests/test_comparison.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.comparison import YearPanel
+from scripts.dataset import METRIC_COLUMNS, widen
+
+from conftest import make_population
+
+KEYS = ['Region', 'Provinces/city']
+
+
+@pytest.fixture
+def data():
+    data = make_population(n_provinces=10, missing=0.1, seed=12)
+    # Cùng một tên tỉnh ở hai vùng
+    other = data[data['Provinces/city'] == 'Province 02'].assign(Region='Highlands')
+    other[METRIC_COLUMNS] = other[METRIC_COLUMNS] * 2
+    return pd.concat([data, other], ignore_index=True)
+
+
+def _long(data):
+    return widen(data).astype({'Region': str, 'Provinces/city': str}).melt(
+        id_vars=KEYS + ['Year'], value_vars=METRIC_COLUMNS, var_name='metric')
+
+
+def test_pair_table_matches_merge(data):
+    panel = YearPanel(data, METRIC_COLUMNS)
+    result = panel.pair_table([(2011, 2014), (2013, 2016)])
+    result = result.astype({'Region': str, 'Provinces/city': str, 'metric': str})
+
+    # Giá trị bằng nhau được xếp theo thứ tự hàng của bảng (thứ tự (vùng, tỉnh) của chỉ mục)
+    rows = {key: i for i, key in enumerate(zip(panel.regions, panel.provinces))}
+    long = _long(data)
+    long = long.assign(row=[rows[key] for key in zip(long['Region'], long['Provinces/city'])]).sort_values('row')
+    long['rank'] = long.groupby(['Year', 'metric'])['value'].rank(method='first', ascending=False)
+    frames = []
+    for start, end in [(2011, 2014), (2013, 2016)]:
+        pair = long[long['Year'] == start].merge(long[long['Year'] == end], on=KEYS + ['metric'],
+                                                 suffixes=('_from', '_to'))
+        frames.append(pair.assign(From=start, To=end).dropna(subset=['value_from', 'value_to']))
+    expected = pd.concat(frames, ignore_index=True)
+
+    merged = result.merge(expected, on=KEYS + ['From', 'To', 'metric'], validate='one_to_one')
+    assert len(merged) == len(result) == len(expected)
+    np.testing.assert_allclose(merged['delta'], merged['value_to'] - merged['value_from'], rtol=1e-12)
+    np.testing.assert_allclose(merged['pct_change'],
+                               (merged['value_to'] / merged['value_from'] - 1) * 100, rtol=1e-9)
+    np.testing.assert_array_equal(merged['rank_shift'], merged['rank_from'] - merged['rank_to'])
+
+
+def test_same_name_in_two_regions_are_separate_rows(data):
+    panel = YearPanel(data, METRIC_COLUMNS)
+    rows = [i for i, name in enumerate(panel.provinces) if name == 'Province 02']
+    assert len(rows) == 2
+    doubled, = [i for i in rows if panel.regions[i] == 'Highlands']
+    original, = [i for i in rows if i != doubled]
+    np.testing.assert_allclose(panel.values[doubled], panel.values[original] * 2, rtol=1e-6)
+    assert len(set(panel.labels)) == len(panel.labels)
+
+
+def test_rank_shift_table_reuses_ranks(data):
+    panel = YearPanel(data, METRIC_COLUMNS)
+    table = panel.rank_shift_table(2011, 2016)
+    assert panel.ranks() is panel.ranks()
+    ranks = panel.ranks()
+    np.testing.assert_array_equal(table[METRIC_COLUMNS].to_numpy(), ranks[:, 0] - ranks[:, -1])
+    assert len(table) == data.groupby(KEYS).ngroups
@@ -0,0 +1,70 @@
+# tests/test_correlation.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.correlation import ALL, correlation_matrix, pairwise_stats, read_stats, regression_line
+from scripts.dataset import METRIC_COLUMNS, save_dataset
+
+from conftest import make_population
+
+
+@pytest.fixture
+def data():
+    return make_population(n_provinces=20, missing=0.1, seed=9)
+
+
+def _groups(data, by):
+    if by is None:
+        return [(ALL, data)]
+    return [(str(name), part) for name, part in data.groupby(by)]
+
+
+@pytest.mark.parametrize("by", [None, 'Region', 'Year'])
+def test_correlation_matches_dataframe_corr(data, by):
+    stats = pairwise_stats(data)
+    for name, part in _groups(data, by):
+        expected = part[METRIC_COLUMNS].corr()
+        matrix = correlation_matrix(stats, name, by)
+        np.testing.assert_allclose(matrix.loc[METRIC_COLUMNS, METRIC_COLUMNS].to_numpy(), expected.to_numpy(),
+                                   rtol=1e-10, atol=1e-12, equal_nan=True)
+
+
+@pytest.mark.parametrize("by", [None, 'Region'])
+def test_regression_matches_polyfit(data, by):
+    stats = pairwise_stats(data)
+    x, y = '15+ labor', 'Average population'
+    for name, part in _groups(data, by):
+        pair = part[[x, y]].dropna()
+        slope, intercept = np.polyfit(pair[x], pair[y], 1)
+        fitted = regression_line(stats, x, y, name, by)
+        np.testing.assert_allclose(fitted[:2], (intercept, slope), rtol=1e-9)
+        assert fitted[2] == pytest.approx(pair[x].corr(pair[y]) ** 2, rel=1e-9)
+        row = stats[(stats['group_by'] == (by or ALL)) & (stats['group'] == name) & (stats['x'] == x)
+                    & (stats['y'] == y)]
+        assert row['n'].item() == len(pair)
+
+
+def test_one_row_per_group_and_pair(data):
+    stats = pairwise_stats(data)
+    k = len(METRIC_COLUMNS)
+    groups = 1 + data['Region'].nunique() + data['Year'].nunique()
+    assert len(stats) == groups * k * (k - 1)
+    assert not stats.duplicated(['group_by', 'group', 'x', 'y']).any()
+
+
+def test_matrix_column_subset(data):
+    stats = pairwise_stats(data)
+    columns = ['Sex ratio', 'Population density']
+    matrix = correlation_matrix(stats, columns=columns)
+    assert list(matrix.index) == list(matrix.columns) == columns
+    np.testing.assert_allclose(matrix.to_numpy(), data[columns].corr().to_numpy(), rtol=1e-10)
+
+
+def test_saved_table_round_trips(tmp_path, data):
+    stats = pairwise_stats(data)
+    path = str(tmp_path / "correlations.csv")
+    save_dataset(stats, path)
+    loaded = read_stats(path)
+    # Tên nhóm là năm vẫn là chuỗi sau khi đọc lại
+    pd.testing.assert_frame_equal(correlation_matrix(loaded, '2013', 'Year'), correlation_matrix(stats, '2013', 'Year'))
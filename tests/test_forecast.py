@@ -0,0 +1,88 @@
+# tests/test_forecast.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.forecast import ForecastCache, backtest, fit_trends, forecast, predict_trends, series_table
+
+from conftest import make_population
+
+METRIC = 'Average population'
+
+
+def _polyfit(years, values, degree):
+    """Hệ số [hằng số, t, t^2...] của np.polyfit với t = năm - năm đầu, bỏ qua NaN."""
+    keep = ~np.isnan(values)
+    if keep.sum() <= degree:
+        return np.full(degree + 1, np.nan)
+    return np.polyfit(years[keep] - years.min(), values[keep], degree)[::-1]
+
+
+@pytest.mark.parametrize("degree", [1, 2])
+def test_fit_trends_matches_polyfit(degree):
+    table = series_table(make_population(missing=0.15, seed=5), METRIC, 'Provinces/city')
+    years = table.index.to_numpy()
+    coefs, origin = fit_trends(years, table.to_numpy(), degree)
+    assert origin == years.min()
+    for s, name in enumerate(table.columns):
+        np.testing.assert_allclose(coefs[s], _polyfit(years, table[name].to_numpy(), degree),
+                                   rtol=1e-7, atol=1e-6, equal_nan=True)
+
+
+def test_cache_warm_start_matches_full_fit(tmp_path):
+    data = make_population(years=range(2011, 2018), seed=6)
+    table = series_table(data, METRIC, 'Region')
+    cache = ForecastCache(str(tmp_path))
+    cache.update(METRIC, 'Region', table.loc[:2016])
+    cache.save()
+
+    # Một năm mới: bộ nhớ đệm đọc lại từ đĩa, chỉ cộng thêm phần của năm 2017
+    warm = ForecastCache(str(tmp_path))
+    coefs, origin = warm.update(METRIC, 'Region', table)
+    assert warm.last_update == {'new_years': 1, 'reused': table.shape[1], 'refit': 0}
+    expected, expected_origin = fit_trends(table.index.to_numpy(), table.to_numpy())
+    assert origin == expected_origin
+    np.testing.assert_allclose(coefs, expected, rtol=1e-12)
+
+
+def test_cache_refits_series_with_revised_history():
+    data = make_population(years=range(2011, 2018), seed=7)
+    table = series_table(data, METRIC, 'Region')
+    cache = ForecastCache(None)
+    cache.update(METRIC, 'Region', table.loc[:2016])
+
+    revised = table.copy()
+    revised.iloc[0, 0] += 100.0
+    coefs, _ = cache.update(METRIC, 'Region', revised)
+    assert cache.last_update == {'new_years': 1, 'reused': table.shape[1] - 1, 'refit': 1}
+    np.testing.assert_allclose(coefs, fit_trends(revised.index.to_numpy(), revised.to_numpy())[0], rtol=1e-12)
+
+
+def test_forecast_with_cache_matches_without(tmp_path, population):
+    cold = forecast(population, METRIC, horizon=3)
+    cache = ForecastCache(str(tmp_path))
+    forecast(population, METRIC, horizon=3, cache=cache)
+    warm = forecast(population, METRIC, horizon=3, cache=cache)
+    pd.testing.assert_frame_equal(warm, cold)
+    assert warm['is_forecast'].sum() == 3 * (population['Provinces/city'].nunique() + population['Region'].nunique())
+
+
+@pytest.mark.parametrize("horizon", [1, 2])
+def test_backtest_matches_refit_per_cutoff(horizon):
+    data = make_population(years=range(2011, 2019), missing=0.1, seed=8)
+    result = backtest(data, METRIC, levels=('Region',), horizon=horizon, min_train=3)
+
+    table = series_table(data, METRIC, 'Region')
+    years = table.index.to_numpy()
+    frames = []
+    for cut in range(3, len(years)):
+        coefs, origin = fit_trends(years[:cut], table.to_numpy()[:cut], origin=years.min())
+        test_years = years[cut:cut + horizon]
+        predicted = predict_trends(coefs, origin, test_years)
+        frames.append(pd.DataFrame({'cutoff': years[cut - 1], 'Year': np.repeat(test_years, table.shape[1]),
+                                    'series': np.tile(table.columns, len(test_years)),
+                                    'expected': predicted.ravel()}))
+    expected = pd.concat(frames, ignore_index=True)
+    merged = result.merge(expected, on=['cutoff', 'Year', 'series'], validate='one_to_one')
+    assert len(merged) == len(result) == len(expected)
+    np.testing.assert_allclose(merged['predicted'], merged['expected'], rtol=1e-10, equal_nan=True)
@@ -0,0 +1,63 @@
+# tests/test_growth.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.dataset import METRIC_COLUMNS, apply_dtypes, widen
+from scripts.growth import compute_growth, growth_columns, labor_growth_by_province
+
+from conftest import make_population
+
+
+KEYS = ['Provinces/city', 'Year']
+
+
+def _by_key(table):
+    """Sắp theo (tỉnh, năm): thứ tự vùng của compute_growth phụ thuộc kiểu cột Region."""
+    return table.astype({'Provinces/city': str}).sort_values(KEYS).reset_index(drop=True)
+
+
+def _reference(data, metric, window):
+    """Các cột tăng trưởng tính bằng groupby của pandas, theo thứ tự (tỉnh, năm)."""
+    data = _by_key(data)
+    grouped = data.groupby(['Region', 'Provinces/city'], sort=False)[metric]
+    # Giá trị của năm đầu tiên (kể cả khi thiếu), không phải giá trị khác NaN đầu tiên
+    first_value = grouped.transform(lambda values: values.iloc[0])
+    elapsed = data['Year'] - data.groupby(['Region', 'Provinces/city'], sort=False)['Year'].transform('first')
+    cagr = (((data[metric] / first_value) ** (1 / elapsed) - 1) * 100).where(elapsed > 0)
+    return pd.DataFrame({
+        'yoy': grouped.pct_change(fill_method=None) * 100,
+        'change': grouped.diff(),
+        'cagr': cagr,
+        'avg': grouped.rolling(window, min_periods=window).mean().reset_index(level=[0, 1], drop=True),
+    })
+
+
+@pytest.mark.parametrize("missing", [0.0, 0.1])
+def test_growth_matches_pandas(missing):
+    data = make_population(missing=missing, seed=3)
+    result = _by_key(compute_growth(data, window=3))
+    for metric in METRIC_COLUMNS:
+        expected = _reference(data, metric, 3)
+        for name, column in zip(['yoy', 'change', 'cagr', 'avg'], growth_columns(metric, 3)):
+            np.testing.assert_allclose(result[column].to_numpy(), expected[name].to_numpy(),
+                                       rtol=1e-10, atol=1e-9, equal_nan=True, err_msg=f"{column}")
+
+
+def test_compact_dtypes_give_decimal_results():
+    # float32 của load_dataset được đổi về giá trị thập phân trước khi tính: cùng kết quả với float64
+    data = make_population(seed=4)
+    compact = _by_key(compute_growth(apply_dtypes(data)))
+    wide = _by_key(compute_growth(data))
+    for metric in METRIC_COLUMNS:
+        column = growth_columns(metric)[0]
+        np.testing.assert_array_equal(compact[column].to_numpy(), wide[column].to_numpy())
+
+
+def test_labor_growth_table_order(population):
+    table = labor_growth_by_province(population)
+    expected = widen(population).sort_values(['Provinces/city', 'Year']).reset_index(drop=True)
+    assert table[['Provinces/city', 'Year']].equals(expected[['Provinces/city', 'Year']])
+    reference = expected.groupby('Provinces/city')['15+ labor'].pct_change(fill_method=None) * 100
+    np.testing.assert_allclose(table['Growth_Rate (%)'].to_numpy(), reference.to_numpy(), rtol=1e-12,
+                               equal_nan=True)
@@ -0,0 +1,60 @@
+# tests/test_index.py
+import numpy as np
+import pandas as pd
+
+from scripts.index import INDEX_COLUMNS, PopulationIndex, get_index
+
+
+def _sorted(data):
+    return data.sort_values(INDEX_COLUMNS).reset_index(drop=True)
+
+
+def test_sorted_like_pandas(population):
+    index = PopulationIndex(population.sample(frac=1, random_state=0))
+    pd.testing.assert_frame_equal(index.data[INDEX_COLUMNS], _sorted(population)[INDEX_COLUMNS])
+
+
+def test_region_and_province_slices(population):
+    index = PopulationIndex(population)
+    for region, part in index.iter_regions():
+        expected = population[population['Region'] == region]
+        pd.testing.assert_frame_equal(part.reset_index(drop=True), _sorted(expected))
+    for name in ['Province 03', 'Province 07']:
+        expected = population[population['Provinces/city'] == name]
+        pd.testing.assert_frame_equal(index.province(name).reset_index(drop=True), _sorted(expected))
+    names = ['Province 01', 'Province 10', 'Nowhere']
+    expected = population[population['Provinces/city'].isin(names)]
+    pd.testing.assert_frame_equal(index.provinces_of(names).reset_index(drop=True), _sorted(expected))
+    assert index.region('Nowhere').empty
+
+
+def test_same_province_name_in_two_regions(population):
+    # Một tên tỉnh xuất hiện ở hai vùng: mỗi (vùng, tỉnh) là một chuỗi riêng
+    moved = population['Provinces/city'] == 'Province 01'
+    other = population[moved].assign(Region='Highlands')
+    data = pd.concat([population, other], ignore_index=True)
+    index = PopulationIndex(data)
+
+    keys = [key for key, _ in index.iter_provinces() if key[1] == 'Province 01']
+    assert sorted(keys) == sorted([(population.loc[moved, 'Region'].iloc[0], 'Province 01'),
+                                   ('Highlands', 'Province 01')])
+    assert index.provinces.count('Province 01') == 1
+    assert len(index.province('Province 01')) == 2 * moved.sum()
+    assert len(index.province('Province 01', region='Highlands')) == moved.sum()
+    # Năm đầu tiên của mỗi chuỗi là một điểm bắt đầu
+    assert index.series_starts.sum() == data.groupby(['Region', 'Provinces/city']).ngroups
+
+
+def test_pct_change_matches_groupby(population):
+    data = population.copy()
+    data.loc[5, 'Average population'] = np.nan
+    index = PopulationIndex(data)
+    expected = (index.data.groupby(['Region', 'Provinces/city'])['Average population']
+                .pct_change(fill_method=None))
+    np.testing.assert_allclose(index.pct_change('Average population').to_numpy(), expected.to_numpy(),
+                               rtol=1e-12, equal_nan=True)
+
+
+def test_get_index_is_cached_per_object(population):
+    assert get_index(population) is get_index(population)
+    assert get_index(population.copy()) is not get_index(population)
@@ -0,0 +1,114 @@
+# tests/test_instrument.py
+import json
+import tracemalloc
+
+import pytest
+
+from scripts import instrument
+from scripts.instrument import (count_charts, count_rows, format_summary, instrumented, measure,
+                                record_error)
+
+
+@pytest.fixture(autouse=True)
+def fresh_records(monkeypatch):
+    """Mỗi test có danh sách kết quả đo và cấu hình riêng (không ghi ra file mặc định)."""
+    monkeypatch.setattr(instrument, "records", [])
+    monkeypatch.setattr(instrument, "_config", {'path': None, 'trace_memory': False, 'profile_dir': None})
+    return instrument
+
+
+@instrumented
+def load(n):
+    count_rows(rows_in=n)
+    return n
+
+
+@instrumented(name="charts")
+def draw(drawn, cached):
+    count_charts(drawn, cached=cached)
+
+
+def test_nested_stage_and_function_records():
+    with measure("trends", kind='stage') as stage:
+        load(10)
+        with measure("inner"):
+            draw(2, 3)
+            count_rows(rows_out=4)
+
+    names = [record['name'] for record in instrument.records]
+    # Phép đo trong cùng xong trước
+    assert names == ['load', 'charts', 'inner', 'trends']
+    by_name = {record['name']: record for record in instrument.records}
+    assert by_name['load']['parent'] == 'trends' and by_name['charts']['parent'] == 'inner'
+    assert by_name['trends']['parent'] is None
+    assert [by_name[name]['kind'] for name in names] == ['function', 'function', 'function', 'stage']
+    # Số dòng và biểu đồ được cộng cho mọi phép đo đang chạy
+    assert (stage['rows_in'], stage['rows_out'], stage['charts'], stage['charts_cached']) == (10, 4, 2, 3)
+    assert (by_name['inner']['rows_in'], by_name['inner']['rows_out']) == (0, 4)
+    assert all(record['status'] == 'ok' and record['wall_s'] >= 0 for record in instrument.records)
+    assert load.__name__ == 'load'
+
+
+def test_records_are_written_as_json_lines(tmp_path):
+    path = tmp_path / "logs" / "metrics.jsonl"
+    instrument.configure(str(path))
+    with measure("clean", kind='stage'):
+        load(3)
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert lines == instrument.records
+    assert [line['name'] for line in lines] == ['load', 'clean']
+
+
+def test_record_error_marks_only_the_innermost_measurement():
+    @instrumented
+    def analysis():
+        try:
+            raise ValueError("hỏng")
+        except ValueError as e:
+            record_error(e)
+
+    with measure("economy", kind='stage') as stage:
+        analysis()
+    inner = instrument.records[0]
+    assert (inner['status'], inner['error']) == ('error', "ValueError: hỏng")
+    # Lỗi đã bị bắt không làm đổi trạng thái của bước: Pipeline.run phải xét các phép đo con
+    assert stage['status'] == 'ok'
+
+
+def test_exceptions_mark_every_enclosing_measurement():
+    with pytest.raises(KeyError):
+        with measure("report", kind='stage'):
+            with measure("sheet"):
+                raise KeyError('Year')
+    assert [(record['name'], record['status']) for record in instrument.records] == [
+        ('sheet', 'error'), ('report', 'error')]
+    assert instrument.records[1]['error'] == "KeyError: 'Year'"
+    assert instrument._active == []
+
+
+def test_format_summary_lists_stages():
+    with measure("clean", kind='stage'):
+        load(5)
+    with pytest.raises(RuntimeError):
+        with measure("report", kind='stage'):
+            raise RuntimeError
+    lines = format_summary().splitlines()
+    assert len(lines) == 3
+    assert lines[1].split()[0] == 'clean' and lines[1].split()[-1] == 'ok'
+    assert lines[2].split()[0] == 'report' and lines[2].split()[-1] == 'error'
+    assert len(format_summary('function').splitlines()) == 2
+
+
+def test_peak_memory_of_parent_covers_child():
+    tracing = tracemalloc.is_tracing()
+    instrument.configure(trace_memory=True)
+    try:
+        with measure("stage", kind='stage') as stage:
+            with measure("child") as child:
+                block = bytearray(8 * 2 ** 20)
+                del block
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    assert child['peak_mem_mb'] >= 7.5
+    assert stage['peak_mem_mb'] >= child['peak_mem_mb']
@@ -0,0 +1,129 @@
+# tests/test_pipeline.py
+import json
+
+import pytest
+
+from scripts.instrument import instrumented, record_error
+from scripts.pipeline import Pipeline, Stage, fingerprint
+
+
+def test_fingerprint_tracks_content_and_params(tmp_path):
+    path = tmp_path / "input.csv"
+    path.write_text("a,b\n1,2\n")
+    key = fingerprint([str(path)], {'k': 1})
+    assert fingerprint([str(path)], {'k': 1}) == key
+    assert fingerprint([str(path)], {'k': 2}) != key
+
+    # Chỉ nội dung file (không phải thời điểm sửa) quyết định dấu vân tay
+    path.write_text("a,b\n1,2\n")
+    assert fingerprint([str(path)], {'k': 1}) == key
+    path.write_text("a,b\n1,3\n")
+    assert fingerprint([str(path)], {'k': 1}) != key
+
+
+def test_fingerprint_of_directory_and_missing_file(tmp_path):
+    folder = tmp_path / "charts"
+    folder.mkdir()
+    (folder / "a.png").write_bytes(b"1")
+    key = fingerprint([str(folder)])
+    (folder / "b.png").write_bytes(b"2")
+    assert fingerprint([str(folder)]) != key
+    missing = str(tmp_path / "missing.csv")
+    assert fingerprint([missing]) == fingerprint([missing]) != fingerprint([str(folder)])
+
+
+def _stages(tmp_path, calls, scale=1):
+    source = tmp_path / "source.txt"
+    middle = tmp_path / "middle.txt"
+    result = tmp_path / "result.txt"
+
+    def first(scale):
+        calls.append('first')
+        middle.write_text(str(int(source.read_text()) * scale))
+
+    def second():
+        calls.append('second')
+        result.write_text(middle.read_text() + "!")
+
+    return [
+        Stage('second', second, inputs=[str(middle)], outputs=[str(result)], deps=['first']),
+        Stage('first', first, inputs=[str(source)], outputs=[str(middle)], params={'scale': scale}),
+    ]
+
+
+def test_run_skips_unchanged_stages(tmp_path):
+    (tmp_path / "source.txt").write_text("2")
+    manifest = str(tmp_path / "manifest.json")
+    calls = []
+
+    assert Pipeline(_stages(tmp_path, calls), manifest).run() == {'first': 'run', 'second': 'run'}
+    assert calls == ['first', 'second']
+    assert (tmp_path / "result.txt").read_text() == "2!"
+
+    calls.clear()
+    assert Pipeline(_stages(tmp_path, calls), manifest).run() == {'first': 'skipped', 'second': 'skipped'}
+    assert calls == []
+
+    # Đổi tham số: bước đầu chạy lại, bước sau chạy lại vì đầu vào của nó đã đổi
+    assert Pipeline(_stages(tmp_path, calls, scale=3), manifest).run() == {'first': 'run', 'second': 'run'}
+    assert (tmp_path / "result.txt").read_text() == "6!"
+
+    # Đầu ra của bước đầu không đổi dù đầu vào đổi: bước sau được bỏ qua
+    calls.clear()
+    (tmp_path / "source.txt").write_text("02")
+    assert Pipeline(_stages(tmp_path, calls, scale=3), manifest).run() == {'first': 'run', 'second': 'skipped'}
+
+
+def test_run_reruns_when_outputs_are_missing_or_forced(tmp_path):
+    (tmp_path / "source.txt").write_text("1")
+    manifest = str(tmp_path / "manifest.json")
+    calls = []
+    Pipeline(_stages(tmp_path, calls), manifest).run()
+
+    (tmp_path / "result.txt").unlink()
+    calls.clear()
+    assert Pipeline(_stages(tmp_path, calls), manifest).run(['second']) == {'first': 'skipped', 'second': 'run'}
+    calls.clear()
+    Pipeline(_stages(tmp_path, calls), manifest).run(force=True)
+    assert calls == ['first', 'second']
+
+
+def test_failed_stage_is_not_recorded(tmp_path):
+    manifest = str(tmp_path / "manifest.json")
+    stage = Stage('noop', lambda: None, inputs=[], outputs=[str(tmp_path / "never.txt")])
+    assert Pipeline([stage], manifest).run() == {'noop': 'failed'}
+    assert Pipeline([stage], manifest).run() == {'noop': 'failed'}
+
+
+def test_caught_error_fails_stage_with_stale_outputs(tmp_path):
+    # Hàm phân tích bắt lỗi của chính nó: đầu ra cũ vẫn còn nhưng bước phải được chạy lại lần sau
+    source, output = tmp_path / "source.txt", tmp_path / "output.txt"
+    source.write_text("1")
+    manifest = str(tmp_path / "manifest.json")
+
+    @instrumented
+    def analysis(fail):
+        try:
+            if fail:
+                raise ValueError("hỏng")
+            output.write_text(source.read_text())
+        except ValueError as e:
+            record_error(e)
+
+    def stage(fail):
+        return Stage('analysis', analysis, inputs=[str(source)], outputs=[str(output)], params={'fail': fail})
+
+    assert Pipeline([stage(False)], manifest).run() == {'analysis': 'run'}
+    source.write_text("2")
+    assert Pipeline([stage(True)], manifest).run() == {'analysis': 'failed'}
+    with open(manifest, encoding="utf-8") as f:
+        assert 'analysis' not in json.load(f)
+    assert Pipeline([stage(True)], manifest).run() == {'analysis': 'failed'}
+    assert Pipeline([stage(False)], manifest).run() == {'analysis': 'run'}
+    assert output.read_text() == "2"
+
+
+def test_dependency_cycle_is_rejected(tmp_path):
+    stages = [Stage('a', None, [], [], deps=['b']), Stage('b', None, [], [], deps=['a'])]
+    with pytest.raises(ValueError):
+        Pipeline(stages, str(tmp_path / "manifest.json")).order()
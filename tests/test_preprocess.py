@@ -0,0 +1,65 @@
+# tests/test_preprocess.py
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts import dataset
+from scripts.dataset import METRIC_COLUMNS, load_dataset, sidecar_path
+from scripts.pipeline import load_script
+
+from conftest import make_population
+
+preprocess = load_script("data processing/preprocess.py")
+
+
+@pytest.fixture
+def raw_csv(tmp_path):
+    path = str(tmp_path / "raw.csv")
+    make_population(n_provinces=10, missing=0.15, seed=11).to_csv(path, index=False)
+    return path
+
+
+def _reference(raw):
+    """Điền xuôi theo tỉnh, phần đầu còn thiếu điền bằng giá trị hợp lệ đầu tiên."""
+    data = pd.read_csv(raw)
+    grouped = data.groupby('Provinces/city', sort=False)[METRIC_COLUMNS]
+    return data.assign(**grouped.ffill()).fillna(grouped.transform('first'))
+
+
+@pytest.mark.parametrize("chunksize", [7, 1000])
+def test_clean_data_matches_groupby_fill(tmp_path, raw_csv, chunksize):
+    cleaned = str(tmp_path / "cleaned.csv")
+    preprocess.clean_data(raw_csv, cleaned, chunksize=chunksize)
+    result = pd.read_csv(cleaned)
+    expected = _reference(raw_csv)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result[METRIC_COLUMNS].to_numpy(), expected[METRIC_COLUMNS].to_numpy(), rtol=1e-12)
+    assert not os.path.exists(cleaned + ".tmp")
+    # Sidecar không cũ hơn CSV nên được dùng khi đọc lại
+    assert os.path.getmtime(sidecar_path(cleaned)) >= os.path.getmtime(cleaned)
+
+
+def test_failed_run_keeps_previous_output(tmp_path, raw_csv, monkeypatch):
+    cleaned = str(tmp_path / "cleaned.csv")
+    preprocess.clean_data(raw_csv, cleaned, chunksize=7)
+    with open(cleaned, "rb") as f:
+        before = f.read()
+
+    # Lỗi ở chunk thứ ba: file đã làm sạch của lần trước vẫn nguyên vẹn
+    write = dataset.SidecarWriter.write
+    calls = []
+
+    def failing_write(self, chunk):
+        calls.append(1)
+        if len(calls) == 3:
+            raise OSError("đầy ổ đĩa")
+        write(self, chunk)
+
+    monkeypatch.setattr(preprocess.SidecarWriter, "write", failing_write)
+    preprocess.clean_data(raw_csv, cleaned, chunksize=7)
+    with open(cleaned, "rb") as f:
+        assert f.read() == before
+    assert not os.path.exists(cleaned + ".tmp")
+    assert len(load_dataset(cleaned)) == 60
@@ -0,0 +1,88 @@
+# tests/test_query.py
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.dataset import load_dataset
+from scripts.query import compile_filters, filter_frame, main, parse_conditions, partition
+
+# Bộ lọc -> biểu thức pandas tương đương
+CASES = [
+    ({'Year': 2013}, lambda d: d['Year'] == 2013),
+    ({'year': 2013}, lambda d: d['Year'] == 2013),
+    ({'Region': ['Highlands', 'South East']}, lambda d: d['Region'].isin(['Highlands', 'South East'])),
+    ({'Year': {'between': (2012, 2014)}}, lambda d: d['Year'].between(2012, 2014)),
+    ({'Population density': {'>=': 500, '<': 2000}},
+     lambda d: (d['Population density'] >= 500) & (d['Population density'] < 2000)),
+    ({'Region': {'not': ['Highlands']}, 'Year': {'in': [2011, 2016]}},
+     lambda d: ~d['Region'].isin(['Highlands']) & d['Year'].isin([2011, 2016])),
+    ({'Sex ratio': {'not': {'>': 100}}}, lambda d: ~(d['Sex ratio'] > 100)),
+    ({}, lambda d: pd.Series(True, index=d.index)),
+]
+
+
+@pytest.mark.parametrize("filters, expected", CASES)
+def test_compile_filters_matches_pandas(population, filters, expected):
+    np.testing.assert_array_equal(compile_filters(population, filters), expected(population).to_numpy())
+
+
+def test_filter_frame_matches_pandas(population):
+    filters = {'Year': {'>=': 2014}, 'Region': 'Mekong Delta'}
+    expected = population[(population['Year'] >= 2014) & (population['Region'] == 'Mekong Delta')]
+    pd.testing.assert_frame_equal(filter_frame(population, filters), expected)
+
+
+def test_invalid_operator(population):
+    with pytest.raises(ValueError):
+        compile_filters(population, {'Year': {'~': 2012}})
+
+
+def test_unknown_column(population):
+    with pytest.raises(KeyError):
+        compile_filters(population, {'Nope': 1})
+
+
+def test_partition_matches_groupby(population):
+    parts = partition(population, 'Region', filters={'Year': {'>': 2012}})
+    expected = population[population['Year'] > 2012]
+    assert set(parts) == set(expected['Region'])
+    for region, part in parts.items():
+        pd.testing.assert_frame_equal(part, expected[expected['Region'] == region])
+
+
+@pytest.mark.parametrize("conditions, expected", [
+    (['Year=2016'], {'Year': 2016}),
+    (['Year=2012', 'Year=2013'], {'Year': [2012, 2013]}),
+    (['Year>=2012', 'Year<=2016', 'Region=Mekong Delta'],
+     {'Year': {'>=': 2012, '<=': 2016}, 'Region': 'Mekong Delta'}),
+    (['Year=2012', 'Year!=2013'], {'Year': {'in': [2012], '!=': 2013}}),
+    (['Sex ratio>100.5'], {'Sex ratio': {'>': 100.5}}),
+])
+def test_parse_conditions(conditions, expected):
+    assert parse_conditions(conditions) == expected
+
+
+def test_parse_conditions_rejects_garbage():
+    with pytest.raises(ValueError):
+        parse_conditions(['Year'])
+
+
+def test_cli_filters_into_one_file(population_csv, tmp_path, population):
+    output = str(tmp_path / "filtered.csv")
+    main(['--input', population_csv, '--where', 'Year>=2015', '--where', 'Region=Highlands', '--output', output])
+    result = pd.read_csv(output)
+    expected = population[(population['Year'] >= 2015) & (population['Region'] == 'Highlands')]
+    assert sorted(result['Provinces/city'] + result['Year'].astype(str)) == \
+        sorted(expected['Provinces/city'] + expected['Year'].astype(str))
+
+
+def test_cli_splits_by_column(population_csv, tmp_path, population):
+    output_dir = str(tmp_path / "by_year")
+    main(['--input', population_csv, '--output-dir', output_dir], by='Year')
+    files = sorted(os.listdir(output_dir))
+    assert [name for name in files if name.endswith(".csv")] == \
+        [f"filtered_population_{year}.csv" for year in sorted(population['Year'].unique())]
+    part = load_dataset(os.path.join(output_dir, "filtered_population_2013.csv"))
+    assert len(part) == (population['Year'] == 2013).sum()
@@ -0,0 +1,92 @@
+# tests/test_schema.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.schema import UNIQUE_KEY, SchemaError, Validator, validate
+
+DUPLICATE = f"duplicate ({', '.join(UNIQUE_KEY)})"
+
+
+def _messy(population):
+    """Dữ liệu có dòng sai khoảng giá trị, sai kiểu và dòng trùng khóa (tỉnh, năm)."""
+    data = population.astype({col: object for col in population.columns[3:]}).copy()
+    data.loc[3, 'Sex ratio'] = 500                 # sai khoảng
+    data.loc[7, 'Average population'] = "n/a"      # sai kiểu
+    data.loc[9, 'Region'] = "Atlantis"             # không hợp lệ
+    extra = pd.concat([
+        data.loc[[0, 5]],                          # trùng với dòng hợp lệ -> bị loại
+        data.loc[[3]].assign(**{'Sex ratio': 100}),  # trùng với dòng sai -> được giữ
+        data.loc[[3]].assign(**{'Sex ratio': 101}),  # trùng với dòng vừa được giữ -> bị loại
+    ])
+    return pd.concat([data, extra], ignore_index=True)
+
+
+def _reference_duplicates(data, violations):
+    """Dòng trùng khóa với một dòng hợp lệ đứng trước (tính bằng pandas)."""
+    other = violations.drop(columns=DUPLICATE).any(axis=1)
+    keys = data[UNIQUE_KEY].astype(str).agg("\x1f".join, axis=1)
+    expected = np.zeros(len(data), dtype=bool)
+    seen = set()
+    for i, (key, bad) in enumerate(zip(keys, other)):
+        if key in seen:
+            expected[i] = True
+        elif not bad:
+            seen.add(key)
+    return expected
+
+
+def test_clean_data_passes(population):
+    valid, quarantined, report = validate(population)
+    assert len(valid) == len(population)
+    assert quarantined.empty
+    assert report['violations'] == {}
+
+
+def test_rule_violations(population):
+    data = _messy(population)
+    violations = Validator().check(data)
+    assert violations.loc[3, 'Sex ratio: > 130']
+    assert violations.loc[7, 'Average population: type']
+    assert violations.loc[9, 'Region: not allowed']
+    assert violations.drop(columns=DUPLICATE).any(axis=1).sum() == 3
+
+
+def test_duplicates_only_count_kept_rows(population):
+    data = _messy(population)
+    violations = Validator().check(data)
+    n = len(population)
+    # Hai dòng trùng với dòng hợp lệ, dòng sửa lại của tỉnh/năm ở dòng 3 được giữ, bản sau nó bị loại
+    assert violations[DUPLICATE].to_numpy()[n:].tolist() == [True, True, False, True]
+    np.testing.assert_array_equal(violations[DUPLICATE].to_numpy(), _reference_duplicates(data, violations))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 17])
+def test_chunks_match_whole_frame(population, chunk_size):
+    data = _messy(population)
+    whole = Validator().check(data)
+
+    validator = Validator()
+    chunks = [validator.check(data.iloc[start:start + chunk_size])
+              for start in range(0, len(data), chunk_size)]
+    pd.testing.assert_frame_equal(pd.concat(chunks), whole)
+    assert validator.rows == len(data)
+
+
+def test_missing_columns_raise(population):
+    with pytest.raises(SchemaError):
+        Validator().check(population.drop(columns=['Sex ratio']))
+
+
+def test_duplicates_across_chunks_with_different_dtypes(population):
+    # Chunk thứ hai có một Year bị thiếu nên pandas đọc cột Year là float: 2011.0 vẫn trùng 2011
+    first = population.iloc[:6]
+    second = pd.concat([population.iloc[[0]], population.iloc[[1]].assign(Year=np.nan)], ignore_index=True)
+    second['Year'] = second['Year'].astype(float)
+    second['Provinces/city'] = " " + second['Provinces/city'] + " "
+
+    validator = Validator()
+    validator.check(first)
+    violations = validator.check(second)
+    assert violations[DUPLICATE].tolist() == [True, False]
+    assert violations['Year: missing'].tolist() == [False, True]
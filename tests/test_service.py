@@ -0,0 +1,121 @@
+# tests/test_service.py
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scripts.dataset import widen
+from scripts.service import LRUCache, QueryService, aggregate, parse_query_string, query_result
+
+
+def _rows(result):
+    return pd.DataFrame(result['rows'], columns=result['columns'])
+
+
+@pytest.mark.parametrize("agg", ['mean', 'sum', 'median', 'count'])
+def test_query_result_matches_groupby(population, agg):
+    query = {'by': ['Region', 'Year'], 'metrics': ['15+ labor', 'Sex ratio'], 'agg': agg,
+             'filters': {'Year': {'between': [2012, 2015]}}}
+    result = _rows(query_result(population, query)).sort_values(['Region', 'Year']).reset_index(drop=True)
+
+    data = widen(population).astype({'Region': str})
+    part = data[data['Year'].between(2012, 2015)]
+    expected = part.groupby(['Region', 'Year'])[['15+ labor', 'Sex ratio']].agg(agg).reset_index()
+    assert result[['Region', 'Year']].astype({'Region': str}).equals(expected[['Region', 'Year']])
+    np.testing.assert_allclose(result[['15+ labor', 'Sex ratio']].to_numpy(np.float64),
+                               expected[['15+ labor', 'Sex ratio']].to_numpy(np.float64), rtol=1e-12)
+
+
+def test_aggregate_without_groups_and_errors(population):
+    total = aggregate(population, by=[], metrics=['Average population'], agg='sum')
+    assert total.iloc[0, 0] == pytest.approx(widen(population)['Average population'].sum(), rel=1e-12)
+    with pytest.raises(ValueError):
+        aggregate(population, agg='mode')
+    with pytest.raises(KeyError):
+        aggregate(population, by=['Nowhere'])
+
+
+def test_parse_query_string():
+    query = parse_query_string("Region=Mekong%20Delta&Year=2015&Year=2016&metrics=15%2B%20labor&agg=sum")
+    assert query == {'metrics': '15+ labor', 'agg': 'sum',
+                     'filters': {'Region': 'Mekong Delta', 'Year': [2015, 2016]}}
+
+
+def test_lru_cache_evicts_least_recent():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert cache.get('b') is None
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 1, 'misses': 1}
+
+
+def test_identical_queries_share_one_task(population):
+    service = QueryService(population)
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def compute():
+            calls.append(1)
+            await release.wait()
+            return {'value': 42}
+
+        first = asyncio.ensure_future(service._shared('key', compute))
+        second = asyncio.ensure_future(service._shared('key', compute))
+        await asyncio.sleep(0)
+        # Hủy một yêu cầu (client ngắt kết nối) không hủy task mà yêu cầu kia đang chờ
+        first.cancel()
+        release.set()
+        assert await second == {'value': 42}
+        assert first.cancelled()
+
+    asyncio.run(main())
+    assert calls == [1]
+    assert service.cache.get('key') == {'value': 42}
+    assert service._pending == {}
+
+
+def test_failed_task_is_not_cached(population):
+    service = QueryService(population)
+
+    async def compute():
+        raise ValueError("hỏng")
+
+    async def main():
+        with pytest.raises(ValueError):
+            await service._shared('key', compute)
+
+    asyncio.run(main())
+    assert service.cache.get('key') is None
+    assert service._pending == {}
+
+
+def test_handle_query_uses_cache(population):
+    service = QueryService(population)
+    body = json.dumps({'by': ['Year'], 'metrics': ['Population density']}).encode()
+
+    async def main():
+        return [await service.handle('POST', '/query', body) for _ in range(2)]
+
+    (status, _, first), (_, _, second) = asyncio.run(main())
+    assert status == 200 and first == second
+    assert service.cache.stats()['hits'] == 1
+    expected = widen(population).groupby('Year')['Population density'].mean()
+    rows = _rows(json.loads(first))
+    np.testing.assert_allclose(rows['Population density'], expected.to_numpy(), rtol=1e-12)
+
+
+def test_handle_errors(population):
+    service = QueryService(population)
+
+    async def main():
+        return (await service.handle('GET', '/query?agg=mode'), await service.handle('GET', '/nowhere'),
+                await service.handle('DELETE', '/query'))
+
+    statuses = [status for status, _, _ in asyncio.run(main())]
+    assert statuses == [400, 404, 405]